@@ -3,6 +3,7 @@ warnings.filterwarnings("ignore")
 
 # ===== Core imports =====
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -26,6 +27,15 @@ from sklearn.metrics import accuracy_score, confusion_matrix
 # Viz
 import plotly.graph_objects as go
 
+from backward7evin_alignment import align_prices
+from backward7evin_quality import quality_issues
+from backward7evin_portfolio import bars_per_year, signal_scores, target_weights
+from backward7evin_calibration import ProbabilityCalibrator
+from backward7evin_targets import build_targets
+from backward7evin_levels import latest_levels, level_features
+from backward7evin_kernels import rsi, sma, rolling_std, rolling_corr, pct_change
+from backward7evin_plotting import line_trace
+
 # ===== App constants =====
 APP_TITLE = "Backward 7evin"
 ASSETS = {
@@ -34,6 +44,9 @@ ASSETS = {
     "DX-Y.NYB": "USD"
 }
 
+LEVEL_WINDOW = 20  # bars behind the rolling Fibonacci / pivot / swing levels
+PAGE_START = time.perf_counter()  # for time-to-first-paint
+
 # ===== Page and theme =====
 st.set_page_config(page_title=APP_TITLE, page_icon="📊", layout="wide")
 st.markdown(
@@ -89,26 +102,13 @@ def fetch_prices(period="180d", interval="1d") -> pd.DataFrame:
     df = yf.download(list(ASSETS.keys()), period=period, interval=interval, progress=False)["Close"]
     if isinstance(df, pd.Series):
         df = df.to_frame()
-    df = df.dropna()
+    df = align_prices(df, daily=(interval == "1d"))
     df.columns = [ASSETS.get(c, c) for c in df.columns]
     return df
 
-def compute_rsi(series: pd.Series, window: int = 14) -> pd.Series:
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def fib_levels(series: pd.Series) -> dict:
-    hi, lo = series.max(), series.min()
-    d = hi - lo
-    return {
-        "Fib 23.6%": hi - d * 0.236,
-        "Fib 38.2%": hi - d * 0.382,
-        "Fib 50.0%": hi - d * 0.5,
-        "Fib 61.8%": hi - d * 0.618
-    }
+def key_levels(series: pd.Series, window: int = LEVEL_WINDOW) -> dict:
+    # Fibonacci, pivot and swing levels over the last `window` bars; cached by the levels engine
+    return latest_levels(series, window=window)
 
 def try_arima(series: pd.Series) -> pd.Series:
     if not STATS_OK:
@@ -128,27 +128,71 @@ def try_hw(series: pd.Series) -> pd.Series:
     except Exception:
         return pd.Series(dtype=float)
 
+# ===== Background execution =====
+@st.cache_resource
+def background_pool() -> ThreadPoolExecutor:
+    # One pool per server process, shared by every session; model fits and
+    # ARIMA run here so the page can paint before they finish
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="b7-background")
+
+def submit(name: str, data_key: tuple, fn, *args):
+    """
+    Start fn(*args) in the background once per data snapshot.
+    Futures live in st.session_state, so reruns (e.g. the 1-minute refresh)
+    pick up running or finished work instead of starting it again.
+    """
+    jobs = st.session_state.setdefault("jobs", {})
+    for key in [k for k in jobs if k[1] != data_key]:
+        jobs.pop(key).cancel()
+    key = (name, data_key)
+    if key not in jobs:
+        jobs[key] = background_pool().submit(fn, *args)
+    return jobs[key]
+
+def render_when_ready(sections):
+    """
+    Fill in page sections as their futures complete.
+
+    Args:
+        sections: List of (futures, render) pairs; render() runs in the
+                  script thread once all of its futures are done
+    """
+    pending = list(sections)
+    while pending:
+        for section in [s for s in pending if all(f.done() for f in s[0])]:
+            section[1]()
+            pending.remove(section)
+        waiting = {f for futures, _ in pending for f in futures if not f.done()}
+        if waiting:
+            wait(waiting, return_when=FIRST_COMPLETED)
+
 # ===== Feature engineering for ML (supervised) =====
 def build_features(df: pd.DataFrame) -> pd.DataFrame:
-    feats = pd.DataFrame(index=df.index)
-    for col in df.columns:
-        feats[f"{col}_ret1"] = df[col].pct_change()
-        feats[f"{col}_ret5"] = df[col].pct_change(5)
-        feats[f"{col}_vol10"] = df[col].pct_change().rolling(10).std()
+    # All assets at once with the shared kernels (rows = bars, columns = assets)
+    prices = df.to_numpy(dtype=np.float64)
+    ret1, ret5 = pct_change(prices), pct_change(prices, 5)
+    vol10 = rolling_std(ret1, 10)
+    feats = {}
+    for j, col in enumerate(df.columns):
+        feats[f"{col}_ret1"] = ret1[:, j]
+        feats[f"{col}_ret5"] = ret5[:, j]
+        feats[f"{col}_vol10"] = vol10[:, j]
     if "Bitcoin" in df:
-        feats["BTC_RSI"] = compute_rsi(df["Bitcoin"])
-        feats["BTC_MA7"] = df["Bitcoin"].rolling(7).mean()
-        feats["BTC_MA21"] = df["Bitcoin"].rolling(21).mean()
+        btc = df["Bitcoin"].to_numpy(dtype=np.float64)
+        feats["BTC_RSI"] = rsi(btc)
+        feats["BTC_MA7"] = sma(btc, 7)
+        feats["BTC_MA21"] = sma(btc, 21)
         feats["BTC_MA_diff"] = feats["BTC_MA7"] - feats["BTC_MA21"]
-    if set(["Bitcoin", "Gold"]).issubset(df.columns):
-        feats["corr_BTC_Gold"] = df["Bitcoin"].rolling(20).corr(df["Gold"])
-    if set(["Bitcoin", "USD"]).issubset(df.columns):
-        feats["corr_BTC_USD"] = df["Bitcoin"].rolling(20).corr(df["USD"])
-    return feats.dropna()
+        for name, col in level_features(df, window=LEVEL_WINDOW, columns=["Bitcoin"]).items():
+            feats[name] = col.to_numpy()
+        for other, name in (("Gold", "corr_BTC_Gold"), ("USD", "corr_BTC_USD")):
+            if other in df:
+                feats[name] = rolling_corr(btc, df[other].to_numpy(dtype=np.float64), 20)
+    return pd.DataFrame(feats, index=df.index).dropna()
 
 def label_target(df: pd.DataFrame) -> pd.Series:
-    # Predict next day BTC up (1) or down (0)
-    return (df["Bitcoin"].shift(-1) > df["Bitcoin"]).astype(int)
+    # Predict next day BTC up (1) or down (0); the last bar has no label (NaN)
+    return build_targets(df["Bitcoin"], horizons=(1,), bucket_edges=None)["up_1d"]
 
 # ===== Models =====
 def train_rf(df: pd.DataFrame):
@@ -164,15 +208,17 @@ def train_rf(df: pd.DataFrame):
     X_train_s = scaler.fit_transform(X_train)
     X_test_s = scaler.transform(X_test)
     rf = RandomForestClassifier(n_estimators=200, max_depth=8, random_state=42)
+    calibrator = ProbabilityCalibrator().fit(rf, X_train_s, y_train)
     rf.fit(X_train_s, y_train)
     preds = rf.predict(X_test_s)
     acc = accuracy_score(y_test, preds)
     latest = scaler.transform(X.tail(1))
-    proba = rf.predict_proba(latest)[0]
-    pred = rf.predict(latest)[0]
+    proba = calibrator.calibrate_proba(rf.predict_proba(latest))[0]
+    pred = int(proba[1] >= 0.5)  # direction from the calibrated probability
     signal = "LONG" if pred == 1 else "SHORT"
     conf = float(max(proba)) * 100.0
-    return {"model": rf, "scaler": scaler, "accuracy": acc, "signal": signal, "confidence": conf}
+    return {"model": rf, "scaler": scaler, "calibrator": calibrator, "accuracy": acc,
+            "signal": signal, "confidence": conf}
 
 def train_ensemble(df: pd.DataFrame):
     X = build_features(df)
@@ -195,12 +241,13 @@ def train_ensemble(df: pd.DataFrame):
         estimators=[("rf", rf), ("gb", gb), ("lr", lr)],
         voting="soft"
     )
+    calibrator = ProbabilityCalibrator().fit(ens, X_train_s, y_train)
     ens.fit(X_train_s, y_train)
     acc = ens.score(X_test_s, y_test)
 
     latest = scaler.transform(X.tail(1))
-    proba = ens.predict_proba(latest)[0]
-    pred = ens.predict(latest)[0]
+    proba = calibrator.calibrate_proba(ens.predict_proba(latest))[0]
+    pred = int(proba[1] >= 0.5)  # direction from the calibrated probability
     signal = "LONG" if pred == 1 else "SHORT"
     conf = float(max(proba)) * 100.0
 
@@ -210,7 +257,7 @@ def train_ensemble(df: pd.DataFrame):
         "Gradient Boost": "LONG" if gb.fit(X_train_s, y_train).predict(latest)[0] == 1 else "SHORT",
         "Logistic Reg": "LONG" if lr.fit(X_train_s, y_train).predict(latest)[0] == 1 else "SHORT",
     }
-    return {"model": ens, "scaler": scaler, "accuracy": acc,
+    return {"model": ens, "scaler": scaler, "calibrator": calibrator, "accuracy": acc,
             "signal": signal, "confidence": conf, "votes": votes}
 
 # ===== Sidebar =====
@@ -225,6 +272,8 @@ with st.sidebar:
     use_rf = st.checkbox("Random Forest Signal", value=True)
     use_ens = st.checkbox("Use Ensemble Model", value=True)
     st.divider()
+    level_window = st.slider("Fibonacci / Pivot Window (bars)", 10, 250, LEVEL_WINDOW, step=5)
+    st.divider()
     st.caption("Live data refresh is set to 1 minute.")
 
 # ===== Load data =====
@@ -232,6 +281,15 @@ raw = fetch_prices(period=period, interval=interval)
 if raw.empty:
     st.error("No data available. Try another window or interval.")
     st.stop()
+issues = quality_issues(raw.attrs.get("quality"))
+if not issues.empty:
+    st.warning("Data quality: " + "; ".join(
+        f"{ASSETS.get(r.Asset, r.Asset)} {r.Status.lower()} ({r.Quarantined} bad bars)"
+        for r in issues.itertuples()))
+missing = [name for name in ASSETS.values() if name not in raw.columns]
+if missing:
+    st.error(f"Unusable data for {', '.join(missing)}. Try another window or interval.")
+    st.stop()
 
 # ===== Top glass panel =====
 st.markdown("<div class='glass'>", unsafe_allow_html=True)
@@ -241,9 +299,16 @@ c1.metric("Bitcoin", f"${latest['Bitcoin']:.2f}")
 c2.metric("Gold", f"${latest['Gold']:.2f}")
 c3.metric("USD Index", f"{latest['USD']:.2f}")
 
-# Train models for BTC direction
-rf_res = train_rf(raw) if use_rf else None
-ens_res = train_ensemble(raw) if use_ens else None
+# Train models for BTC direction and fit forecasts in the background
+data_key = (period, interval, len(raw), raw.index[-1], float(raw.iloc[-1].sum()))
+rf_job = submit("rf", data_key, train_rf, raw) if use_rf else None
+ens_job = submit("ensemble", data_key, train_ensemble, raw) if use_ens else None
+model_jobs = [j for j in (rf_job, ens_job) if j is not None]
+forecast_jobs = {
+    name: (submit(f"arima:{name}", data_key, try_arima, raw[name]) if use_arima else None,
+           submit(f"hw:{name}", data_key, try_hw, raw[name]) if use_hw else None)
+    for name in ASSETS.values()
+}
 
 def action_from_signal(sig: str, conf: float) -> str:
     if sig == "LONG":
@@ -251,14 +316,35 @@ def action_from_signal(sig: str, conf: float) -> str:
     else:
         return "🔴 Red Light — Go SHORT" if conf >= 80 else "🟡 Caution — Prefer SHORT, size conservatively"
 
-action_text = "HOLD — Mixed conditions"
-if ens_res:
-    action_text = action_from_signal(ens_res["signal"], ens_res["confidence"])
-elif rf_res:
-    action_text = action_from_signal(rf_res["signal"], rf_res["confidence"])
-
-c4.markdown(f"**AI Direction**<br>{action_text}", unsafe_allow_html=True)
+def position_size(sig: str, conf: float, prices: pd.Series, lookback: int = 60) -> float:
+    # Vol-targeted BTC weight: direction x conviction |2p - 1|, sized to 15% annual vol
+    # (annualized by the bars per year of the selected interval: ~365 daily, ~8,760 hourly)
+    score = signal_scores([sig], [conf / 100.0])
+    returns = prices.pct_change().tail(lookback).to_frame().values
+    return float(target_weights(score, returns, periods_per_year=bars_per_year(prices.index))[0])
+
+def result(job):
+    return job.result() if job is not None else None
+
+def render_direction():
+    rf_res, ens_res = result(rf_job), result(ens_job)
+    if (use_rf and rf_res is None) or (use_ens and ens_res is None):
+        model_warning.warning(f"Model signals need at least 120 aligned rows after feature warm-up; "
+                              f"{len(raw)} rows loaded for {period} @ {interval}.")
+    action_text = "HOLD — Mixed conditions"
+    size_text = ""
+    model_res = ens_res or rf_res
+    if model_res:
+        action_text = action_from_signal(model_res["signal"], model_res["confidence"])
+        weight = position_size(model_res["signal"], model_res["confidence"], raw["Bitcoin"])
+        size_text = f"<br><span class='metric'>Suggested size: {weight:+.1%} of capital</span>"
+    direction.markdown(f"**AI Direction**<br>{action_text}{size_text}", unsafe_allow_html=True)
+
+direction = c4.empty()
+direction.markdown("**AI Direction**<br>⏳ Training models…" if model_jobs else
+                   "**AI Direction**<br>HOLD — Mixed conditions", unsafe_allow_html=True)
 st.markdown("</div>", unsafe_allow_html=True)
+model_warning = st.empty()
 
 st.divider()
 
@@ -270,9 +356,10 @@ with t1:
     st.subheader("Price Charts")
     for key, name in ASSETS.items():
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=raw.index, y=raw[name], mode="lines", name=name))
+        fig.add_trace(line_trace(raw[name], name=name))  # WebGL, downsampled to the chart width
         fig.update_layout(template="plotly_dark", height=380, margin=dict(l=10, r=10, t=30, b=10))
         st.plotly_chart(fig, use_container_width=True)
+first_paint = time.perf_counter() - PAGE_START
 
 # Forecasts in human-readable form
 with t2:
@@ -290,56 +377,89 @@ with t2:
             return "Bearish", pct
         return "Flat", pct
 
-    cols = st.columns(3)
-    for i, (key, name) in enumerate(ASSETS.items()):
-        series = raw[name]
-        a = try_arima(series) if use_arima else pd.Series(dtype=float)
-        h = try_hw(series) if use_hw else pd.Series(dtype=float)
+    def render_forecast(slot, name):
+        a_job, h_job = forecast_jobs[name]
+        a = result(a_job) if a_job is not None else pd.Series(dtype=float)
+        h = result(h_job) if h_job is not None else pd.Series(dtype=float)
         a_dir, a_pct = summarize(a)
         h_dir, h_pct = summarize(h)
         icon = {"Bullish": "🟢", "Bearish": "🔴", "Flat": "⚪"}
 
-        with cols[i % 3]:
+        with slot.container():
             st.markdown(f"### {name}")
             st.write(f"ARIMA: {icon[a_dir]} {a_dir} ({a_pct:+.2f}%)")
             st.write(f"Holt–Winters: {icon[h_dir]} {h_dir} ({h_pct:+.2f}%)")
 
         summary.append((name, a_dir, a_pct, h_dir, h_pct))
 
-    st.markdown("---")
-    st.markdown("**Summary**")
-    for name, a_dir, a_pct, h_dir, h_pct in summary:
-        icon = {"Bullish": "🟢", "Bearish": "🔴", "Flat": "⚪"}
-        st.write(
-            f"{name}: ARIMA {icon[a_dir]} {a_dir} ({a_pct:+.2f}%), "
-            f"Holt–Winters {icon[h_dir]} {h_dir} ({h_pct:+.2f}%)"
-        )
+    def render_summary():
+        with summary_slot.container():
+            st.markdown("---")
+            st.markdown("**Summary**")
+            for name, a_dir, a_pct, h_dir, h_pct in sorted(summary, key=lambda r: order.index(r[0])):
+                icon = {"Bullish": "🟢", "Bearish": "🔴", "Flat": "⚪"}
+                st.write(
+                    f"{name}: ARIMA {icon[a_dir]} {a_dir} ({a_pct:+.2f}%), "
+                    f"Holt–Winters {icon[h_dir]} {h_dir} ({h_pct:+.2f}%)"
+                )
+
+    cols = st.columns(3)
+    order = list(ASSETS.values())
+    forecast_slots = {}
+    for i, name in enumerate(order):
+        forecast_slots[name] = cols[i % 3].empty()
+        forecast_slots[name].markdown(f"### {name}\n⏳ Fitting forecasts…")
+    summary_slot = st.empty()
 
 # Fibonacci readable bullets
 with t3:
     st.subheader("Fibonacci Levels")
+    st.caption(f"Rolling levels over the last {level_window} bars (swing points need 5 bars on each side)")
     for k, name in ASSETS.items():
         st.markdown(f"### {name}")
-        st.markdown("**Fibonacci Retracement Levels:**")
-        for nm, val in fib_levels(raw[name]).items():
-            st.write(f"• **{nm}** → ${val:,.2f}")
+        titles = {"Fibonacci": "Fibonacci Retracement Levels", "Pivots": "Pivot Levels", "Swings": "Swing Levels"}
+        for group, levels in key_levels(raw[name], window=level_window).items():
+            st.markdown(f"**{titles[group]}:**")
+            for nm, val in levels.items():
+                st.write(f"• **{nm}** → " + (f"${val:,.2f}" if np.isfinite(val) else "not confirmed yet"))
         st.divider()
 
 # Ensemble tab
 with t4:
     st.subheader("Ensemble Signals")
-    if ens_res:
-        sig, conf = ens_res["signal"], ens_res["confidence"]
-        css = "long" if sig == "LONG" else "short"
-        st.markdown(f"<div class='signal {css}'>Overall: {sig} {conf:.1f}%</div>", unsafe_allow_html=True)
-
-        st.markdown("**Model Votes**")
-        st.write({
-            "Random Forest": ens_res["votes"]["Random Forest"],
-            "Gradient Boost": ens_res["votes"]["Gradient Boost"],
-            "Logistic Reg": ens_res["votes"]["Logistic Reg"],
-        })
-        st.caption("Guidance: ≥ 80% confidence → Full Green or Red. Mixed → Caution or Hold.")
-    else:
-        st.info("Enable Use Ensemble Model in the sidebar to view combined signals.")
+    ensemble_slot = st.empty()
+    if use_ens:
+        ensemble_slot.info("⏳ Training ensemble…")
+
+def render_ensemble():
+    ens_res = result(ens_job)
+    with ensemble_slot.container():
+        if ens_res:
+            sig, conf = ens_res["signal"], ens_res["confidence"]
+            css = "long" if sig == "LONG" else "short"
+            st.markdown(f"<div class='signal {css}'>Overall: {sig} {conf:.1f}%</div>", unsafe_allow_html=True)
+
+            st.markdown("**Model Votes**")
+            st.write({
+                "Random Forest": ens_res["votes"]["Random Forest"],
+                "Gradient Boost": ens_res["votes"]["Gradient Boost"],
+                "Logistic Reg": ens_res["votes"]["Logistic Reg"],
+            })
+            cal = ens_res["calibrator"]
+            st.caption(f"Calibration: {cal.method_used} on {cal.n_samples} out-of-fold predictions")
+            st.caption("Guidance: ≥ 80% calibrated confidence → Full Green or Red. Mixed → Caution or Hold.")
+        else:
+            st.info("Enable Use Ensemble Model in the sidebar to view combined signals.")
+
+# ===== Progressive fill-in =====
+# Everything above is on screen; model signals and forecasts replace their
+# placeholders as the background jobs finish
+sections = [(model_jobs, render_direction), ([ens_job] if ens_job else [], render_ensemble)]
+for name in order:
+    jobs = [j for j in forecast_jobs[name] if j is not None]
+    sections.append((jobs, lambda name=name: render_forecast(forecast_slots[name], name)))
+sections.append(([j for pair in forecast_jobs.values() for j in pair if j is not None], render_summary))
+render_when_ready(sections)
+
+st.caption(f"First paint {first_paint:.2f}s · all panels {time.perf_counter() - PAGE_START:.2f}s")
 
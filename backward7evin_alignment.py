@@ -0,0 +1,96 @@
+"""
+The Backward 7evin - Calendar-Aware Alignment
+CS379 Machine Learning - Mixing 24/7 and Exchange-Hours Assets
+
+BTC trades every day; Gold futures, the S&P 500 and the USD index follow
+exchange calendars, and Yahoo stamps them in their exchange's timezone.
+Building `pd.DataFrame(data).dropna()` from those series throws away every
+weekend and holiday crypto bar. When the timezones disagree it can throw
+away nearly everything.
+
+align_prices normalizes each series' timestamps, merges them with a single
+union reindex (pd.concat) and applies one alignment policy:
+
+- 'ffill'     carry exchange-hours prices across closed days (up to `limit` bars)
+- 'intersect' keep only bars where every series traded (the old behaviour,
+              but on matching calendar dates)
+- 'resample'  put everything on a regular grid (`freq`) and forward-fill
+
+Before filling, the merged frame goes through the data-quality screen
+(backward7evin_quality), so bad ticks are quarantined and bridged instead
+of being carried forward. The screen's report is attached as
+`df.attrs['quality']`.
+"""
+
+import pandas as pd
+
+from backward7evin_quality import validate_prices
+
+POLICIES = ('ffill', 'intersect', 'resample')
+DEFAULT_POLICY = 'ffill'
+DEFAULT_LIMIT = 3  # a weekend plus a holiday
+
+
+def normalize_index(index, daily=True):
+    """
+    Make timestamps comparable across exchanges.
+
+    Daily bars keep their local (exchange) calendar date, so a NYSE close
+    and a UTC crypto close for the same day line up. Intraday bars are
+    converted to UTC. Either way the result is tz-naive.
+    """
+    index = pd.DatetimeIndex(index)
+    if daily:
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize()
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index
+
+
+def align_prices(data, policy=DEFAULT_POLICY, limit=DEFAULT_LIMIT, freq=None, daily=True,
+                 validate=True):
+    """
+    Merge price series from different calendars into one complete frame.
+
+    Args:
+        data: Dict of {name: Series} or a DataFrame of closes
+        policy: 'ffill', 'intersect' or 'resample'
+        limit: Max consecutive bars to forward-fill ('ffill' / 'resample')
+        freq: Grid for 'resample' (default: 'D' for daily, 'h' otherwise)
+        daily: Whether the bars are daily (controls timestamp normalization)
+        validate: Screen and quarantine bad bars first (see validate_prices)
+
+    Returns:
+        DataFrame with one column per series and no missing values;
+        attrs['quality'] holds the quality report when validate is set
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown alignment policy {policy!r}; expected one of {POLICIES}")
+    if isinstance(data, pd.DataFrame):
+        data = {col: data[col] for col in data.columns}
+    if not data:
+        return pd.DataFrame()
+
+    series = {}
+    for name, s in data.items():
+        s = s.copy()
+        s.index = normalize_index(s.index, daily=daily)
+        series[name] = s[~s.index.duplicated(keep='last')]
+
+    # One union reindex over all timestamps
+    merged = pd.concat(series, axis=1).sort_index()
+    report = None
+    if validate:
+        merged, report = validate_prices(merged)
+
+    if policy == 'ffill':
+        merged = merged.ffill(limit=limit)
+    elif policy == 'resample':
+        merged = merged.resample(freq or ('D' if daily else 'h')).last().ffill(limit=limit)
+
+    merged = merged.dropna()
+    if report is not None:
+        merged.attrs['quality'] = report
+    return merged
@@ -0,0 +1,186 @@
+"""
+The Backward 7evin - Correlation Breakdown Detector
+CS379 Machine Learning - Streaming Change-Point Detection
+
+The v2 classifier's edge is "correlation breakdowns = opportunities", but it
+only looks at one static 90-day correlation. This detector watches rolling
+correlations between every asset and every macro driver (BTC, Gold, S&P 500,
+USD) bar by bar. It runs a two-sided CUSUM change-point test on each pair.
+
+Per bar, each (asset, driver) pair costs O(1): rolling sums are updated from
+a ring buffer and the CUSUM statistics are vectorized across all pairs, so
+hundreds of assets can be monitored on every new bar.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backward7evin_classifier_v2_enhanced import MACRO_DRIVERS, CRYPTO_ASSETS, fetch_market_data
+
+
+class CorrelationBreakdownDetector:
+    """Online CUSUM detector over rolling asset/driver return correlations"""
+
+    # Rebuild the running sums from the ring buffer this often (float drift)
+    RESYNC_EVERY = 10_000
+
+    def __init__(self, assets, drivers, window=20, drift=0.2, threshold=1.5,
+                 baseline_alpha=0.05):
+        """
+        Args:
+            assets: Asset symbols (columns of the asset return vector)
+            drivers: Driver symbols (columns of the driver return vector)
+            window: Rolling correlation window in bars
+            drift: CUSUM slack - deviations smaller than this are ignored
+            threshold: Cumulative deviation that triggers an event
+            baseline_alpha: EW weight for the "normal" correlation level
+        """
+        self.assets = list(assets)
+        self.drivers = list(drivers)
+        self.window = window
+        self.drift = drift
+        self.threshold = threshold
+        self.baseline_alpha = baseline_alpha
+
+        n_a, n_d = len(self.assets), len(self.drivers)
+        self._buf_x = np.zeros((window, n_a))
+        self._buf_y = np.zeros((window, n_d))
+        self._sx = np.zeros(n_a)
+        self._sxx = np.zeros(n_a)
+        self._sy = np.zeros(n_d)
+        self._syy = np.zeros(n_d)
+        self._sxy = np.zeros((n_a, n_d))
+
+        self.baseline = np.full((n_a, n_d), np.nan)
+        self.cusum_up = np.zeros((n_a, n_d))
+        self.cusum_down = np.zeros((n_a, n_d))
+        self.n_bars = 0
+
+    def _resync(self):
+        self._sx = self._buf_x.sum(axis=0)
+        self._sxx = (self._buf_x ** 2).sum(axis=0)
+        self._sy = self._buf_y.sum(axis=0)
+        self._syy = (self._buf_y ** 2).sum(axis=0)
+        self._sxy = self._buf_x.T @ self._buf_y
+
+    def correlation(self):
+        """Current rolling correlation matrix [n_assets, n_drivers] (NaN during warm-up)"""
+        n = min(self.n_bars, self.window)
+        if n < 3:
+            return np.full(self._sxy.shape, np.nan)
+        cov = self._sxy - np.outer(self._sx, self._sy) / n
+        var_x = self._sxx - self._sx ** 2 / n
+        var_y = self._syy - self._sy ** 2 / n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(np.outer(var_x, var_y))
+        return np.clip(corr, -1.0, 1.0)
+
+    def update(self, timestamp, asset_returns, driver_returns):
+        """
+        Feed one bar of returns and collect any change-point events.
+
+        Missing returns (NaN) count as "no move", which matches a
+        forward-filled exchange-hours driver on a crypto weekend.
+
+        Args:
+            timestamp: Bar timestamp (stored on the events as-is)
+            asset_returns: Returns for self.assets, shape [n_assets]
+            driver_returns: Returns for self.drivers, shape [n_drivers]
+
+        Returns:
+            List of event dicts (Timestamp, Asset, Driver, Direction,
+            Correlation, Baseline) - usually empty
+        """
+        x = np.nan_to_num(np.asarray(asset_returns, dtype=np.float64))
+        y = np.nan_to_num(np.asarray(driver_returns, dtype=np.float64))
+
+        # Slide the window: drop the oldest bar, add the new one
+        slot = self.n_bars % self.window
+        old_x, old_y = self._buf_x[slot].copy(), self._buf_y[slot].copy()
+        self._buf_x[slot], self._buf_y[slot] = x, y
+        self._sx += x - old_x
+        self._sxx += x * x - old_x * old_x
+        self._sy += y - old_y
+        self._syy += y * y - old_y * old_y
+        self._sxy += np.outer(x, y) - np.outer(old_x, old_y)
+        self.n_bars += 1
+        if self.n_bars % self.RESYNC_EVERY == 0:
+            self._resync()
+
+        if self.n_bars < self.window:
+            return []
+
+        corr = self.correlation()
+        valid = ~np.isnan(corr)
+        fresh = valid & np.isnan(self.baseline)
+        self.baseline[fresh] = corr[fresh]
+
+        # Two-sided CUSUM around the EW baseline
+        dev = np.where(valid, corr - self.baseline, 0.0)
+        self.cusum_up = np.maximum(0.0, self.cusum_up + dev - self.drift)
+        self.cusum_down = np.maximum(0.0, self.cusum_down - dev - self.drift)
+
+        events = []
+        fired = (self.cusum_up > self.threshold) | (self.cusum_down > self.threshold)
+        for i, j in zip(*np.nonzero(fired)):
+            events.append({
+                'Timestamp': timestamp,
+                'Asset': self.assets[i],
+                'Driver': self.drivers[j],
+                'Direction': 'Breakdown' if self.cusum_down[i, j] > self.threshold else 'Surge',
+                'Correlation': round(float(corr[i, j]), 3),
+                'Baseline': round(float(self.baseline[i, j]), 3),
+            })
+
+        # Restart the test in the new regime for pairs that fired
+        self.cusum_up[fired] = 0.0
+        self.cusum_down[fired] = 0.0
+        self.baseline[fired] = corr[fired]
+        quiet = valid & ~fired
+        self.baseline[quiet] += self.baseline_alpha * (corr[quiet] - self.baseline[quiet])
+        return events
+
+
+def detect_breakdowns(prices, assets, drivers, **kwargs):
+    """
+    Run the detector over a price history.
+
+    Args:
+        prices: DataFrame of closes with asset and driver columns
+        assets: Columns to monitor
+        drivers: Driver columns
+        **kwargs: Passed to CorrelationBreakdownDetector
+
+    Returns:
+        DataFrame of breakdown events in time order
+    """
+    assets = [a for a in assets if a in prices.columns]
+    drivers = [d for d in drivers if d in prices.columns]
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    asset_ret = returns[assets].to_numpy()
+    driver_ret = returns[drivers].to_numpy()
+
+    detector = CorrelationBreakdownDetector(assets, drivers, **kwargs)
+    events = []
+    for t, ts in enumerate(returns.index):
+        events.extend(detector.update(ts, asset_ret[t], driver_ret[t]))
+    return pd.DataFrame(events, columns=['Timestamp', 'Asset', 'Driver', 'Direction',
+                                         'Correlation', 'Baseline'])
+
+
+def main():
+    """Scan the v2 crypto universe for correlation breakdowns"""
+    print("📊 Fetching market data from Yahoo Finance...")
+    drivers = list(MACRO_DRIVERS.keys())
+    prices = fetch_market_data(drivers + CRYPTO_ASSETS, days=365)
+
+    events = detect_breakdowns(prices, CRYPTO_ASSETS, drivers)
+    if events.empty:
+        print("No correlation breakdowns detected.")
+        return
+    print(events.to_string(index=False))
+    print(f"\n{len(events)} events | {(events['Direction'] == 'Breakdown').sum()} breakdowns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+The Backward 7evin - Probability Calibration
+CS379 Machine Learning - Calibrated Confidence for Up/Down Models
+
+`max(proba) * 100` from a random forest or soft-voting ensemble is not a
+real probability. The app's "≥ 80% = Full Green Light" rule needs one. The
+calibrator:
+
+1. Collects out-of-fold P(up) with time-ordered folds (TimeSeriesSplit),
+   so every calibration point is predicted by a model trained on the past
+2. Fits Platt scaling (the default) or isotonic regression on those points
+3. Bakes the fitted mapping into a lookup table over [0, 1]
+
+Isotonic regression needs a few hundred points; on the ~100 out-of-fold
+predictions a short app history gives, it is a coarse step function that
+pins confidences near 0% or 100%. With fewer than MIN_ISOTONIC_SAMPLES
+points it falls back to Platt, and with fewer than MIN_PLATT_SAMPLES
+calibration is skipped (identity). `method_used` records what was fitted.
+
+At inference, calibration is a single array index. The table is small and
+is saved alongside the model.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import TimeSeriesSplit
+
+from backward7evin_shared import SharedDataset
+
+GRID_SIZE = 1001  # lookup resolution: 0.1 percentage points
+MIN_ISOTONIC_SAMPLES = 300   # fewer out-of-fold points -> Platt instead
+MIN_PLATT_SAMPLES = 30       # fewer -> no calibration
+
+
+def _proba_up(model, X):
+    """P(class 1) even if the model only saw one class during training"""
+    proba = model.predict_proba(X)
+    classes = list(model.classes_)
+    if 1 in classes:
+        return proba[:, classes.index(1)]
+    return np.zeros(len(X))
+
+
+def _fold_scores(estimator, X, y, train_idx, test_idx):
+    model = clone(estimator).fit(X[train_idx], y[train_idx])
+    return _proba_up(model, X[test_idx])
+
+
+def _shared_fold_scores(args):
+    """Process-pool worker: one fold, reading X / y from shared memory"""
+    estimator, handle, train_idx, test_idx = args
+    with SharedDataset.attach(handle) as ds:
+        return _fold_scores(estimator, ds['X'], ds['y'], train_idx, test_idx)
+
+
+class ProbabilityCalibrator:
+    """Time-respecting isotonic/Platt calibration baked into a lookup table"""
+
+    def __init__(self, method='platt', n_splits=3, grid_size=GRID_SIZE, n_jobs=1):
+        """
+        Args:
+            method: 'platt' (sigmoid) or 'isotonic' (monotone, non-parametric;
+                    only used with at least MIN_ISOTONIC_SAMPLES points)
+            n_splits: Number of time-ordered folds for out-of-fold predictions
+            grid_size: Lookup table resolution
+            n_jobs: Processes to fit the folds in; the training matrix is
+                    shared with them instead of pickled per fold
+        """
+        if method not in ('isotonic', 'platt'):
+            raise ValueError(f"Unknown calibration method {method!r}")
+        self.method = method
+        self.n_splits = n_splits
+        self.grid_size = grid_size
+        self.n_jobs = n_jobs
+        self.table = np.linspace(0.0, 1.0, grid_size)  # identity until fitted
+        self.method_used = 'identity'
+        self.n_samples = 0
+
+    def fit(self, estimator, X, y):
+        """
+        Fit from out-of-fold predictions of an unfitted estimator template.
+
+        Args:
+            estimator: Model to clone per fold (e.g. the app's RF or ensemble)
+            X: Training features in time order
+            y: Binary targets (1 = up)
+        """
+        X, y = np.asarray(X), np.asarray(y)
+        folds = list(TimeSeriesSplit(n_splits=self.n_splits).split(X))
+        if self.n_jobs > 1:
+            with SharedDataset.create({'X': X, 'y': y}) as ds:
+                with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                    scores = list(pool.map(_shared_fold_scores,
+                                           [(estimator, ds.handle, tr, te) for tr, te in folds]))
+        else:
+            scores = [_fold_scores(estimator, X, y, tr, te) for tr, te in folds]
+        targets = [y[te] for _, te in folds]
+        return self.fit_scores(np.concatenate(scores), np.concatenate(targets))
+
+    def fit_scores(self, scores, y):
+        """Fit the mapping from held-out raw P(up) scores and their outcomes"""
+        scores, y = np.asarray(scores, dtype=float), np.asarray(y, dtype=float)
+        grid = np.linspace(0.0, 1.0, self.grid_size)
+        self.n_samples = len(y)
+        if len(y) < MIN_PLATT_SAMPLES:
+            self.table, self.method_used = grid, 'identity'
+            return self
+        if len(np.unique(y)) < 2:
+            self.table, self.method_used = np.full(self.grid_size, y.mean()), 'constant'
+            return self
+
+        self.method_used = self.method
+        if self.method == 'isotonic' and len(y) < MIN_ISOTONIC_SAMPLES:
+            self.method_used = 'platt'
+        if self.method_used == 'isotonic':
+            iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+            iso.fit(scores, y)
+            self.table = iso.predict(grid)
+        else:
+            eps = 1e-6
+            logit = lambda p: np.log(np.clip(p, eps, 1 - eps) / np.clip(1 - p, eps, 1))
+            lr = LogisticRegression(C=1e6).fit(logit(scores)[:, None], y)
+            self.table = lr.predict_proba(logit(grid)[:, None])[:, 1]
+        return self
+
+    def transform(self, p):
+        """Calibrated P(up) for raw P(up) values (scalar or array)"""
+        idx = np.rint(np.clip(p, 0.0, 1.0) * (self.grid_size - 1)).astype(np.intp)
+        return self.table[idx]
+
+    def calibrate_proba(self, proba):
+        """Calibrate a predict_proba output [n, 2] -> [n, 2] ([P(down), P(up)])"""
+        up = self.transform(np.asarray(proba)[:, 1])
+        return np.column_stack([1.0 - up, up])
+
+    def save(self, path):
+        np.savez(path, table=self.table, method=self.method, n_splits=self.n_splits,
+                 method_used=self.method_used, n_samples=self.n_samples)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        cal = cls(method=str(data['method']), n_splits=int(data['n_splits']),
+                  grid_size=len(data['table']))
+        cal.table = data['table']
+        if 'method_used' in data:
+            cal.method_used, cal.n_samples = str(data['method_used']), int(data['n_samples'])
+        return cal
@@ -9,6 +9,7 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from backward7evin_alignment import align_prices
 
 # SIMPLIFIED: Only analyze Bitcoin and Gold as required
 # These are the ONLY two assets we analyze
@@ -29,7 +30,7 @@ def fetch_market_data(symbols, days=90):
                 data[symbol] = df['Close']
         except Exception as e:
             print(f"Error fetching {symbol}: {e}")
-    return pd.DataFrame(data)
+    return align_prices(data)  # calendar-aware merge of 24/7 and exchange-hours assets
 def calculate_correlations(df, target_col):
     """Calculate Pearson correlation as ML features. INNOVATION: Use RELATIONSHIPS not prices"""
     correlations = {}
@@ -61,7 +62,6 @@ def main():
     print("\n[1/3] Fetching market data from Yahoo Finance...")
     all_symbols = ASSETS_TO_ANALYZE + MARKET_CONTEXT
     full_df = fetch_market_data(all_symbols)
-    full_df = full_df.dropna()  # Remove missing values for clean correlations
     print(f"Loaded {len(full_df)} days of data for {len(full_df.columns)} assets")
     print(f"Analyzing ONLY: Bitcoin and Gold")
 
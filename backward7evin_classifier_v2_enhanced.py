@@ -23,6 +23,12 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from backward7evin_alignment import align_prices
+from backward7evin_quality import quality_issues
+from backward7evin_sink import append_history
+from backward7evin_scheduler import FetchScheduler
+from backward7evin_eventlog import EventLog
+from backward7evin_leadlag import scan as lead_lag_scan
 
 # ═══════════════════════════════════════════════════════════════════════════
 # STEP 1: DEFINE OUR MARKET UNIVERSE
@@ -36,6 +42,13 @@ MACRO_DRIVERS = {
     '^GSPC': 'SP500'           # Stock market benchmark
 }
 
+# Version of the classification rules below; recorded with every logged
+# snapshot so replays know which rules produced it. Bump when rules change.
+RULESET_VERSION = 'v2-5class-2'
+
+# Lags (in bars) searched for lead-lag correlation with BTC
+LEAD_LAG_MAX = 5
+
 # The crypto assets we want to classify
 CRYPTO_ASSETS = [
     'ETH-USD', 'BNB-USD', 'XRP-USD', 'ADA-USD', 'SOL-USD', 'DOGE-USD',
@@ -66,24 +79,29 @@ def fetch_market_data(symbols, days=90):
 
     print(f"   Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
 
+    def fetch(symbol):
+        # raise_errors so rate limits and 403s reach the scheduler's retry logic
+        history = yf.Ticker(symbol).history(start=start_date, end=end_date, timeout=10,
+                                            raise_errors=True)
+        return history['Close']  # We only need closing prices
+
+    # Rate-limited, retrying fetch; macro drivers first since every signal needs them
+    scheduler = FetchScheduler(fetch)
+    closes, errors = scheduler.run(symbols, priority=lambda s: 0 if s in MACRO_DRIVERS else 1)
+
     data = {}
-    successful_fetches = 0
-    for symbol in symbols:
-        try:
-            # Add user agent to avoid 403 errors
-            ticker = yf.Ticker(symbol)
-            history = ticker.history(start=start_date, end=end_date, timeout=10)
-            if not history.empty:
-                data[symbol] = history['Close']  # We only need closing prices
-                successful_fetches += 1
-                print(f"   ✓ Fetched {len(history)} days for {symbol}")
-            else:
-                print(f"⚠️ No data returned for {symbol}")
-        except Exception as e:
-            print(f"⚠️ Couldn't fetch {symbol}: {e}")
-
-    print(f"   Successfully fetched data for {successful_fetches}/{len(symbols)} symbols")
-    return pd.DataFrame(data)
+    for symbol, close in closes.items():
+        if not close.empty:
+            data[symbol] = close
+            print(f"   ✓ Fetched {len(close)} days for {symbol}")
+        else:
+            print(f"⚠️ No data returned for {symbol}")
+    for symbol, e in errors.items():
+        print(f"⚠️ Couldn't fetch {symbol}: {e}")
+
+    print(f"   Successfully fetched data for {len(data)}/{len(symbols)} symbols "
+          f"({scheduler.stats['retries']} retries)")
+    return align_prices(data)  # calendar-aware merge of 24/7 and exchange-hours assets
 
 # ═══════════════════════════════════════════════════════════════════════════
 # STEP 3: FEATURE ENGINEERING (The ML Magic!)
@@ -122,7 +140,7 @@ def calculate_correlations(df, target_col):
 # STEP 4: THE CLASSIFIER (Supervised Learning!)
 # ═══════════════════════════════════════════════════════════════════════════
 
-def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr):
+def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr, btc_lag_corr=None):
     """
     The brain of our system - classifies assets based on correlation patterns
 
@@ -147,6 +165,8 @@ def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr):
     ⚪ HOLD - Neutral territory
        - Weak correlations with everything
        - Example: Asset is range-bound, waiting for direction
+       - Unless it strongly leads or follows BTC at some lag (|lagged corr|
+         > 0.6): then it is not neutral, only out of step -> CAUTION
 
     🟣 ERRATIC - Unstable, conflicting signals
        - Bitcoin and Gold correlations disagree
@@ -157,9 +177,12 @@ def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr):
 
     Args:
         btc_corr: Correlation with Bitcoin
-        gold_corr: Correlation with Gold
+        gold_corr: Correlation with Gold (NaN when Gold is unavailable, which
+                   skips the Buy Long and Erratic rules)
         sp500_corr: Correlation with S&P 500 (currently not used in rules)
         usd_corr: Correlation with USD Index (currently not used in rules)
+        btc_lag_corr: Strongest non-contemporaneous return correlation with
+                      Bitcoin (optional, from the lead-lag scanner)
 
     Returns:
         Signal category as string
@@ -172,8 +195,10 @@ def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr):
     elif btc_corr < -0.6:
         return 'Buy Short'
 
-    # Rule 3: Neutral/low volatility
+    # Rule 3: Neutral/low volatility (unless BTC moves it with a delay)
     elif abs(btc_corr) < 0.3:
+        if btc_lag_corr is not None and abs(btc_lag_corr) > 0.6:
+            return 'Caution'
         return 'Hold'
 
     # Rule 4: Conflicting signals (risk-on vs risk-off disagree)
@@ -184,6 +209,123 @@ def classify_signal(btc_corr, gold_corr, sp500_corr, usd_corr):
     else:
         return 'Caution'
 
+
+def classify_signal_array(btc_corr, gold_corr, sp500_corr=None, usd_corr=None, btc_lag_corr=None):
+    """
+    Vectorized classify_signal: same five rules, applied to whole arrays
+
+    Used when classifying many assets, time steps or scenarios at once.
+
+    Args:
+        btc_corr, gold_corr: Arrays of correlations (any matching shape)
+        sp500_corr, usd_corr: Accepted for symmetry (not used in rules)
+        btc_lag_corr: Optional array of strongest lagged BTC correlations
+
+    Returns:
+        Array of signal category strings with the same shape
+    """
+    btc_corr = np.asarray(btc_corr)
+    gold_corr = np.asarray(gold_corr)
+    neutral = np.abs(btc_corr) < 0.3
+    lagged = np.zeros(neutral.shape, dtype=bool) if btc_lag_corr is None \
+        else np.abs(np.asarray(btc_lag_corr)) > 0.6
+    conditions = [
+        (btc_corr > 0.6) & (gold_corr > 0.3),
+        btc_corr < -0.6,
+        neutral & lagged,        # Rule 3 exception: BTC moves it with a delay
+        neutral,
+        ((btc_corr > 0) & (gold_corr < 0)) | ((btc_corr < 0) & (gold_corr > 0)),
+    ]
+    choices = ['Buy Long', 'Buy Short', 'Caution', 'Hold', 'Erratic']
+    return np.select(conditions, choices, default='Caution')
+
+def btc_lead_lag(full_df, assets):
+    """
+    Strongest non-contemporaneous return correlation of each asset with BTC,
+    from one batched lead-lag scan over lags -LEAD_LAG_MAX..LEAD_LAG_MAX.
+
+    Returns:
+        {asset: (lag, corr)} (lag > 0 = BTC leads); empty without BTC-USD
+        or enough bars
+    """
+    assets = [a for a in assets if a in full_df.columns]
+    if not assets or 'BTC-USD' not in full_df.columns or len(full_df) <= LEAD_LAG_MAX + 1:
+        return {}
+    returns = full_df[list(dict.fromkeys(assets + ['BTC-USD']))].pct_change().iloc[1:]
+    return {row.Asset: (row.Best_Lag, float(row.Best_Corr))
+            for row in lead_lag_scan(returns, assets, ['BTC-USD'], LEAD_LAG_MAX).itertuples()}
+
+
+def classify_universe(full_df, precision=3, assets=None):
+    """
+    Correlation features and signals for every crypto asset in full_df
+
+    Args:
+        full_df: Aligned prices with the macro drivers and crypto assets
+        precision: Decimals for the *_Corr columns (None = full precision,
+                   as recorded in the event log)
+        assets: Symbols to classify (default: CRYPTO_ASSETS); the CLI passes
+                its configured universe
+
+    Returns:
+        DataFrame with Asset, BTC_Corr, Gold_Corr, SP500_Corr, USD_Corr,
+        BTC_Lag (bars; > 0 = BTC leads), BTC_Lag_Corr, Signal
+    """
+    def fmt(x):
+        return x if precision is None else round(x, precision)
+
+    # Drivers can be missing (e.g. quarantined by validate_prices); the rules
+    # that need one are skipped rather than failing the whole batch
+    drivers = [d for d in MACRO_DRIVERS if d in full_df.columns]
+    missing = [d for d in MACRO_DRIVERS if d not in full_df.columns]
+    if 'BTC-USD' in missing:
+        print("   ⚠️ BTC-USD is missing - every rule needs it, no signals classified")
+        return pd.DataFrame()
+    if 'GC=F' in missing:
+        print("   ⚠️ GC=F (Gold) is missing - skipping the Buy Long and Erratic rules")
+    for driver in missing:
+        if driver != 'GC=F':
+            print(f"   ⚠️ {driver} ({MACRO_DRIVERS[driver]}) is missing - its correlation is left empty")
+
+    # Lead-lag of every crypto's returns against BTC's, in one batched scan
+    cryptos = [c for c in (assets or CRYPTO_ASSETS) if c in full_df.columns]
+    lead_lag = btc_lead_lag(full_df, cryptos)
+
+    results = []
+    for crypto in cryptos:
+        # Create mini-dataset for this crypto + the available macro drivers
+        crypto_df = full_df[[d for d in drivers if d != crypto] + [crypto]]
+
+        # Calculate correlation features (NaN for a missing driver, which
+        # makes every rule comparing against it false)
+        correlations = dict.fromkeys(missing, np.nan)
+        correlations.update(calculate_correlations(crypto_df, crypto))
+        if crypto in MACRO_DRIVERS:
+            correlations[crypto] = 1.0     # a driver classified as an asset
+
+        # Apply our classifier
+        lag, lag_corr = lead_lag.get(crypto, (0, None))
+        signal = classify_signal(
+            correlations['BTC-USD'],
+            correlations['GC=F'],
+            correlations['^GSPC'],
+            correlations['DX-Y.NYB'],
+            btc_lag_corr=lag_corr
+        )
+
+        # Store results
+        results.append({
+            'Asset': crypto.replace('-USD', ''),
+            'BTC_Corr': fmt(correlations['BTC-USD']),
+            'Gold_Corr': fmt(correlations['GC=F']),
+            'SP500_Corr': fmt(correlations['^GSPC']),
+            'USD_Corr': fmt(correlations['DX-Y.NYB']),
+            'BTC_Lag': lag,
+            'BTC_Lag_Corr': fmt(lag_corr if lag_corr is not None else 0.0),
+            'Signal': signal
+        })
+    return pd.DataFrame(results)
+
 # ═══════════════════════════════════════════════════════════════════════════
 # STEP 5: MAIN EXECUTION PIPELINE
 # ═══════════════════════════════════════════════════════════════════════════
@@ -210,42 +352,21 @@ def main():
     print("📊 [1/3] Fetching market data from Yahoo Finance...")
     all_symbols = list(MACRO_DRIVERS.keys()) + CRYPTO_ASSETS
     full_df = fetch_market_data(all_symbols)
-    full_df = full_df.dropna()  # Remove days with missing data
     print(f"✓ Loaded {len(full_df)} days of data for {len(full_df.columns)} assets")
+    issues = quality_issues(full_df.attrs.get('quality'))
+    for row in issues.itertuples():
+        print(f"   ⚠️ {row.Asset}: {row.Status.lower()} - {row.Quarantined} bad bars "
+              f"({row.Non_Positive} non-positive, {row.Stale} stale, {row.Spikes} spikes)")
 
     # ─── Phase 2: Feature Engineering & Classification ───
     print("\n🧮 [2/3] Computing correlations and classifying signals...")
-    results = []
-
-    for crypto in CRYPTO_ASSETS:
-        if crypto in full_df.columns:
-            # Create mini-dataset for this crypto + macro drivers
-            crypto_df = full_df[['BTC-USD', 'GC=F', '^GSPC', 'DX-Y.NYB', crypto]]
-
-            # Calculate correlation features
-            correlations = calculate_correlations(crypto_df, crypto)
-
-            # Apply our classifier
-            signal = classify_signal(
-                correlations.get('BTC-USD', 0),
-                correlations.get('GC=F', 0),
-                correlations.get('^GSPC', 0),
-                correlations.get('DX-Y.NYB', 0)
-            )
-
-            # Store results
-            results.append({
-                'Asset': crypto.replace('-USD', ''),
-                'BTC_Corr': round(correlations.get('BTC-USD', 0), 3),
-                'Gold_Corr': round(correlations.get('GC=F', 0), 3),
-                'SP500_Corr': round(correlations.get('^GSPC', 0), 3),
-                'USD_Corr': round(correlations.get('DX-Y.NYB', 0), 3),
-                'Signal': signal
-            })
+    snapshot = classify_universe(full_df, precision=None)  # full precision, for the event log
+    results_df = snapshot.copy()
+    corr_cols = [c for c in results_df.columns if c.endswith('_Corr')]
+    results_df[corr_cols] = results_df[corr_cols].round(3)
 
     # ─── Phase 3: Output Results ───
     print("\n💾 [3/3] Generating classification report...")
-    results_df = pd.DataFrame(results)
 
     if results_df.empty:
         print("\n⚠️  No data could be fetched. Please check your internet connection")
@@ -253,6 +374,12 @@ def main():
         return
 
     results_df.to_csv('crypto_signals_output.csv', index=False)
+    history_path = append_history('signals', results_df)  # append-only Parquet history
+    if 'quality' in full_df.attrs:
+        append_history('quality', full_df.attrs['quality'])
+    # Inputs + full-precision snapshot, replayable offline (backward7evin_eventlog.py verify)
+    event_log = EventLog()
+    seq = event_log.record(full_df, snapshot, RULESET_VERSION)
 
     # Display results
     print("\n" + "╔" + "═"*58 + "╗")
@@ -261,6 +388,9 @@ def main():
     print(results_df.to_string(index=False))
     print("\n" + "─"*60)
     print(f"💾 Results saved to: crypto_signals_output.csv")
+    if history_path:
+        print(f"🗄️  Snapshot appended to: {history_path}")
+    print(f"📼 Inputs and signals logged as snapshot {seq} in: {event_log.path}")
 
     # Summary statistics
     print("\n📈 Signal Distribution:")
@@ -0,0 +1,242 @@
+"""
+The Backward 7evin - Command Line Interface
+CS379 Machine Learning - One Entry Point for Every Universe
+
+backward7evin_simple.py, backward7evin_classifier.py and the v2 classifier
+each hard-code their universe and repeat the same fetch -> correlate ->
+classify steps. This CLI reads the universe and driver set from a JSON
+config (see config/), picks the 3-class or 5-class rule set, and splits the
+universe into shards classified by worker processes. 5-class shards run
+v2's classify_universe, so both write the same rows. The price matrix is
+placed in shared memory once (backward7evin_shared) instead of being
+pickled to each worker.
+
+    python backward7evin_cli.py --config config/crypto.json --workers 4
+    python backward7evin_cli.py --config config/simple.json --rules 3class
+    python backward7evin_cli.py --intraday intraday/1h --interval 1h --days 30
+
+With --intraday the prices come from an IntradayStore (backward7evin_intraday)
+instead of daily Yahoo closes: each run appends the newest 1h / 1m bars to
+the store and classifies the last --days days of them.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backward7evin_classifier import classify_signal as classify_3class
+from backward7evin_classifier_v2_enhanced import classify_signal as classify_5class
+from backward7evin_classifier_v2_enhanced import classify_universe, fetch_market_data
+from backward7evin_intraday import MAX_PERIOD, IntradayStore, fetch_intraday, intraday_prices
+from backward7evin_sink import append_history
+from backward7evin_shared import SharedDataset
+
+RULES = {'3class': classify_3class, '5class': classify_5class}
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'crypto.json')
+
+# Driver symbol -> result column
+DRIVER_COLUMNS = {'BTC-USD': 'BTC_Corr', 'GC=F': 'Gold_Corr', '^GSPC': 'SP500_Corr',
+                  'DX-Y.NYB': 'USD_Corr'}
+
+
+def load_config(path):
+    """
+    Read a universe config.
+
+    Returns:
+        Dict with 'assets' (list), 'drivers' ({symbol: name}), 'rules', 'days'
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if not config.get('assets') or not config.get('drivers'):
+        raise ValueError(f"{path}: config needs non-empty 'assets' and 'drivers'")
+    config.setdefault('rules', '5class')
+    config.setdefault('days', 90)
+    return config
+
+
+def load_intraday(path, symbols, interval='1h', days=None, fetch=True):
+    """
+    Prices for the universe from an intraday store, refreshed from Yahoo.
+
+    Args:
+        path: Store directory (created for `symbols` on first use; keep one
+              store per interval)
+        symbols: Universe symbols (drivers and assets)
+        interval: '1h' or '1m' bars to fetch
+        days: Days of history to classify (default: everything stored)
+        fetch: Append the newest bars before reading
+
+    Returns:
+        Aligned DataFrame of closes
+    """
+    store = IntradayStore(path, symbols=symbols)
+    missing = [s for s in symbols if s not in store.symbols]
+    if missing:
+        print(f"⚠️ Not in the intraday store at {path}: {', '.join(missing)}")
+    if fetch:
+        added = fetch_intraday(store, period=MAX_PERIOD[interval], interval=interval)
+        print(f"   ✓ {added} new {interval} bars appended ({store.n_rows} stored)")
+    return intraday_prices(store, [s for s in symbols if s in store.symbols], days)
+
+
+def classify_shard(handle, assets, labels, drivers, rules):
+    """
+    Classify one shard of the universe (runs in a worker process).
+
+    Args:
+        handle: SharedHandle of the price matrix (assets and drivers)
+        assets: Asset symbols in this shard
+        labels: Display names for the Asset column
+        drivers: Driver symbols
+        rules: '3class' or '5class'
+
+    Returns:
+        (result rows, seconds, worker pid)
+    """
+    start = time.perf_counter()
+    with SharedDataset.attach(handle) as ds:
+        if rules == '5class':
+            # The v2 pipeline itself, so CLI and v2 rows (and their shared
+            # Parquet history schema) cannot drift apart
+            symbols = list(dict.fromkeys(drivers + assets))
+            table = classify_universe(ds.frame().loc[:, symbols].copy(), assets=assets)
+            if not table.empty:
+                table['Asset'] = labels
+            return table.to_dict('records'), time.perf_counter() - start, os.getpid()
+        prices = ds['prices']
+        corr = _corr_columns(prices[:, ds.columns(assets)], prices[:, ds.columns(drivers)])
+
+    classify = RULES[rules]
+    rows = []
+    for i, asset in enumerate(assets):
+        c = {d: (0.0 if np.isnan(corr[i, j]) else float(corr[i, j])) for j, d in enumerate(drivers)}
+        row = {'Asset': labels[i]}
+        for symbol, column in DRIVER_COLUMNS.items():
+            row[column] = round(c.get(symbol, 0.0), 3)
+        row['Signal'] = classify(c.get('BTC-USD', 0), c.get('GC=F', 0), c.get('^GSPC', 0),
+                                 c.get('DX-Y.NYB', 0))
+        rows.append(row)
+    return rows, time.perf_counter() - start, os.getpid()
+
+
+def _corr_columns(x, y):
+    """Pearson correlation of every column of x with every column of y"""
+    xz = x - x.mean(axis=0)
+    yz = y - y.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (xz.T @ yz) / np.outer(np.sqrt((xz * xz).sum(axis=0)), np.sqrt((yz * yz).sum(axis=0)))
+
+
+def run_universe(prices, assets, drivers, rules='5class', workers=1, names=None):
+    """
+    Classify a universe, sharded across worker processes.
+
+    Args:
+        prices: Aligned DataFrame of closes (assets and drivers)
+        assets, drivers: Symbols to classify / correlate against
+        rules: '3class' or '5class'
+        workers: Worker processes (1 = run in this process)
+        names: Optional {symbol: display name} (default: symbol without '-USD')
+
+    Returns:
+        (results DataFrame, shard timings DataFrame)
+    """
+    if rules not in RULES:
+        raise ValueError(f"Unknown rule set {rules!r}; expected one of {tuple(RULES)}")
+    assets = [a for a in assets if a in prices.columns]
+    drivers = [d for d in drivers if d in prices.columns]
+    if not assets:
+        return pd.DataFrame(), pd.DataFrame()
+
+    names = names or {}
+    columns = drivers + [a for a in assets if a not in drivers]
+    shards = [list(s) for s in np.array_split(np.array(assets, dtype=object), max(1, workers))
+              if len(s)]
+    # Workers attach to the shared matrix; only symbol lists are pickled per shard
+    with SharedDataset.from_prices(prices[columns], returns=False) as ds:
+        jobs = [(ds.handle, shard, [names.get(a, a.replace('-USD', '')) for a in shard],
+                 drivers, rules) for shard in shards]
+        if workers <= 1:
+            outputs = [classify_shard(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(classify_shard, *zip(*jobs)))
+
+    rows, timings = [], []
+    for k, (shard_rows, seconds, pid) in enumerate(outputs):
+        rows.extend(shard_rows)
+        timings.append({'Shard': k, 'Assets': len(shard_rows), 'Seconds': round(seconds, 4), 'PID': pid})
+    return pd.DataFrame(rows), pd.DataFrame(timings)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="The Backward 7evin - correlation signal classifier")
+    parser.add_argument('--config', default=DEFAULT_CONFIG,
+                        help="Universe config JSON (default: config/crypto.json)")
+    parser.add_argument('--assets', nargs='+', help="Override the config's asset list")
+    parser.add_argument('--rules', choices=sorted(RULES), help="Rule set (default: from config)")
+    parser.add_argument('--days', type=int, help="Days of history (default: from config)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+    parser.add_argument('--intraday', metavar='DIR',
+                        help="Classify intraday bars from the store at DIR (created on first use)")
+    parser.add_argument('--interval', choices=sorted(MAX_PERIOD), default='1h',
+                        help="Intraday bar size to fetch into the store (default: 1h)")
+    parser.add_argument('--no-fetch', action='store_true',
+                        help="With --intraday, use only the bars already stored")
+    parser.add_argument('--output', default='crypto_signals_output.csv', help="Results CSV")
+    parser.add_argument('--no-history', action='store_true',
+                        help="Don't append results to the Parquet signal history")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config(args.config)
+    assets = args.assets or config['assets']
+    drivers = list(config['drivers'])
+    rules = args.rules or config['rules']
+    days = args.days or config['days']
+
+    symbols = drivers + [a for a in assets if a not in drivers]
+    if args.intraday:
+        print(f"📊 Loading {days} days of {args.interval} bars for {len(assets)} assets and "
+              f"{len(drivers)} drivers from {args.intraday}...")
+        prices = load_intraday(args.intraday, symbols, args.interval, days, fetch=not args.no_fetch)
+    else:
+        print(f"📊 Fetching {days} days for {len(assets)} assets and {len(drivers)} drivers...")
+        prices = fetch_market_data(symbols, days=days)
+    if prices.empty:
+        print("\n⚠️  No data could be fetched. Please check your internet connection")
+        print("    or try again later. Yahoo Finance may be rate-limiting requests.")
+        return
+
+    print(f"\n🧮 Classifying with {rules} rules on {args.workers} worker(s)...")
+    results, timings = run_universe(prices, assets, drivers, rules, args.workers,
+                                    names=config['drivers'])
+    if results.empty:
+        print("⚠️  None of the configured assets have data.")
+        return
+
+    print(results.to_string(index=False))
+    print("\n⏱️  Shard timings:")
+    print(timings.to_string(index=False))
+
+    results.to_csv(args.output, index=False)
+    print(f"\n💾 Results saved to: {args.output}")
+    if not args.no_history:
+        path = append_history('signals', results)
+        if path:
+            print(f"🗄️  Snapshot appended to: {path}")
+    print("\n📈 Signal Distribution:")
+    print(results['Signal'].value_counts())
+
+
+if __name__ == "__main__":
+    main()
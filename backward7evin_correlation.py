@@ -0,0 +1,278 @@
+"""
+The Backward 7evin - Universe Correlation Engine
+CS379 Machine Learning - Correlation Matrices & Clustering at Scale
+
+`DataFrame.corr()` is fine for four columns but not for thousands of
+symbols. This module standardizes the data once (float32) and builds the
+correlation matrix block by block with matrix products. Missing values are
+excluded pairwise, as in DataFrame.corr(), so symbols with different listing
+dates each keep their full history. Top-k pair search
+streams over those blocks, so the full N x N matrix never has to exist.
+Hierarchical clustering groups assets into correlation regimes and gives a
+leaf ordering for clustered, downsampled heatmaps.
+"""
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, fcluster, leaves_list
+from scipy.spatial.distance import squareform
+
+from backward7evin_shared import SharedDataset
+
+# Columns per block: a 1024 x 1024 float32 block is 4 MB
+BLOCK_SIZE = 1024
+
+# Overlapping observations a pair needs for its correlation to be defined
+MIN_PERIODS = 3
+
+
+def standardize(values):
+    """
+    Z-score each column (float32) over its own valid observations.
+
+    Missing values become 0 and are tracked in a mask, so that later sums
+    only use the rows where both assets of a pair are present (pairwise,
+    like DataFrame.corr()). Constant columns become 0.
+
+    Args:
+        values: 2-D array or DataFrame, rows = observations, columns = assets
+
+    Returns:
+        (z, mask) - float32 z-scores [n_rows, n_assets] and the float32
+        validity mask of the same shape, or None when nothing is missing
+    """
+    x = np.asarray(values, dtype=np.float32)
+    valid = ~np.isnan(x)
+    # Too few rows goes through the masked path too, where pairs with
+    # fewer than MIN_PERIODS overlapping rows come out NaN
+    if valid.all() and len(x) >= MIN_PERIODS:
+        z = x - x.mean(axis=0)
+        std = z.std(axis=0)
+        mask = None
+    else:
+        counts = valid.sum(axis=0)
+        filled = np.where(valid, x, 0.0).astype(np.float32)
+        mean = filled.sum(axis=0) / np.maximum(counts, 1)
+        z = np.where(valid, x - mean, 0.0).astype(np.float32)
+        std = np.sqrt((z * z).sum(axis=0) / np.maximum(counts, 1))
+        mask = valid.astype(np.float32)
+    std[std == 0] = np.inf
+    z /= std
+    return z, mask
+
+
+def _correlation_block(z, mask, i, j, block_size):
+    """corr[i:i + block_size, j:j + block_size] from standardized data"""
+    zi, zj = z[:, i:i + block_size], z[:, j:j + block_size]
+    if mask is None:
+        block = zi.T @ zj
+        block /= z.shape[0]
+        return block
+    # Pairwise-complete sums: zero-filled values times the other column's mask
+    mi, mj = mask[:, i:i + block_size], mask[:, j:j + block_size]
+    count = mi.T @ mj
+    sx, sy = zi.T @ mj, mi.T @ zj
+    sxx, syy = (zi * zi).T @ mj, mi.T @ (zj * zj)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = zi.T @ zj - sx * sy / count
+        var_x = sxx - sx * sx / count
+        var_y = syy - sy * sy / count
+        block = cov / np.sqrt(var_x * var_y)
+    block[count < MIN_PERIODS] = np.nan
+    return block
+
+
+def iter_correlation_blocks(z, mask=None, block_size=BLOCK_SIZE):
+    """
+    Yield upper-triangular correlation blocks from standardized data.
+
+    Args:
+        z, mask: Output of standardize
+
+    Yields:
+        (row_start, col_start, block) with block = corr[rows, cols] as float32
+        (NaN where a pair has fewer than MIN_PERIODS overlapping rows)
+    """
+    n_assets = z.shape[1]
+    for i in range(0, n_assets, block_size):
+        for j in range(i, n_assets, block_size):
+            yield i, j, _correlation_block(z, mask, i, j, block_size)
+
+
+def _fill_block_row(z, mask, corr, i, block_size):
+    """Write correlation blocks (i, j >= i) and their mirrors into corr"""
+    for j in range(i, z.shape[1], block_size):
+        block = _correlation_block(z, mask, i, j, block_size)
+        bi, bj = block.shape
+        corr[i:i + bi, j:j + bj] = block
+        corr[j:j + bj, i:i + bi] = block.T
+
+
+def _shared_block_row(args):
+    """Process-pool worker: fill one block row of the shared output matrix"""
+    handle, i, block_size = args
+    with SharedDataset.attach(handle, writable=True) as ds:
+        _fill_block_row(ds['z'], ds['mask'] if 'mask' in ds else None, ds['corr'], i, block_size)
+
+
+def correlation_matrix(values, block_size=BLOCK_SIZE, workers=1):
+    """
+    Full correlation matrix built blockwise in float32.
+
+    Missing values are excluded pairwise, as in DataFrame.corr(): pairs
+    with fewer than MIN_PERIODS overlapping rows (including every pair when
+    there are no rows at all) and constant columns are NaN.
+
+    Args:
+        values: DataFrame (columns become the labels) or 2-D array
+        workers: Processes to spread block rows over; the standardized data
+                 and the output live in shared memory, so nothing large is
+                 pickled
+
+    Returns:
+        DataFrame if a DataFrame was given, else a float32 array [n, n]
+    """
+    z, mask = standardize(values)
+    n = z.shape[1]
+    rows = range(0, n, block_size)
+    if workers > 1 and len(rows) > 1:
+        arrays = {'z': z, 'corr': np.empty((n, n), dtype=np.float32)}
+        if mask is not None:
+            arrays['mask'] = mask
+        with SharedDataset.create(arrays) as ds:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_shared_block_row, [(ds.handle, i, block_size) for i in rows]))
+            corr = np.array(ds['corr'])
+    else:
+        corr = np.empty((n, n), dtype=np.float32)
+        for i in rows:
+            _fill_block_row(z, mask, corr, i, block_size)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    # 1 on the diagonal of every column that has a defined correlation at all
+    counts = z.shape[0] if mask is None else mask.sum(axis=0)
+    defined = (z != 0).any(axis=0) & (counts >= MIN_PERIODS)
+    np.fill_diagonal(corr, np.where(defined, 1.0, np.nan))
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(corr, index=values.columns, columns=values.columns)
+    return corr
+
+
+def top_k_pairs(values, k=20, largest=True, block_size=BLOCK_SIZE, labels=None):
+    """
+    Find the k most (or least) correlated asset pairs without keeping N x N.
+
+    Each block is reduced with argpartition and merged into a size-k heap,
+    so memory is one block plus k candidates.
+
+    Args:
+        values: DataFrame or 2-D array, rows = observations
+        k: Number of pairs to return
+        largest: True for most correlated, False for most negatively correlated
+
+    Returns:
+        DataFrame with columns Asset_A, Asset_B, Correlation (sorted); fewer
+        than k rows if fewer pairs have a defined correlation
+    """
+    if labels is None:
+        labels = list(values.columns) if isinstance(values, pd.DataFrame) else list(range(np.shape(values)[1]))
+    z, mask = standardize(values)
+    sign = 1.0 if largest else -1.0
+    heap = []  # (signed corr, i, j), smallest signed value on top
+
+    for i0, j0, block in iter_correlation_blocks(z, mask, block_size):
+        scored = block * sign
+        scored[np.isnan(scored)] = -np.inf   # undefined pairs never rank
+        if i0 == j0:
+            # Same block on both axes: keep only pairs above the diagonal
+            scored[np.tril_indices_from(scored)] = -np.inf
+        flat = scored.ravel()
+        take = min(k, flat.size)
+        idx = np.argpartition(flat, flat.size - take)[flat.size - take:]
+        for f in idx:
+            val = float(flat[f])
+            if val == -np.inf:
+                continue
+            bi, bj = divmod(int(f), block.shape[1])
+            item = (val, i0 + bi, j0 + bj)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    rows = [
+        {'Asset_A': labels[i], 'Asset_B': labels[j], 'Correlation': round(val * sign, 4)}
+        for val, i, j in sorted(heap, reverse=True)
+    ]
+    return pd.DataFrame(rows, columns=['Asset_A', 'Asset_B', 'Correlation'])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLUSTERING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def cluster_assets(corr, n_clusters=5, method='average'):
+    """
+    Group assets into correlation regimes with hierarchical clustering.
+
+    Distance is sqrt(2 * (1 - rho)), which is 0 for perfectly correlated
+    assets and 2 for perfectly anti-correlated ones.
+
+    Args:
+        corr: Correlation matrix (DataFrame or square array)
+        n_clusters: Number of regimes to cut the dendrogram into
+        method: scipy linkage method
+
+    Returns:
+        (labels, order) - cluster id per asset (1..n_clusters) and the
+        dendrogram leaf order for plotting
+    """
+    c = np.nan_to_num(np.asarray(corr, dtype=np.float64), nan=0.0)  # undefined = uncorrelated
+    dist = np.sqrt(np.clip(2.0 * (1.0 - c), 0.0, None))
+    np.fill_diagonal(dist, 0.0)
+    dist = (dist + dist.T) / 2
+    tree = linkage(squareform(dist, checks=False), method=method)
+    labels = fcluster(tree, t=n_clusters, criterion='maxclust')
+    order = leaves_list(tree)
+    if isinstance(corr, pd.DataFrame):
+        labels = pd.Series(labels, index=corr.index, name='Cluster')
+    return labels, order
+
+
+def clustered_heatmap_view(corr, max_size=200, n_clusters=5):
+    """
+    Reorder a correlation matrix by cluster and downsample it for display.
+
+    Matrices larger than max_size are block-averaged along the clustered
+    order, so a heatmap of thousands of assets stays a few hundred cells wide.
+
+    Returns:
+        DataFrame of at most max_size x max_size cells. Labels are asset
+        names, or 'first … last' ranges for averaged groups.
+    """
+    if not isinstance(corr, pd.DataFrame):
+        corr = pd.DataFrame(corr)
+    if len(corr) < 3:
+        return corr
+    _, order = cluster_assets(corr, n_clusters=min(n_clusters, len(corr)))
+    values = corr.values[np.ix_(order, order)].astype(np.float32)
+    names = [str(corr.index[i]) for i in order]
+
+    n = len(names)
+    if n <= max_size:
+        return pd.DataFrame(values, index=names, columns=names)
+
+    # Block-average along the clustered order (over the defined cells)
+    edges = np.linspace(0, n, max_size + 1).astype(int)
+    defined = (~np.isnan(values)).astype(np.float32)
+    sums = np.add.reduceat(np.add.reduceat(np.nan_to_num(values), edges[:-1], axis=0), edges[:-1], axis=1)
+    counts = np.add.reduceat(np.add.reduceat(defined, edges[:-1], axis=0), edges[:-1], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        view = sums / counts
+    group_names = [
+        names[a] if b - a == 1 else f'{names[a]} … {names[b - 1]}'
+        for a, b in zip(edges[:-1], edges[1:])
+    ]
+    return pd.DataFrame(view, index=group_names, columns=group_names)
@@ -0,0 +1,422 @@
+"""
+The Backward 7evin - Signal Event Log
+CS379 Machine Learning - Append-Only Inputs & Deterministic Replay
+
+crypto_signals_output.csv is overwritten on every run and the inputs are
+refetched from Yahoo, so a flipped signal can't be explained afterwards.
+EventLog appends every run to one compressed, append-only file:
+
+- 'bars' events: the aligned input bars, as raw float64 / int64 bytes.
+  Only rows that are new or changed since the log's current state are
+  written, so revised closes are recorded as revisions
+- 'snapshot' events: the ruleset / model version, the exact input window
+  and the emitted table (correlation features at full precision + signals)
+
+Each frame is  magic | kind | length | crc32 | zlib(payload) ; a torn frame
+at the end of the file (crash mid-write) is ignored by readers and cut off
+before the next append. Replay rebuilds the
+bar state in memory and slices each snapshot's window back out, so the
+inputs come back bit-for-bit with no network:
+
+    python backward7evin_eventlog.py list
+    python backward7evin_eventlog.py verify        # recompute every snapshot
+    python backward7evin_eventlog.py benchmark     # a month of minute bars
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+LOG_PATH = os.path.join('signal_history', 'events.log')
+MAGIC = b'B7EV'
+KINDS = {1: 'bars', 2: 'snapshot'}
+KIND_CODES = {name: code for code, name in KINDS.items()}
+_FRAME = struct.Struct('<4sBII')   # magic, kind, payload length, crc32
+
+
+def _utc_ns(index):
+    """DatetimeIndex -> int64 ns since epoch (UTC), plus the tz to restore"""
+    index = pd.DatetimeIndex(index)
+    tz = None if index.tz is None else str(index.tz)
+    if tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.to_numpy(dtype='datetime64[ns]').view(np.int64), tz
+
+
+def _to_index(ns, tz):
+    index = pd.DatetimeIndex(np.asarray(ns, dtype=np.int64).view('datetime64[ns]'))
+    return index if tz is None else index.tz_localize('UTC').tz_convert(tz)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FRAME ENCODING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def encode_bars(ns, columns, values, tz=None):
+    header = json.dumps({'columns': list(columns), 'rows': len(ns), 'tz': tz}).encode()
+    return (struct.pack('<I', len(header)) + header
+            + np.ascontiguousarray(ns, dtype='<i8').tobytes()
+            + np.ascontiguousarray(values, dtype='<f8').tobytes())
+
+
+def decode_bars(payload):
+    (n_header,) = struct.unpack_from('<I', payload)
+    header = json.loads(payload[4:4 + n_header])
+    rows, cols = header['rows'], len(header['columns'])
+    offset = 4 + n_header
+    ns = np.frombuffer(payload, dtype='<i8', count=rows, offset=offset)
+    values = np.frombuffer(payload, dtype='<f8', count=rows * cols,
+                           offset=offset + 8 * rows).reshape(rows, cols)
+    return ns, header['columns'], values, header['tz']
+
+
+class _BarState:
+    """All bars seen so far: sorted int64 index x growing column set"""
+
+    def __init__(self):
+        self.columns = []
+        self.ns = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, 0))
+        self.n = 0
+        self.tz = None
+
+    def _column_positions(self, columns):
+        new = [c for c in columns if c not in self.columns]
+        if new:
+            self.columns += new
+            pad = np.full((self.values.shape[0], len(new)), np.nan)
+            self.values = np.hstack([self.values, pad])
+        return [self.columns.index(c) for c in columns]
+
+    def apply(self, ns, columns, values, tz=None):
+        """Upsert rows (later events overwrite earlier values at the same timestamp)"""
+        self.tz = tz
+        cols = self._column_positions(columns)
+        pos = np.searchsorted(self.ns[:self.n], ns)
+        exists = (pos < self.n) & (self.ns[np.minimum(pos, max(self.n - 1, 0))] == ns) \
+            if self.n else np.zeros(len(ns), dtype=bool)
+        self.values[np.ix_(pos[exists], cols)] = values[exists]
+
+        new_ns, new_values = ns[~exists], values[~exists]
+        if len(new_ns) == 0:
+            return
+        rows = np.full((len(new_ns), len(self.columns)), np.nan)
+        rows[:, cols] = new_values
+        if self.n == 0 or new_ns[0] > self.ns[self.n - 1]:
+            # Common case: bars after the last one, into amortized-growth buffers
+            need = self.n + len(new_ns)
+            if need > len(self.ns):
+                capacity = max(need, 2 * len(self.ns), 1024)
+                grown = np.full((capacity, len(self.columns)), np.nan)
+                grown[:self.n] = self.values[:self.n]
+                self.values = grown
+                self.ns = np.resize(self.ns, capacity)
+            self.ns[self.n:need] = new_ns
+            self.values[self.n:need] = rows
+            self.n = need
+        else:
+            ns_all = np.concatenate([self.ns[:self.n], new_ns])
+            order = np.argsort(ns_all, kind='stable')
+            self.ns = ns_all[order]
+            self.values = np.vstack([self.values[:self.n], rows])[order]
+            self.n = len(self.ns)
+
+    def lookup(self, ns, columns):
+        """Current values at timestamps ns (NaN where unknown), plus a found mask"""
+        out = np.full((len(ns), len(columns)), np.nan)
+        if self.n == 0:
+            return out, np.zeros(len(ns), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.ns[:self.n], ns), self.n - 1)
+        found = self.ns[pos] == ns
+        for k, c in enumerate(columns):
+            if c in self.columns:
+                out[found, k] = self.values[pos[found], self.columns.index(c)]
+        return out, found
+
+    def window(self, start, end, columns, ns=None):
+        """Bars of a snapshot window (explicit ns if the snapshot recorded one)"""
+        if ns is None:
+            lo = np.searchsorted(self.ns[:self.n], start, side='left')
+            hi = np.searchsorted(self.ns[:self.n], end, side='right')
+            ns = self.ns[lo:hi]
+        values, _ = self.lookup(np.asarray(ns, dtype=np.int64), columns)
+        return pd.DataFrame(values, index=_to_index(ns, self.tz), columns=columns)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EVENT LOG
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EventLog:
+    """Append-only, compressed log of input bars and emitted signal snapshots"""
+
+    def __init__(self, path=LOG_PATH, level=6):
+        self.path = path
+        self.level = level
+        self._state = None     # bar state after the last event, built on first append
+        self._seq = None
+        self._valid_end = 0    # byte offset after the last intact frame read
+
+    # ───────────────────────── reading ─────────────────────────
+
+    def frames(self):
+        """Yield (kind, raw payload) for every intact frame, in order"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        offset = self._valid_end = 0
+        while offset + _FRAME.size <= len(data):
+            magic, kind, length, crc = _FRAME.unpack_from(data, offset)
+            body = data[offset + _FRAME.size:offset + _FRAME.size + length]
+            if magic != MAGIC or len(body) < length or zlib.crc32(body) != crc:
+                break      # torn or corrupt tail: everything before it is valid
+            offset += _FRAME.size + length
+            self._valid_end = offset
+            yield KINDS[kind], zlib.decompress(body)
+
+    def snapshots(self):
+        """Snapshot metadata: Seq, Run_ts, Ruleset, Model, Start, End, Rows, Assets"""
+        rows = []
+        for kind, payload in self.frames():
+            if kind == 'snapshot':
+                snap = json.loads(payload)
+                rows.append({'Seq': snap['seq'], 'Run_ts': snap['run_ts'], 'Ruleset': snap['ruleset'],
+                             'Model': snap['model'], 'Start': str(_to_index([snap['start']], snap['tz'])[0]),
+                             'End': str(_to_index([snap['end']], snap['tz'])[0]),
+                             'Rows': snap['rows'], 'Assets': len(snap['table'])})
+        return pd.DataFrame(rows)
+
+    def replay(self, seqs=None):
+        """
+        Rebuild snapshots from the log alone.
+
+        Args:
+            seqs: Snapshot sequence numbers to yield (default: all)
+
+        Yields:
+            (snapshot dict, input prices DataFrame, logged table DataFrame)
+        """
+        wanted = None if seqs is None else set(seqs)
+        state = _BarState()
+        for kind, payload in self.frames():
+            if kind == 'bars':
+                state.apply(*decode_bars(payload))
+                continue
+            snap = json.loads(payload)
+            if wanted is not None and snap['seq'] not in wanted:
+                continue
+            prices = state.window(snap['start'], snap['end'], snap['columns'], snap.get('index'))
+            yield snap, prices, pd.DataFrame(snap['table'], columns=snap['table_columns'])
+
+    def snapshot(self, seq):
+        """(snapshot dict, prices, table) of one snapshot"""
+        for found in self.replay([seq]):
+            return found
+        raise KeyError(f"No snapshot {seq} in {self.path}")
+
+    # ───────────────────────── writing ─────────────────────────
+
+    def _write(self, kind, payload):
+        body = zlib.compress(payload, self.level)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(_FRAME.pack(MAGIC, KIND_CODES[kind], len(body), zlib.crc32(body)) + body)
+        return len(body)
+
+    def _load_state(self):
+        if self._state is None:
+            self._state, self._seq = _BarState(), 0
+            for kind, payload in self.frames():
+                if kind == 'bars':
+                    self._state.apply(*decode_bars(payload))
+                else:
+                    self._seq = json.loads(payload)['seq'] + 1
+            # Drop a torn tail so new frames stay reachable
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self._valid_end:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(self._valid_end)
+        return self._state
+
+    def append_bars(self, prices):
+        """
+        Log the bars of `prices` that are new or differ from the logged state.
+
+        Returns:
+            Number of rows written
+        """
+        state = self._load_state()
+        ns, tz = _utc_ns(prices.index)
+        columns = [str(c) for c in prices.columns]
+        values = prices.to_numpy(dtype=np.float64)
+        current, found = state.lookup(ns, columns)
+        same = (current == values) | (np.isnan(current) & np.isnan(values))
+        changed = ~found | ~same.all(axis=1)
+        if not changed.any():
+            return 0
+        self._write('bars', encode_bars(ns[changed], columns, values[changed], tz))
+        state.apply(ns[changed], columns, values[changed], tz)
+        return int(changed.sum())
+
+    def record(self, prices, table, ruleset, model=None, run_ts=None):
+        """
+        Log a run: its input bars, then the snapshot computed from them.
+
+        Args:
+            prices: Exact input DataFrame the table was computed from
+            table: Emitted table (features at full precision + signals)
+            ruleset: Version of the classification rules
+            model: Optional model version / fingerprint
+
+        Returns:
+            Sequence number of the snapshot
+        """
+        self.append_bars(prices)
+        state = self._state
+        ns, tz = _utc_ns(prices.index)
+        columns = [str(c) for c in prices.columns]
+        run_ts = pd.Timestamp.now(tz='UTC') if run_ts is None else pd.Timestamp(run_ts)
+        snap = {
+            'seq': self._seq, 'run_ts': run_ts.isoformat(), 'ruleset': ruleset, 'model': model,
+            'start': int(ns[0]), 'end': int(ns[-1]), 'rows': len(ns), 'tz': tz, 'columns': columns,
+            'table_columns': [str(c) for c in table.columns],
+            'table': table.astype(object).where(table.notna(), None).values.tolist(),
+        }
+        # Record the exact rows when the window slice would not reproduce them
+        window = state.ns[np.searchsorted(state.ns[:state.n], ns[0]):
+                          np.searchsorted(state.ns[:state.n], ns[-1], side='right')]
+        if len(window) != len(ns) or not np.array_equal(window, ns):
+            snap['index'] = ns.tolist()
+        self._write('snapshot', json.dumps(snap).encode())
+        self._seq += 1
+        return snap['seq']
+
+    # ───────────────────────── verification ─────────────────────────
+
+    def verify(self, compute, ruleset=None):
+        """
+        Recompute every snapshot offline and compare bit-for-bit.
+
+        Args:
+            compute: Callable prices -> table (same columns as logged)
+            ruleset: Only verify snapshots of this ruleset (others are skipped)
+
+        Returns:
+            DataFrame per snapshot: Seq, Run_ts, Ruleset, Match, Mismatched_Cells
+        """
+        rows = []
+        for snap, prices, logged in self.replay():
+            if ruleset is not None and snap['ruleset'] != ruleset:
+                continue
+            fresh = compute(prices).reset_index(drop=True)
+            mismatched = _mismatched_cells(logged, fresh)
+            rows.append({'Seq': snap['seq'], 'Run_ts': snap['run_ts'], 'Ruleset': snap['ruleset'],
+                         'Match': mismatched == 0, 'Mismatched_Cells': mismatched})
+        return pd.DataFrame(rows)
+
+
+def _mismatched_cells(logged, fresh):
+    """Cells that differ (floats compared exactly, NaN == NaN)"""
+    if list(logged.columns) != list(fresh.columns) or len(logged) != len(fresh):
+        return max(logged.size, fresh.size, 1)
+    count = 0
+    for col in logged.columns:
+        a, b = logged[col].to_numpy(), fresh[col].to_numpy()
+        if pd.api.types.is_numeric_dtype(fresh[col]):
+            a, b = a.astype(np.float64), b.astype(np.float64)
+            count += int((~((a == b) | (np.isnan(a) & np.isnan(b)))).sum())
+        else:
+            count += int((a != b).sum())
+    return count
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BENCHMARK & CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _window_table(prices, assets, drivers):
+    """Lightweight snapshot table for the benchmark: correlations + v2 signals"""
+    from backward7evin_classifier_v2_enhanced import btc_lead_lag, classify_signal_array
+    corr = np.corrcoef(prices.to_numpy(), rowvar=False)
+    cols = list(prices.columns)
+    table = pd.DataFrame({'Asset': assets})
+    for d in drivers:
+        table[f'{d}_Corr'] = [corr[cols.index(a), cols.index(d)] for a in assets]
+    lead_lag = btc_lead_lag(prices, assets)
+    table['BTC_Lag_Corr'] = [lead_lag.get(a, (0, np.nan))[1] for a in assets]
+    table['Signal'] = classify_signal_array(table[f'{drivers[0]}_Corr'], table[f'{drivers[1]}_Corr'],
+                                            btc_lag_corr=table['BTC_Lag_Corr'])
+    return table
+
+
+def benchmark(path, days=30, n_assets=14, window=240, every=60, seed=3):
+    """
+    Log a month of synthetic minute bars (one snapshot per `every` bars over
+    the last `window` bars), then time a full offline replay + verification.
+    """
+    rng = np.random.default_rng(seed)
+    n = days * 24 * 60
+    index = pd.date_range('2024-09-01', periods=n, freq='min', tz='UTC')
+    columns = ['BTC-USD', 'GC=F'] + [f'A{i}-USD' for i in range(n_assets - 2)]
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 1e-3, (n, n_assets)), axis=0)),
+                          index=index, columns=columns)
+    assets, drivers = columns[2:], columns[:2]
+    compute = lambda p: _window_table(p, assets, drivers)
+
+    if os.path.exists(path):
+        os.remove(path)
+    log = EventLog(path)
+    start = time.perf_counter()
+    for end in range(window, n + 1, every):
+        chunk = prices.iloc[end - window:end]
+        log.record(chunk, compute(chunk), ruleset='bench', run_ts=chunk.index[-1])
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_snapshots = sum(1 for _ in log.replay())
+    replay_s = time.perf_counter() - start
+    start = time.perf_counter()
+    report = log.verify(compute)
+    verify_s = time.perf_counter() - start
+    return {'bars': n, 'assets': n_assets, 'snapshots': n_snapshots,
+            'log_MB': round(os.path.getsize(path) / 2**20, 2), 'write_s': round(write_s, 2),
+            'replay_s': round(replay_s, 2), 'verify_s': round(verify_s, 2),
+            'all_match': bool(report['Match'].all())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="The Backward 7evin - signal event log")
+    parser.add_argument('command', choices=['list', 'show', 'verify', 'benchmark'])
+    parser.add_argument('--log', default=LOG_PATH, help="Event log file")
+    parser.add_argument('--seq', type=int, help="Snapshot to show")
+    args = parser.parse_args(argv)
+
+    if args.command == 'benchmark':
+        path = os.path.join('signal_history', 'benchmark_events.log')
+        print(pd.Series(benchmark(path)).to_string())
+        os.remove(path)
+        return
+
+    log = EventLog(args.log)
+    if args.command == 'list':
+        print(log.snapshots().to_string(index=False))
+    elif args.command == 'show':
+        snap, prices, table = log.snapshot(args.seq)
+        print(f"Snapshot {snap['seq']} ({snap['ruleset']}) at {snap['run_ts']}: "
+              f"{len(prices)} bars x {len(prices.columns)} symbols")
+        print(table.to_string(index=False))
+    else:
+        from backward7evin_classifier_v2_enhanced import RULESET_VERSION, classify_universe
+        report = log.verify(lambda p: classify_universe(p, precision=None), ruleset=RULESET_VERSION)
+        print(report.to_string(index=False))
+        print(f"\n{int(report['Match'].sum())}/{len(report)} snapshots reproduced bit-for-bit")
+
+
+if __name__ == "__main__":
+    main()
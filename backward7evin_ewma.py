@@ -0,0 +1,213 @@
+"""
+The Backward 7evin - EWMA Engine
+CS379 Machine Learning - Constant-Memory Correlation & Volatility
+
+Fixed windows (rolling(20).corr, rolling(10).std, rolling(14).mean) need the
+whole window in memory and a recompute per bar. Exponentially weighted
+statistics carry the same information in a handful of running moments:
+
+- EW mean and covariance of returns (West's incremental update)
+- EW volatility and correlation derived from the covariance
+- Wilder-smoothed RSI (alpha = 1 / period)
+
+EWMAEngine updates all of them in O(1) time and memory per bar per pair
+(streaming mode, live signals). ewma_features computes the same recursions
+for a whole history at once with scipy.signal.lfilter (batch mode, model
+features).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from backward7evin_kernels import ema
+
+
+def span_to_alpha(span):
+    """pandas-compatible smoothing factor: alpha = 2 / (span + 1)"""
+    return 2.0 / (span + 1.0)
+
+
+class EWMAEngine:
+    """Streaming EW mean/covariance of returns plus Wilder RSI for n series"""
+
+    def __init__(self, names, span=20, rsi_period=14):
+        """
+        Args:
+            names: Series names (e.g. ['BTC', 'ETH', 'Gold'])
+            span: EW span for returns moments (alpha = 2 / (span + 1))
+            rsi_period: Wilder RSI period (alpha = 1 / period)
+        """
+        self.names = list(names)
+        self.alpha = span_to_alpha(span)
+        self.rsi_period = rsi_period
+        n = len(self.names)
+        self.last_price = None
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+        self.avg_gain = np.zeros(n)
+        self.avg_loss = np.zeros(n)
+        self.n_returns = 0
+
+    def update(self, prices):
+        """
+        Consume one bar of prices.
+
+        Missing prices (NaN) are treated as unchanged from the last bar.
+
+        Args:
+            prices: Array-like of closes in self.names order
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.last_price is None:
+            self.last_price = prices.copy()
+            return
+        prices = np.where(np.isnan(prices), self.last_price, prices)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret = np.nan_to_num(prices / self.last_price - 1.0)
+        change = np.nan_to_num(prices - self.last_price)
+        self.last_price = prices
+
+        if self.n_returns == 0:
+            self.mean = ret.copy()
+        else:
+            a = self.alpha
+            d = ret - self.mean
+            self.mean += a * d
+            self.cov = (1.0 - a) * (self.cov + a * np.outer(d, d))
+
+        # Wilder smoothing: simple average over the first `period` changes, then EW
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        self.n_returns += 1
+        if self.n_returns <= self.rsi_period:
+            self.avg_gain += (gain - self.avg_gain) / self.n_returns
+            self.avg_loss += (loss - self.avg_loss) / self.n_returns
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.rsi_period
+            self.avg_loss += (loss - self.avg_loss) / self.rsi_period
+
+    def volatility(self):
+        """EW standard deviation of returns per series"""
+        return np.sqrt(np.diag(self.cov))
+
+    def correlation(self):
+        """EW correlation matrix of returns"""
+        vol = self.volatility()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.cov / np.outer(vol, vol)
+        return np.clip(corr, -1.0, 1.0)
+
+    def rsi(self):
+        """Wilder RSI per series (NaN until `rsi_period` changes have been seen)"""
+        if self.n_returns < self.rsi_period:
+            return np.full(len(self.names), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = self.avg_gain / self.avg_loss
+        return 100.0 - 100.0 / (1.0 + rs)
+
+    def snapshot(self, base=None):
+        """
+        Current statistics as a flat dict of live features.
+
+        Args:
+            base: Name to report correlations against (e.g. 'BTC')
+        """
+        vol, rsi = self.volatility(), self.rsi()
+        out = {}
+        for i, name in enumerate(self.names):
+            out[f'{name}_ewm_vol'] = vol[i]
+            out[f'{name}_RSI_wilder'] = rsi[i]
+        if base is not None:
+            corr = self.correlation()
+            b = self.names.index(base)
+            for i, name in enumerate(self.names):
+                if i != b:
+                    out[f'ewm_corr_{name}_{base}'] = corr[i, b]
+        return out
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BATCH MODE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def ewm_mean(x, alpha):
+    """EW mean along axis 0, seeded with the first row (pandas adjust=False)"""
+    return ema(x, alpha=alpha)
+
+
+def wilder_rsi(prices, period=14):
+    """
+    Wilder RSI for a whole history (matches EWMAEngine.rsi bar for bar).
+
+    Args:
+        prices: Array [T] or [T, n] of closes
+
+    Returns:
+        Array of the same shape, NaN for the first `period` bars
+    """
+    p = np.asarray(prices, dtype=np.float64)
+    change = np.zeros_like(p)
+    change[1:] = np.nan_to_num(np.diff(p, axis=0))
+    gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+
+    out = np.full(p.shape, np.nan)
+    if len(p) <= period:
+        return out
+    alpha = 1.0 / period
+    # Seed with the simple average of the first `period` changes, then smooth
+    seed_gain = gain[1:period + 1].mean(axis=0)
+    seed_loss = loss[1:period + 1].mean(axis=0)
+    b, a = [alpha], [1.0, alpha - 1.0]
+    avg_gain, _ = lfilter(b, a, gain[period + 1:], axis=0, zi=[(1.0 - alpha) * seed_gain])
+    avg_loss, _ = lfilter(b, a, loss[period + 1:], axis=0, zi=[(1.0 - alpha) * seed_loss])
+    avg_gain = np.concatenate([seed_gain[None] if p.ndim > 1 else [seed_gain], avg_gain])
+    avg_loss = np.concatenate([seed_loss[None] if p.ndim > 1 else [seed_loss], avg_loss])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[period:] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+def ewma_features(prices, span=20, rsi_period=14, base='BTC'):
+    """
+    EW volatility, EW correlation with `base` and Wilder RSI for every column.
+
+    Produces the same numbers EWMAEngine would report after each bar, so a
+    model trained on these features can be fed live engine snapshots.
+
+    Args:
+        prices: DataFrame of closes (rows = bars)
+        span: EW span for returns moments
+        rsi_period: Wilder RSI period
+        base: Column to correlate against (skipped if absent)
+
+    Returns:
+        DataFrame aligned to prices.index (first row NaN)
+    """
+    alpha = span_to_alpha(span)
+    p = prices.ffill().to_numpy(dtype=np.float64)
+    ret = np.nan_to_num(p[1:] / p[:-1] - 1.0)
+
+    m = ewm_mean(ret, alpha)
+    m2 = ewm_mean(ret * ret, alpha)
+    var = np.maximum(m2 - m * m, 0.0)
+    vol = np.sqrt(var)
+
+    feats = {}
+    names = list(prices.columns)
+    for i, name in enumerate(names):
+        feats[f'{name}_ewm_vol'] = vol[:, i]
+    if base in names:
+        b = names.index(base)
+        mxy = ewm_mean(ret * ret[:, b:b + 1], alpha)
+        cov = mxy - m * m[:, b:b + 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.clip(cov / (vol * vol[:, b:b + 1]), -1.0, 1.0)
+        for i, name in enumerate(names):
+            if i != b:
+                feats[f'ewm_corr_{name}_{base}'] = corr[:, i]
+
+    out = pd.DataFrame(feats, index=prices.index[1:]).reindex(prices.index)
+    rsi = wilder_rsi(p, rsi_period)
+    for i, name in enumerate(names):
+        out[f'{name}_RSI_wilder'] = rsi[:, i]
+    return out
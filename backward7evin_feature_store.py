@@ -0,0 +1,224 @@
+"""
+The Backward 7evin - Feature Store
+CS379 Machine Learning - Versioned, Precomputed Feature Matrices
+
+engineer_features and the app's build_features recompute every return,
+volatility, RSI and rolling-correlation column from raw closes on every
+run. FeatureStore persists the computed features per (symbol set, feature
+spec + version, bar spacing) and extends them on refresh:
+
+- values are float32 and column-major (one contiguous run per feature),
+  stored as .npy next to the int64 timestamp index, the input closes they
+  were computed from and a JSON manifest
+- every request first compares its closes with the stored ones, so a
+  revised past close (Yahoo does revise) triggers a rebuild even when there
+  are no new dates
+- a refresh computes only the new dates, on a tail of the prices long
+  enough to warm up every rolling window, and verifies the recomputed
+  overlap against what is stored before appending; any mismatch (e.g. an
+  unbounded look-back feature) triggers a full rebuild
+- served matrices are memory-mapped float32 arrays, so a training job that
+  finds nothing new never touches the feature code
+- each save writes a complete new generation directory and then swaps the
+  key's CURRENT pointer with one atomic rename
+
+Bump the caller's feature spec version whenever the feature code changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'feature_store'
+WARMUP_BARS = 250      # history recomputed in front of new dates
+VERIFY_BARS = 5        # stored rows re-checked before appending
+VERIFY_RTOL = 1e-4     # float32 storage tolerance
+
+
+def spec_key(name, version, **options):
+    """Canonical feature spec string, e.g. 'predictor:v1:use_ewma=False'"""
+    parts = [name, f'v{version}'] + [f'{k}={options[k]}' for k in sorted(options)]
+    return ':'.join(parts)
+
+
+def _spacing(index):
+    """Median bar spacing as a string ('1 days', '0 days 01:00:00', ...)"""
+    if len(index) < 2:
+        return 'single'
+    return str(pd.Series(index).diff().median())
+
+
+class FeatureStore:
+    """On-disk, incrementally refreshed float32 feature matrices"""
+
+    def __init__(self, root=STORE_DIR, warmup=WARMUP_BARS):
+        self.root = root
+        self.warmup = warmup
+        self.stats = {'hits': 0, 'appends': 0, 'rebuilds': 0, 'revisions': 0}
+
+    def key(self, symbols, spec, index):
+        ident = json.dumps([sorted(map(str, symbols)), spec, _spacing(index)])
+        return hashlib.sha1(ident.encode()).hexdigest()[:16]
+
+    def _dir(self, key):
+        return os.path.join(self.root, key)
+
+    # ───────────────────────── storage ─────────────────────────
+
+    def _generation(self, key):
+        """Directory of the key's current generation (None if never saved)"""
+        pointer = os.path.join(self._dir(key), 'CURRENT')
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            return os.path.join(self._dir(key), f.read().strip())
+
+    def load(self, key):
+        """
+        Stored matrix for a key.
+
+        Returns:
+            (values float32 [n_bars, n_features] memory-mapped view,
+            DatetimeIndex, column names, manifest) or None
+        """
+        path = self._generation(key)
+        if path is None or not os.path.exists(os.path.join(path, 'manifest.json')):
+            return None
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')    # [F, T]
+        index = pd.DatetimeIndex(np.load(os.path.join(path, 'index.npy')).view('datetime64[ns]'))
+        return values.T, index, manifest['columns'], manifest
+
+    def _closes(self, key, manifest, index):
+        """Stored input closes of a loaded generation, on its index (None if absent)"""
+        path = os.path.join(self._dir(key), manifest.get('generation', ''), 'closes.npy')
+        if 'generation' not in manifest or not os.path.exists(path):
+            return None
+        return pd.DataFrame(np.load(path, mmap_mode='r').T, index=index,
+                            columns=manifest['symbols'], copy=False)
+
+    def _save(self, key, frame, closes, manifest):
+        root = self._dir(key)
+        generation = f"gen-{time.time_ns():x}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(root, generation)
+        os.makedirs(path)
+        values = np.ascontiguousarray(frame.to_numpy(dtype=np.float32).T)    # column-major
+        inputs = np.ascontiguousarray(closes[manifest['symbols']].to_numpy(dtype=np.float64).T)
+        stamps = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+        stamps = stamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        manifest = dict(manifest, columns=list(frame.columns), n_bars=len(frame),
+                        start=str(frame.index[0]) if len(frame) else None,
+                        end=str(frame.index[-1]) if len(frame) else None,
+                        generation=generation)
+        for name, array in (('values', values), ('closes', inputs), ('index', stamps)):
+            np.save(os.path.join(path, f'{name}.npy'), array)
+        with open(os.path.join(path, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # The generation is complete; publishing it is one atomic rename of
+        # the CURRENT pointer, so a reader sees either the old files or the new
+        previous = self._generation(key)
+        with open(os.path.join(root, 'CURRENT.tmp'), 'w') as f:
+            f.write(generation)
+        os.replace(os.path.join(root, 'CURRENT.tmp'), os.path.join(root, 'CURRENT'))
+
+        # Keep the previous generation for readers that resolved it just
+        # before the swap; anything older (or from the flat layout) goes
+        keep = {'CURRENT', generation, os.path.basename(previous or '')}
+        for name in os.listdir(root):
+            stale = os.path.join(root, name)
+            if name in keep:
+                continue
+            if os.path.isdir(stale):
+                shutil.rmtree(stale, ignore_errors=True)
+            else:
+                os.remove(stale)
+
+    # ───────────────────────── serving ─────────────────────────
+
+    def features(self, prices, compute, spec):
+        """
+        Features for every bar of `prices`, computing only what is missing.
+
+        Args:
+            prices: DataFrame of closes (DatetimeIndex rows)
+            compute: Callable prices -> feature DataFrame on the same index
+                     (rolling warm-up rows may be NaN)
+            spec: Feature spec string (see spec_key)
+
+        Returns:
+            float32 DataFrame of features on prices.index
+        """
+        index = prices.index.tz_localize(None) if prices.index.tz is not None else prices.index
+        prices = prices.set_axis(index)
+        key = self.key(prices.columns, spec, index)
+        manifest = {'symbols': list(map(str, prices.columns)), 'spec': spec,
+                    'spacing': _spacing(index)}
+        stored = self.load(key)
+
+        if stored is None or index[0] < stored[1][0] or not index[index <= stored[1][-1]].isin(stored[1]).all():
+            return self._rebuild(key, prices, compute, manifest)
+
+        values, stored_index, columns, stored_manifest = stored
+        # Closes already covered by the store must be the ones it was built
+        # from; a revised close invalidates every feature after it
+        known = index[index <= stored_index[-1]]
+        old_closes = self._closes(key, stored_manifest, stored_index)
+        if old_closes is None or not np.array_equal(
+                old_closes.loc[known, manifest['symbols']].to_numpy(),
+                prices.loc[known, manifest['symbols']].to_numpy(dtype=np.float64), equal_nan=True):
+            self.stats['revisions'] += 1
+            return self._rebuild(key, prices, compute, manifest)
+
+        new = index[index > stored_index[-1]]
+        if len(new) == 0:
+            self.stats['hits'] += 1
+            frame = pd.DataFrame(values, index=stored_index, columns=columns, copy=False)
+            return frame.loc[index]
+
+        pos = index.get_loc(new[0])
+        part = compute(prices.iloc[max(0, pos - self.warmup):]).astype(np.float32)
+        if list(part.columns) != columns:
+            return self._rebuild(key, prices, compute, manifest)
+
+        # Recomputed rows just before the new dates must match the stored ones
+        overlap = part.index[part.index <= stored_index[-1]][-VERIFY_BARS:]
+        old = pd.DataFrame(values, index=stored_index, columns=columns, copy=False).loc[overlap]
+        if not np.allclose(old.to_numpy(), part.loc[overlap].to_numpy(), rtol=VERIFY_RTOL,
+                           atol=1e-6, equal_nan=True):
+            return self._rebuild(key, prices, compute, manifest)
+
+        self.stats['appends'] += 1
+        full = pd.concat([pd.DataFrame(np.asarray(values), index=stored_index, columns=columns),
+                          part.loc[new]])
+        closes = pd.concat([old_closes.astype(np.float64),
+                            prices.loc[new, manifest['symbols']].astype(np.float64)])
+        self._save(key, full, closes, manifest)
+        return full.loc[index]
+
+    def _rebuild(self, key, prices, compute, manifest):
+        self.stats['rebuilds'] += 1
+        frame = compute(prices).astype(np.float32)
+        self._save(key, frame, prices, manifest)
+        return frame
+
+    def training_matrix(self, symbols, spec, index):
+        """
+        Stored features as a float32 [n_bars, n_features] view, without
+        computing anything.
+
+        Args:
+            index: Any index with the bar spacing of the stored matrix
+
+        Returns:
+            (values, DatetimeIndex, column names) or None if not stored
+        """
+        stored = self.load(self.key(symbols, spec, index))
+        return None if stored is None else stored[:3]
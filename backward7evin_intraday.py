@@ -0,0 +1,344 @@
+"""
+The Backward 7evin - Intraday Data Mode
+CS379 Machine Learning - High-Resolution (1h / 1m) Storage
+
+Daily closes fit comfortably in a pandas DataFrame, but a year of 1-minute
+bars for dozens of symbols does not. This module keeps intraday closes in a
+compact columnar store instead:
+
+- int64 epoch timestamps (seconds, UTC) on one shared time grid
+- float32 closes, one contiguous row per symbol
+- fixed-size chunk files opened as memory maps, so only the chunk being
+  processed is ever resident in RAM
+
+Feature engineering and correlations stream over the chunks. A year of
+1-minute bars for 50 symbols is ~100 MB on disk and a few MB in memory.
+`backward7evin_cli.py --intraday DIR` keeps a store up to date and
+classifies from it.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from backward7evin_alignment import align_prices
+from backward7evin_kernels import rolling_std
+
+# Rows (bars) per chunk file: 65,536 minutes is roughly 45 days of 24/7 data
+CHUNK_ROWS = 65_536
+
+# Longest history Yahoo serves per intraday request
+MAX_PERIOD = {'1m': '7d', '1h': '60d'}
+
+# Bar length per interval; Yahoo stamps intraday bars with their start time
+BAR_SECONDS = {'1m': 60, '1h': 3600}
+
+
+def _epoch_seconds(index):
+    """Convert a DatetimeIndex (naive = UTC, or tz-aware) to int64 epoch seconds"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.values.astype('datetime64[s]').astype(np.int64)
+
+
+class IntradayStore:
+    """Chunked, memory-mapped close-price store on a shared timestamp grid"""
+
+    def __init__(self, root, symbols=None, chunk_rows=CHUNK_ROWS):
+        """
+        Open an existing store at `root`, or create one for `symbols`.
+
+        Args:
+            root: Directory holding meta.json and the chunk files
+            symbols: Ticker symbols (required when creating a new store)
+            chunk_rows: Bars per chunk file (new stores only)
+        """
+        self.root = root
+        meta_path = os.path.join(root, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.symbols = meta['symbols']
+            self.chunk_rows = meta['chunk_rows']
+            self.n_chunks = meta['n_chunks']
+            self.n_rows = meta['n_rows']
+        else:
+            if symbols is None:
+                raise ValueError(f"No intraday store at {root}; pass symbols to create one")
+            os.makedirs(root, exist_ok=True)
+            self.symbols = list(symbols)
+            self.chunk_rows = int(chunk_rows)
+            self.n_chunks = 0
+            self.n_rows = 0
+            self._write_meta()
+
+    # ───────────────────────── file layout ─────────────────────────
+
+    def _write_meta(self):
+        meta = {
+            'symbols': self.symbols,
+            'chunk_rows': self.chunk_rows,
+            'n_chunks': self.n_chunks,
+            'n_rows': self.n_rows,
+        }
+        with open(os.path.join(self.root, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    def _paths(self, i):
+        base = os.path.join(self.root, f'chunk_{i:05d}')
+        return base + '_ts.npy', base + '_close.npy'
+
+    def load_chunk(self, i):
+        """
+        Memory-map chunk `i`.
+
+        Returns:
+            (timestamps int64 [n], closes float32 [n_symbols, n]) - read-only views
+        """
+        ts_path, close_path = self._paths(i)
+        return np.load(ts_path, mmap_mode='r'), np.load(close_path, mmap_mode='r')
+
+    def last_timestamp(self):
+        """Epoch seconds of the newest stored bar, or None if the store is empty"""
+        if self.n_chunks == 0:
+            return None
+        ts, _ = self.load_chunk(self.n_chunks - 1)
+        return int(ts[-1])
+
+    # ───────────────────────── writing ─────────────────────────
+
+    def append(self, timestamps, closes):
+        """
+        Append bars to the store. Bars at or before the newest stored
+        timestamp are dropped, so overlapping downloads can be appended safely.
+
+        Args:
+            timestamps: int64 epoch seconds, strictly increasing, shape [n]
+            closes: Close prices, shape [n_symbols, n], in self.symbols order
+                    (NaN where a symbol has no bar)
+
+        Returns:
+            Number of new bars written
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float32)
+        if closes.shape != (len(self.symbols), len(timestamps)):
+            raise ValueError(
+                f"closes must have shape {(len(self.symbols), len(timestamps))}, got {closes.shape}"
+            )
+
+        last = self.last_timestamp()
+        if last is not None:
+            keep = timestamps > last
+            timestamps, closes = timestamps[keep], closes[:, keep]
+        if len(timestamps) == 0:
+            return 0
+
+        # Top up the last (partial) chunk before starting new ones
+        if self.n_chunks and self.n_rows % self.chunk_rows:
+            ts_old, close_old = self.load_chunk(self.n_chunks - 1)
+            timestamps = np.concatenate([ts_old, timestamps])
+            closes = np.concatenate([close_old, closes], axis=1)
+            self.n_rows -= len(ts_old)
+            self.n_chunks -= 1
+
+        for start in range(0, len(timestamps), self.chunk_rows):
+            stop = start + self.chunk_rows
+            ts_path, close_path = self._paths(self.n_chunks)
+            np.save(ts_path, timestamps[start:stop])
+            np.save(close_path, np.ascontiguousarray(closes[:, start:stop]))
+            self.n_chunks += 1
+            self.n_rows += len(timestamps[start:stop])
+
+        self._write_meta()
+        return len(timestamps)
+
+    def append_frame(self, df):
+        """Append a DataFrame of closes (DatetimeIndex rows, symbol columns)"""
+        closes = df.reindex(columns=self.symbols).to_numpy(dtype=np.float32).T
+        return self.append(_epoch_seconds(df.index), closes)
+
+    # ───────────────────────── reading ─────────────────────────
+
+    def iter_chunks(self, symbols=None, overlap=0):
+        """
+        Stream the store chunk by chunk.
+
+        Args:
+            symbols: Subset of symbols to read (default: all)
+            overlap: Trailing rows of the previous chunk to prepend, so rolling
+                     windows of length <= overlap are continuous across chunks
+
+        Yields:
+            (timestamps int64 [n], closes float32 [n_selected, n], n_overlap)
+        """
+        rows = None
+        if symbols is not None:
+            rows = [self.symbols.index(s) for s in symbols]
+
+        tail_ts = tail_close = None
+        for i in range(self.n_chunks):
+            ts, close = self.load_chunk(i)
+            if rows is not None:
+                close = close[rows]
+            n_overlap = 0
+            if tail_ts is not None and overlap:
+                n_overlap = len(tail_ts)
+                ts = np.concatenate([tail_ts, ts])
+                close = np.concatenate([tail_close, close], axis=1)
+            yield ts, close, n_overlap
+            if overlap:
+                tail_ts = np.array(ts[-overlap:])
+                tail_close = np.array(close[:, -overlap:])
+
+    def to_frame(self, symbols=None, start=None, end=None):
+        """
+        Materialize a (small) time range as a float32 DataFrame.
+
+        Args:
+            start, end: Optional bounds (anything pd.Timestamp accepts, UTC)
+        """
+        lo = None if start is None else int(pd.Timestamp(start).timestamp())
+        hi = None if end is None else int(pd.Timestamp(end).timestamp())
+        parts, stamps = [], []
+        for ts, close, _ in self.iter_chunks(symbols):
+            keep = np.ones(len(ts), dtype=bool)
+            if lo is not None:
+                keep &= ts >= lo
+            if hi is not None:
+                keep &= ts <= hi
+            if keep.any():
+                stamps.append(ts[keep])
+                parts.append(close[:, keep])
+        columns = symbols or self.symbols
+        if not parts:
+            return pd.DataFrame(columns=columns, dtype=np.float32)
+        index = pd.to_datetime(np.concatenate(stamps), unit='s', utc=True)
+        return pd.DataFrame(np.concatenate(parts, axis=1).T, index=index, columns=columns)
+
+    def nbytes(self):
+        """On-disk size of all chunk files in bytes"""
+        total = 0
+        for i in range(self.n_chunks):
+            for path in self._paths(i):
+                total += os.path.getsize(path)
+        return total
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA COLLECTION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def fetch_intraday(store, period='7d', interval='1m'):
+    """
+    Download intraday closes for every symbol in the store and append them.
+
+    Yahoo only serves ~7 days of 1m bars (60 days of 1h bars) per request,
+    so a long history is built by calling this on a schedule; bars already
+    in the store are skipped. The newest bar is still forming until its
+    interval has elapsed, and the store never rewrites a stored bar, so it
+    is left for the next call.
+
+    Returns:
+        Number of new bars written
+    """
+    df = yf.download(store.symbols, period=period, interval=interval, progress=False)['Close']
+    if isinstance(df, pd.Series):
+        df = df.to_frame(store.symbols[0])
+    closed = _epoch_seconds(df.index) + BAR_SECONDS[interval] <= pd.Timestamp.now(tz='UTC').timestamp()
+    df = df[closed].dropna(how='all')
+    if df.empty:
+        return 0
+    return store.append_frame(df)
+
+
+def intraday_prices(store, symbols=None, days=None):
+    """
+    Aligned closes of the last `days` days of the store, ready for the
+    daily-data pipelines (correlations, classifiers).
+
+    Exchange-hours symbols (Gold, S&P 500, USD index) are forward-filled
+    across the 24/7 grid by align_prices, for up to three days of bars (a
+    weekend plus a holiday, as DEFAULT_LIMIT is for daily bars); symbols
+    with no stored bars in the range are dropped.
+
+    Returns:
+        float64 DataFrame (UTC DatetimeIndex rows, symbol columns)
+    """
+    last = store.last_timestamp()
+    if last is None:
+        return pd.DataFrame()
+    start = None if days is None else pd.Timestamp(last - days * 86_400, unit='s')
+    frame = store.to_frame(symbols, start=start).astype(np.float64).dropna(axis=1, how='all')
+    if len(frame) < 2:
+        return align_prices(frame, daily=False)
+    spacing = pd.Series(frame.index).diff().median()
+    return align_prices(frame, daily=False, limit=max(1, int(pd.Timedelta(days=3) / spacing)))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# STREAMING FEATURES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def stream_features(store, symbols=None, vol_window=10):
+    """
+    Stream per-bar return and rolling-volatility features chunk by chunk.
+
+    Column names follow CryptoPredictor ({symbol}_return, {symbol}_volatility).
+
+    Yields:
+        float32 DataFrame per chunk, indexed by UTC timestamp
+    """
+    symbols = symbols or store.symbols
+    for ts, close, n_overlap in store.iter_chunks(symbols, overlap=vol_window + 1):
+        ret = np.full(close.shape, np.nan, dtype=np.float32)
+        ret[:, 1:] = close[:, 1:] / close[:, :-1] - 1.0
+        vol = rolling_std(ret.T, vol_window).T.astype(np.float32)
+
+        keep = slice(n_overlap, None)
+        data = {}
+        for j, sym in enumerate(symbols):
+            data[f'{sym}_return'] = ret[j, keep]
+            data[f'{sym}_volatility'] = vol[j, keep]
+        index = pd.to_datetime(ts[keep], unit='s', utc=True)
+        yield pd.DataFrame(data, index=index)
+
+
+def stream_correlation(store, symbols=None):
+    """
+    Pearson correlation of bar returns in a single streaming pass.
+
+    Only sums, cross-products and pair counts (n_symbols x n_symbols, float64)
+    are kept between chunks. Missing bars are excluded pairwise, like
+    DataFrame.corr().
+
+    Returns:
+        DataFrame correlation matrix
+    """
+    symbols = symbols or store.symbols
+    n = len(symbols)
+    count = np.zeros((n, n))
+    sx = np.zeros((n, n))        # sum of x_i over rows where i and j both present
+    sxx = np.zeros((n, n))
+    sxy = np.zeros((n, n))
+
+    for _, close, _ in store.iter_chunks(symbols, overlap=1):
+        ret = (close[:, 1:] / close[:, :-1] - 1.0).astype(np.float64)
+        valid = ~np.isnan(ret)
+        r = np.where(valid, ret, 0.0)
+        m = valid.astype(np.float64)
+        count += m @ m.T
+        sx += r @ m.T
+        sxx += (r * r) @ m.T
+        sxy += r @ r.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.T / count
+        var_i = sxx - sx * sx / count
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[count < 3] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=symbols, columns=symbols)
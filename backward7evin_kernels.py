@@ -0,0 +1,305 @@
+"""
+The Backward 7evin - Fast Indicator Kernels
+CS379 Machine Learning - Shared SMA / EMA / RSI / Rolling Std / Rolling Corr
+
+RSI, MA7/MA21, rolling volatility and rolling correlation were implemented
+separately in app.py and CryptoPredictor, one pandas Series at a time, with
+several temporaries per call. These kernels work on whole 2-D arrays (rows =
+bars, columns = assets) along axis 0:
+
+- Rolling windows are differences of one cumulative sum: O(T) for any window
+- Outputs are preallocated and filled with `out=` ufunc calls
+- Data is shifted by its column mean before summing, which keeps the
+  cumulative sums well conditioned (std/corr are shift-invariant)
+- Missing values behave like pandas: a window containing NaN gives NaN
+
+Run this file to check numerical equivalence with pandas and benchmark
+1,000 assets x 10 years of daily bars; it exits non-zero if any kernel
+differs from pandas by more than ATOL (NaN / warm-up rows must match too).
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+ATOL = 1e-7   # allowed |kernel - pandas| in the equivalence check
+
+
+def _as_float(x):
+    x = np.asarray(x, dtype=np.float64)
+    return x if x.ndim > 1 else x[:, None]
+
+
+def _shape_like(out, x):
+    return out[:, 0] if np.ndim(x) == 1 else out
+
+
+def _window_sum(c, window, out):
+    """Window sums from a cumulative sum `c` into `out` (first window-1 rows NaN)"""
+    out[:window - 1] = np.nan
+    out[window - 1] = c[window - 1]
+    np.subtract(c[window:], c[:-window], out=out[window:])
+    return out
+
+
+def _nan_windows(missing, window):
+    """
+    Boolean mask of windows containing at least one NaN, or None if nothing
+    is missing. Only columns that actually have gaps are scanned.
+    """
+    cols = missing.any(axis=0)
+    if not cols.any():
+        return None
+    counts = np.cumsum(missing[:, cols], axis=0, dtype=np.int64)
+    bad = np.empty(counts.shape, dtype=np.int64)
+    bad[window - 1] = counts[window - 1]
+    np.subtract(counts[window:], counts[:-window], out=bad[window:])
+    bad[:window - 1] = 1
+    mask = np.zeros(missing.shape, dtype=bool)
+    mask[:, cols] = bad > 0
+    return mask
+
+
+def _centered(x, missing):
+    """x minus its column mean, with NaNs replaced by 0 (new array)"""
+    if missing.any():
+        with np.errstate(invalid='ignore'):
+            mean = np.nan_to_num(np.nanmean(x, axis=0))
+        z = np.subtract(x, mean)
+        np.copyto(z, 0.0, where=missing)
+    else:
+        mean = x.mean(axis=0)
+        z = np.subtract(x, mean)
+    return z, mean
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# KERNELS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def sma(x, window):
+    """Simple moving average along axis 0 (pandas rolling(window).mean())"""
+    x2 = _as_float(x)
+    out = np.empty_like(x2)
+    if len(x2) < window:
+        out[:] = np.nan
+        return _shape_like(out, x)
+    missing = np.isnan(x2)
+    z, mean = _centered(x2, missing)
+    np.cumsum(z, axis=0, out=z)
+    _window_sum(z, window, out)
+    out /= window
+    out += mean
+    bad = _nan_windows(missing, window)
+    if bad is not None:
+        out[bad] = np.nan
+    return _shape_like(out, x)
+
+
+def rolling_std(x, window, ddof=1):
+    """Rolling standard deviation along axis 0 (pandas rolling(window).std())"""
+    x2 = _as_float(x)
+    out = np.empty_like(x2)
+    if len(x2) < window:
+        out[:] = np.nan
+        return _shape_like(out, x)
+    missing = np.isnan(x2)
+    z, _ = _centered(x2, missing)
+    sq = np.square(z)
+    np.cumsum(z, axis=0, out=z)
+    np.cumsum(sq, axis=0, out=sq)
+    s1 = _window_sum(z, window, np.empty_like(z))
+    _window_sum(sq, window, out)
+    # var = (sum(x^2) - sum(x)^2 / n) / (n - ddof)
+    np.square(s1, out=s1)
+    s1 /= window
+    out -= s1
+    out /= (window - ddof)
+    np.maximum(out, 0.0, out=out)
+    np.sqrt(out, out=out)
+    bad = _nan_windows(missing, window)
+    if bad is not None:
+        out[bad] = np.nan
+    return _shape_like(out, x)
+
+
+def rolling_corr(x, y, window):
+    """
+    Rolling Pearson correlation along axis 0 (pandas rolling(window).corr()).
+
+    x and y broadcast against each other, so a [T, N] matrix can be
+    correlated with a [T, 1] column, or [T, A, 1] with [T, 1, D] for all pairs.
+    """
+    xa = np.asarray(x, dtype=np.float64)
+    ya = np.asarray(y, dtype=np.float64)
+    xa, ya = np.broadcast_arrays(xa, ya)
+    shape = xa.shape
+    xa = xa.reshape(shape[0], -1)
+    ya = ya.reshape(shape[0], -1)
+    out = np.empty(xa.shape)
+    if shape[0] < window:
+        out[:] = np.nan
+        return out.reshape(shape)
+
+    missing = np.isnan(xa) | np.isnan(ya)
+    xz, _ = _centered(xa, missing)
+    yz, _ = _centered(ya, missing)
+
+    def wsum(a):
+        c = np.cumsum(a, axis=0)
+        return _window_sum(c, window, c.copy())
+
+    sx, sy = wsum(xz), wsum(yz)
+    sxx, syy, sxy = wsum(xz * xz), wsum(yz * yz), wsum(xz * yz)
+    cov = sxy - sx * sy / window
+    var_x = sxx - sx * sx / window
+    var_y = syy - sy * sy / window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(cov, np.sqrt(var_x * var_y), out=out)
+    # Constant windows (zero variance) are undefined, as in pandas
+    out[(var_x <= 1e-12 * np.maximum(sxx, 1.0)) | (var_y <= 1e-12 * np.maximum(syy, 1.0))] = np.nan
+    np.clip(out, -1.0, 1.0, out=out)
+    bad = _nan_windows(missing, window)
+    if bad is not None:
+        out[bad] = np.nan
+    out[:window - 1] = np.nan
+    return out.reshape(shape)
+
+
+def ema(x, span=None, alpha=None):
+    """
+    Exponential moving average along axis 0, seeded with the first row
+    (pandas ewm(span=..., adjust=False).mean() for NaN-free input).
+    """
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    x2 = _as_float(x)
+    zi = (1.0 - alpha) * x2[:1]
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], x2, axis=0, zi=zi)
+    return _shape_like(out, x)
+
+
+def rsi(x, window=14):
+    """
+    RSI from simple rolling means of gains and losses, matching the
+    pandas `.where(...).rolling(window).mean()` formulation used in the
+    app and CryptoPredictor (not Wilder smoothing - see backward7evin_ewma).
+    """
+    x2 = _as_float(x)
+    delta = np.zeros_like(x2)
+    np.subtract(x2[1:], x2[:-1], out=delta[1:])
+    np.nan_to_num(delta, copy=False)
+    gain = np.maximum(delta, 0.0)
+    np.negative(delta, out=delta)
+    np.maximum(delta, 0.0, out=delta)       # delta now holds losses
+    avg_gain = sma(gain, window)
+    avg_loss = sma(delta, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(avg_gain, avg_loss, out=avg_gain)    # rs
+    avg_gain += 1.0
+    np.divide(100.0, avg_gain, out=avg_gain)
+    np.subtract(100.0, avg_gain, out=avg_gain)
+    return _shape_like(avg_gain, x)
+
+
+def pct_change(x, periods=1):
+    """Percent change along axis 0 (first `periods` rows NaN)"""
+    x2 = _as_float(x)
+    out = np.full_like(x2, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(x2[periods:], x2[:-periods], out=out[periods:])
+    out[periods:] -= 1.0
+    return _shape_like(out, x)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EQUIVALENCE CHECK & BENCHMARK
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _pandas_rsi(df, window=14):
+    delta = df.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def _max_abs_diff(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    return float(np.nanmax(np.abs(a - b))) if np.isfinite(a).any() else 0.0
+
+
+def _mismatch(got, expected, atol):
+    """None if got matches expected (same NaN positions, |diff| <= atol), else the report"""
+    try:
+        np.testing.assert_allclose(np.asarray(got, dtype=np.float64),
+                                   np.asarray(expected, dtype=np.float64),
+                                   rtol=0, atol=atol, equal_nan=True)
+    except AssertionError as e:
+        return str(e).split('\n ACTUAL')[0]     # counts and max differences, not the arrays
+    return None
+
+
+def benchmark(n_assets=1000, years=10, seed=7, atol=ATOL):
+    """
+    Compare each kernel against the pandas formulation and time both.
+
+    Returns:
+        (DataFrame with kernel, max |difference|, ok, pandas seconds, kernel
+        seconds; {kernel: assert_allclose report} for every mismatch)
+    """
+    rng = np.random.default_rng(seed)
+    n_bars = 365 * years
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_assets)), axis=0))
+    prices[rng.integers(0, n_bars, 50), rng.integers(0, n_assets, 50)] = np.nan
+    df = pd.DataFrame(prices)
+    returns = df.pct_change(fill_method=None)
+    ret = returns.to_numpy()
+    btc = df[[0]].to_numpy()
+
+    cases = [
+        ('sma(7)', lambda: df.rolling(7).mean(), lambda: sma(prices, 7)),
+        ('sma(21)', lambda: df.rolling(21).mean(), lambda: sma(prices, 21)),
+        ('rolling_std(10)', lambda: returns.rolling(10).std(), lambda: rolling_std(ret, 10)),
+        ('rolling_corr(20)', lambda: df.rolling(20).corr(df[0]),
+         lambda: rolling_corr(prices, btc, 20)),
+        ('ema(20)', lambda: df.ffill().bfill().ewm(span=20, adjust=False).mean(),
+         lambda: ema(df.ffill().bfill().to_numpy(), span=20)),
+        ('rsi(14)', lambda: _pandas_rsi(df), lambda: rsi(prices)),
+    ]
+    rows, failures = [], {}
+    for name, pandas_fn, kernel_fn in cases:
+        t0 = time.perf_counter()
+        expected = pandas_fn()
+        t1 = time.perf_counter()
+        got = kernel_fn()
+        t2 = time.perf_counter()
+        mismatch = _mismatch(got, expected, atol)
+        if mismatch is not None:
+            failures[name] = mismatch
+        rows.append({
+            'kernel': name,
+            'max_abs_diff': _max_abs_diff(got, expected),
+            'ok': mismatch is None,
+            'pandas_s': round(t1 - t0, 3),
+            'kernel_s': round(t2 - t1, 3),
+        })
+    return pd.DataFrame(rows), failures
+
+
+def main():
+    print("Kernel equivalence & benchmark: 1,000 assets x 10 years (daily)")
+    table, failures = benchmark()
+    print(table.to_string(index=False))
+    for name, report in failures.items():
+        print(f"\n✗ {name} differs from pandas beyond atol={ATOL}:{report}")
+    if failures:
+        sys.exit(1)
+    print(f"\n✓ All kernels match pandas within atol={ATOL}")
+
+
+if __name__ == "__main__":
+    main()
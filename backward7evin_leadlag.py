@@ -0,0 +1,190 @@
+"""
+The Backward 7evin - Lead-Lag Scanner
+CS379 Machine Learning - FFT Cross-Correlation Across Lags
+
+Every correlation feature so far is contemporaneous: ETH today vs BTC today.
+If a driver moves first and an asset follows a day or two later (or the
+other way round), that relationship is invisible. The scanner computes the
+cross-correlation of returns at every lag from -k to +k for every
+asset/driver pair:
+
+- each column is standardized once and transformed once with a real FFT
+  (zero-padded to avoid wrap-around), so a pair costs one spectrum product
+  and one inverse FFT: O(n log n) per pair for all 2k+1 lags at once
+- pairs are batched as [frequency, asset, driver] arrays, in asset chunks
+  sized to a memory budget, so hundreds of assets scan in one call
+- missing returns count as zero and each lag is normalized by its number
+  of overlapping valid pairs (also obtained by FFT)
+
+Lag convention: corr[lag] = corr(asset_t, driver_{t-lag}); a positive lag
+means the driver leads the asset by `lag` bars.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.fft import irfft, next_fast_len, rfft
+
+MAX_LAG = 5
+MAX_ELEMENTS = 2 ** 24   # complex cells per batch (~256 MB)
+
+
+def _standardize(x):
+    """Zero-mean, unit-variance columns with NaN -> 0, plus the validity mask"""
+    x = np.asarray(x, dtype=np.float64)
+    mask = np.isfinite(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (x - np.nanmean(x, axis=0)) / np.nanstd(x, axis=0)
+    z[~mask | ~np.isfinite(z)] = 0.0
+    return z, mask.astype(np.float64)
+
+
+def cross_correlation(x, y, max_lag=MAX_LAG, max_elements=MAX_ELEMENTS):
+    """
+    Cross-correlation of every column of x with every column of y.
+
+    Args:
+        x: Returns [n_bars, n_assets]
+        y: Returns [n_bars, n_drivers]
+        max_lag: k; lags -k..k are returned
+
+    Returns:
+        Array [n_assets, n_drivers, 2k + 1]; [..., k + lag] is the
+        correlation of x_t with y_{t-lag}
+    """
+    x2 = np.asarray(x, dtype=np.float64).reshape(len(x), -1)
+    y2 = np.asarray(y, dtype=np.float64).reshape(len(y), -1)
+    n = len(x2)
+    if max_lag >= n:
+        raise ValueError(f"max_lag ({max_lag}) must be smaller than the number of bars ({n})")
+    xz, xm = _standardize(x2)
+    yz, ym = _standardize(y2)
+    nfft = next_fast_len(2 * n - 1, real=True)
+    lags = np.arange(-max_lag, max_lag + 1)
+    rows = lags % nfft     # irfft(X conj(Y))[m] = sum_t x[t+m] y[t]; negative m wraps
+
+    # Without gaps the overlap at lag m is simply n - |m|
+    complete = xm.all() and ym.all()
+    fy = rfft(yz, nfft, axis=0)
+    fym = None if complete else rfft(ym, nfft, axis=0)
+    out = np.empty((x2.shape[1], y2.shape[1], len(lags)))
+    chunk = max(1, max_elements // (fy.shape[0] * y2.shape[1]))
+    for lo in range(0, x2.shape[1], chunk):
+        hi = min(lo + chunk, x2.shape[1])
+        fx = rfft(xz[:, lo:hi], nfft, axis=0)
+        cc = irfft(fx[:, :, None] * np.conj(fy[:, None, :]), nfft, axis=0)[rows]
+        if complete:
+            counts = (n - np.abs(lags))[:, None, None].astype(np.float64)
+        else:
+            fxm = rfft(xm[:, lo:hi], nfft, axis=0)
+            counts = np.rint(irfft(fxm[:, :, None] * np.conj(fym[:, None, :]), nfft, axis=0)[rows])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[lo:hi] = np.moveaxis(cc / counts, 0, -1)
+    return np.clip(np.nan_to_num(out), -1.0, 1.0)
+
+
+def scan(returns, assets, drivers, max_lag=MAX_LAG):
+    """
+    Strongest non-contemporaneous lag of every asset/driver pair.
+
+    Args:
+        returns: DataFrame of returns (rows = bars)
+        assets, drivers: Columns of returns
+
+    Returns:
+        DataFrame per pair: Asset, Driver, Lag0_Corr, Best_Lag (driver leads
+        when > 0), Best_Corr and Leader
+    """
+    corr = cross_correlation(returns[assets].to_numpy(), returns[drivers].to_numpy(), max_lag)
+    lags = np.arange(-max_lag, max_lag + 1)
+    off_zero = np.abs(corr).copy()
+    off_zero[..., max_lag] = -1.0
+    best = off_zero.argmax(axis=-1)
+    rows = []
+    for i, asset in enumerate(assets):
+        for j, driver in enumerate(drivers):
+            lag = int(lags[best[i, j]])
+            rows.append({'Asset': asset, 'Driver': driver,
+                         'Lag0_Corr': corr[i, j, max_lag],
+                         'Best_Lag': lag, 'Best_Corr': corr[i, j, best[i, j]],
+                         'Leader': driver if lag > 0 else asset})
+    return pd.DataFrame(rows)
+
+
+def best_leads(returns, target, max_lag=MAX_LAG):
+    """
+    For each column, the lag 1..k at which it best leads `target`.
+
+    Returns:
+        {column: (lag, correlation of target_t with column_{t-lag})}
+    """
+    others = [c for c in returns.columns if c != target]
+    corr = cross_correlation(returns[[target]].to_numpy(), returns[others].to_numpy(), max_lag)[0]
+    leading = corr[:, max_lag + 1:]           # lags 1..k: the other column moves first
+    best = np.abs(leading).argmax(axis=1)
+    return {c: (int(best[j]) + 1, float(leading[j, best[j]])) for j, c in enumerate(others)}
+
+
+def lead_lag_features(prices, leads):
+    """
+    Returns of each leading column, shifted so they line up with the target
+    bar they lead (known at the current bar for a next-bar target).
+
+    Args:
+        prices: DataFrame of closes
+        leads: {column: (lag, corr)} from best_leads
+
+    Returns:
+        DataFrame with {column}_lead{lag}_return columns
+    """
+    feats = {}
+    for col, (lag, _) in leads.items():
+        feats[f'{col}_lead{lag}_return'] = prices[col].pct_change().shift(lag - 1)
+    return pd.DataFrame(feats, index=prices.index)
+
+
+def _direct_cross_correlation(x, y, max_lag):
+    """Per-pair, per-lag reference implementation (same normalization)"""
+    xz, xm = _standardize(x)
+    yz, ym = _standardize(y)
+    n = len(xz)
+    out = np.empty((x.shape[1], y.shape[1], 2 * max_lag + 1))
+    for i in range(x.shape[1]):
+        for j in range(y.shape[1]):
+            for k, lag in enumerate(range(-max_lag, max_lag + 1)):
+                a = slice(max(lag, 0), n + min(lag, 0))
+                b = slice(max(-lag, 0), n - max(lag, 0))
+                out[i, j, k] = (xz[a, i] @ yz[b, j]) / (xm[a, i] @ ym[b, j])
+    return out
+
+
+def benchmark(n_assets=500, n_drivers=4, years=10, max_lag=10, seed=11):
+    """Equivalence with the direct sums and timing on a large universe"""
+    rng = np.random.default_rng(seed)
+    n = 365 * years
+    drivers = rng.normal(0, 0.02, (n, n_drivers))
+    assets = 0.5 * np.roll(drivers[:, [0]], 2, axis=0) + rng.normal(0, 0.02, (n, n_assets))
+    assets[rng.integers(0, n, 100), rng.integers(0, n_assets, 100)] = np.nan
+
+    start = time.perf_counter()
+    corr = cross_correlation(assets, drivers, max_lag)
+    fft_s = time.perf_counter() - start
+    sample = slice(0, 20)
+    start = time.perf_counter()
+    direct = _direct_cross_correlation(assets[:, sample], drivers, max_lag)
+    direct_s = (time.perf_counter() - start) * n_assets / 20
+    lag_found = np.arange(-max_lag, max_lag + 1)[np.abs(corr[:, 0]).argmax(axis=1)]
+    return {'pairs': n_assets * n_drivers, 'bars': n, 'lags': 2 * max_lag + 1,
+            'max_abs_diff': float(np.abs(corr[sample] - direct).max()),
+            'fft_s': round(fft_s, 3), 'direct_s_est': round(direct_s, 3),
+            'planted_lag_found': float((lag_found == 2).mean())}
+
+
+def main():
+    print("Lead-lag scan: 500 assets x 4 drivers x 10 years of daily returns")
+    print(pd.DataFrame([benchmark(max_lag=k) for k in (10, 60, 250)]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
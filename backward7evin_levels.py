@@ -0,0 +1,187 @@
+"""
+The Backward 7evin - Technical Levels Engine
+CS379 Machine Learning - Rolling Fibonacci, Swings and Pivots
+
+fib_levels used the global max/min of one series, recomputed on every
+render. This engine computes rolling-window levels for every asset and
+every bar at once:
+
+- Rolling high/low use the van Herk / Gil-Werman algorithm. It is the
+  block-wise relative of the monotonic-deque method, also O(n) regardless of
+  the window, but made of NumPy accumulate calls instead of a Python loop.
+- Fibonacci retracements (23.6 / 38.2 / 50 / 61.8%) of the rolling range
+- Swing highs/lows: bars that are the extreme of a centered window
+- Classic pivot levels (P, R1, S1) from the rolling high/low/close
+
+Results are cached per (data, window) up to a byte budget, and level_features turns them into
+scale-free model inputs (distance from price to each level).
+"""
+
+import hashlib
+import numpy as np
+import pandas as pd
+
+FIB_RATIOS = (0.236, 0.382, 0.5, 0.618)
+
+_CACHE = {}
+_CACHE_MAX_BYTES = 64 * 2 ** 20  # evict oldest entries beyond this many bytes of levels
+
+
+def _rolling_extreme(x, window, op, identity):
+    """
+    Trailing rolling max/min along axis 0 in O(n) (van Herk / Gil-Werman).
+
+    Each output is op(suffix of one block, prefix of the next), where the
+    prefix/suffix scans restart every `window` rows.
+    """
+    n = x.shape[0]
+    out = np.full(x.shape, np.nan)
+    if n < window:
+        return out
+    pad = (-n) % window
+    xp = np.concatenate([x, np.full((pad,) + x.shape[1:], identity)], axis=0)
+    blocks = xp.reshape((-1, window) + x.shape[1:])
+    prefix = op.accumulate(blocks, axis=1).reshape(xp.shape)
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(xp.shape)
+    # Window ending at t covers [t - w + 1, t]
+    out[window - 1:] = op(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_max(x, window):
+    """Trailing rolling max along axis 0 (NaN for the warm-up); NaNs are ignored"""
+    x = np.asarray(x, dtype=np.float64)
+    out = _rolling_extreme(np.where(np.isnan(x), -np.inf, x), window, np.maximum, -np.inf)
+    out[out == -np.inf] = np.nan  # window held no prices
+    return out
+
+
+def rolling_min(x, window):
+    """Trailing rolling min along axis 0 (NaN for the warm-up); NaNs are ignored"""
+    x = np.asarray(x, dtype=np.float64)
+    out = _rolling_extreme(np.where(np.isnan(x), np.inf, x), window, np.minimum, np.inf)
+    out[out == np.inf] = np.nan  # window held no prices
+    return out
+
+
+def _fingerprint(prices, window, swing):
+    h = hashlib.sha1(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)).tobytes())
+    h.update(repr((list(prices.columns), prices.index[0], prices.index[-1], window, swing)).encode())
+    return h.hexdigest()
+
+
+def _nbytes(levels):
+    return sum(frame.memory_usage(index=False, deep=False).sum() for frame in levels.values())
+
+
+def compute_levels(prices, window=60, swing=5):
+    """
+    Rolling technical levels for every column of a price frame.
+
+    Args:
+        prices: DataFrame of closes (rows = bars, columns = assets)
+        window: Lookback for the rolling range, Fibonacci and pivots
+        swing: Half-width of the centered window for swing points
+
+    Returns:
+        Dict of DataFrames shaped like prices: 'high', 'low', 'fib_23.6'...
+        'fib_61.8', 'pivot', 'r1', 's1', 'swing_high', 'swing_low' (the
+        last confirmed swing price, forward-filled)
+    """
+    key = _fingerprint(prices, window, swing)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    close = prices.to_numpy(dtype=np.float64)
+    hi = rolling_max(close, window)
+    lo = rolling_min(close, window)
+    rng = hi - lo
+    wrap = lambda a: pd.DataFrame(a, index=prices.index, columns=prices.columns)
+
+    levels = {'high': wrap(hi), 'low': wrap(lo)}
+    for r in FIB_RATIOS:
+        levels[f'fib_{r * 100:.1f}'] = wrap(hi - rng * r)
+
+    pivot = (hi + lo + close) / 3.0
+    levels['pivot'] = wrap(pivot)
+    levels['r1'] = wrap(2.0 * pivot - lo)
+    levels['s1'] = wrap(2.0 * pivot - hi)
+
+    # Swing points: extreme of the centered (2 * swing + 1) window, known
+    # only `swing` bars later, so shift forward to avoid look-ahead
+    span = 2 * swing + 1
+    centered_max = np.roll(rolling_max(close, span), -swing, axis=0)
+    centered_min = np.roll(rolling_min(close, span), -swing, axis=0)
+    if swing:
+        centered_max[-swing:] = np.nan
+        centered_min[-swing:] = np.nan
+    is_high = close == centered_max
+    is_low = close == centered_min
+    swing_high = pd.DataFrame(np.where(is_high, close, np.nan), index=prices.index,
+                              columns=prices.columns).shift(swing).ffill()
+    swing_low = pd.DataFrame(np.where(is_low, close, np.nan), index=prices.index,
+                             columns=prices.columns).shift(swing).ffill()
+    levels['swing_high'] = swing_high
+    levels['swing_low'] = swing_low
+
+    _CACHE[key] = levels
+    while len(_CACHE) > 1 and sum(_nbytes(v) for v in _CACHE.values()) > _CACHE_MAX_BYTES:
+        _CACHE.pop(next(iter(_CACHE)))
+    return levels
+
+
+def latest_levels(series, window=60, swing=5):
+    """
+    Every level at the last bar, grouped for display.
+
+    Args:
+        series: Close prices
+        window: Lookback for the range, Fibonacci and pivots (capped at the
+                series length)
+        swing: Half-width of the swing-point window
+
+    Returns:
+        {'Fibonacci': {...}, 'Pivots': {...}, 'Swings': {...}} of
+        {label: price}; a swing is NaN until one has been confirmed
+    """
+    levels = compute_levels(series.to_frame(), window=min(window, len(series)), swing=swing)
+    last = lambda name: float(levels[name].iloc[-1, 0])
+    return {
+        'Fibonacci': {f"Fib {r * 100:.1f}%": last(f'fib_{r * 100:.1f}') for r in FIB_RATIOS},
+        'Pivots': {'R1': last('r1'), 'Pivot': last('pivot'), 'S1': last('s1')},
+        'Swings': {'Swing High': last('swing_high'), 'Swing Low': last('swing_low')},
+    }
+
+
+def latest_fib_levels(series, window=None):
+    """
+    Fibonacci levels at the last bar, in the app's display format.
+
+    Args:
+        series: Close prices
+        window: Lookback (default: the whole series, like the old fib_levels)
+    """
+    return latest_levels(series, window=window or len(series))['Fibonacci']
+
+
+def level_features(prices, window=60, swing=5, columns=None):
+    """
+    Distance from price to each level, as a fraction of price, for ML models.
+
+    Args:
+        prices: DataFrame of closes
+        columns: Subset of assets to emit features for (default: all)
+
+    Returns:
+        DataFrame with {asset}_dist_{level} and {asset}_range_pos columns
+    """
+    columns = columns or list(prices.columns)
+    levels = compute_levels(prices[columns], window=window, swing=swing)
+    feats = {}
+    for col in columns:
+        p = prices[col]
+        for name in ('fib_38.2', 'fib_61.8', 'pivot', 'swing_high', 'swing_low'):
+            feats[f'{col}_dist_{name}'] = (p - levels[name][col]) / p
+        rng = levels['high'][col] - levels['low'][col]
+        feats[f'{col}_range_pos'] = (p - levels['low'][col]) / rng.replace(0.0, np.nan)
+    return pd.DataFrame(feats, index=prices.index)
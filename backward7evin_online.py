@@ -0,0 +1,214 @@
+"""
+The Backward 7evin - Online Learning Mode
+CS379 Machine Learning - Incremental Updates, One Bar at a Time
+
+CryptoPredictor retrains a 100-tree forest from scratch on every run. When
+a single daily bar arrives, OnlineCryptoPredictor updates instead:
+
+- WelfordScaler keeps running feature means/variances (Welford / Chan
+  parallel update), so scaling never needs the full history
+- a linear learner with partial_fit (logistic SGD or passive-aggressive)
+  takes one gradient step on the newly labeled bar
+
+compare_with_batch replays the test period bar by bar (predict, then learn
+the label once the next close is known) and reports the per-bar update
+cost and the accuracy gap to a forest that is periodically retrained.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import SGDClassifier, PassiveAggressiveClassifier
+
+from backward7evin_predictor import CryptoPredictor
+
+CLASSES = np.array([0, 1])
+
+
+class WelfordScaler:
+    """StandardScaler whose statistics are updated incrementally"""
+
+    def __init__(self):
+        self.n_samples_seen_ = 0
+        self.mean_ = None
+        self.m2_ = None
+
+    def partial_fit(self, X):
+        """Merge a batch (or a single row) into the running mean and variance"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n_b = X.shape[0]
+        if n_b == 0:
+            return self
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        if self.mean_ is None:
+            self.n_samples_seen_, self.mean_, self.m2_ = n_b, mean_b, m2_b
+            return self
+        n_a = self.n_samples_seen_
+        n = n_a + n_b
+        delta = mean_b - self.mean_
+        self.mean_ = self.mean_ + delta * (n_b / n)
+        self.m2_ = self.m2_ + m2_b + delta ** 2 * (n_a * n_b / n)
+        self.n_samples_seen_ = n
+        return self
+
+    def fit(self, X):
+        self.__init__()
+        return self.partial_fit(X)
+
+    @property
+    def var_(self):
+        return self.m2_ / max(self.n_samples_seen_, 1)
+
+    @property
+    def scale_(self):
+        scale = np.sqrt(self.var_)
+        return np.where(scale > 0, scale, 1.0)
+
+    def transform(self, X):
+        return (np.atleast_2d(np.asarray(X, dtype=np.float64)) - self.mean_) / self.scale_
+
+
+def make_learner(kind='sgd'):
+    """partial_fit-capable classifier: 'sgd' (logistic, gives probabilities) or 'pa'"""
+    if kind == 'sgd':
+        return SGDClassifier(loss='log_loss', alpha=1e-3, learning_rate='optimal', random_state=42)
+    if kind == 'pa':
+        return PassiveAggressiveClassifier(C=0.01, random_state=42)
+    raise ValueError(f"Unknown online learner {kind!r}; expected 'sgd' or 'pa'")
+
+
+class OnlineCryptoPredictor(CryptoPredictor):
+    """CryptoPredictor with an incrementally updated linear model alongside the forest"""
+
+    def __init__(self, lookback_days=90, learner='sgd', warmup_epochs=5, **kwargs):
+        """
+        Args:
+            learner: 'sgd' (logistic regression by SGD) or 'pa' (passive-aggressive)
+            warmup_epochs: Passes over the initial history in fit_online
+            **kwargs: Passed to CryptoPredictor (use_ewma, use_levels, ...)
+        """
+        super().__init__(lookback_days=lookback_days, **kwargs)
+        self.learner = learner
+        self.warmup_epochs = warmup_epochs
+        self.online_model = make_learner(learner)
+        self.online_scaler = WelfordScaler()
+        self.update_times = []
+
+    def fit_online(self, X, y):
+        """Initialize the online model from history (a few passes, oldest first)"""
+        X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=int)
+        self.online_model = make_learner(self.learner)
+        self.online_scaler = WelfordScaler().fit(X)
+        Xs = self.online_scaler.transform(X)
+        for _ in range(self.warmup_epochs):
+            self.online_model.partial_fit(Xs, y, classes=CLASSES)
+        self.update_times = []
+        return self
+
+    def update(self, x, y):
+        """
+        Learn one newly labeled bar.
+
+        Args:
+            x: Feature row of the bar (1-D)
+            y: Its label (1 = next close was up)
+
+        Returns:
+            Seconds spent on the update
+        """
+        start = time.perf_counter()
+        self.online_scaler.partial_fit(x)
+        self.online_model.partial_fit(self.online_scaler.transform(x), [int(y)], classes=CLASSES)
+        elapsed = time.perf_counter() - start
+        self.update_times.append(elapsed)
+        return elapsed
+
+    def predict_online(self, x):
+        """
+        P(up) for one feature row.
+
+        Passive-aggressive has no probabilities; its decision margin is
+        squashed through a logistic function instead.
+        """
+        xs = self.online_scaler.transform(x)
+        if hasattr(self.online_model, 'predict_proba'):
+            return float(self.online_model.predict_proba(xs)[0, 1])
+        return float(1.0 / (1.0 + np.exp(-self.online_model.decision_function(xs)[0])))
+
+    def compare_with_batch(self, features_df, train_frac=0.8, retrain_every=20):
+        """
+        Prequential replay of the test period: at each bar predict with both
+        models, then reveal the label and update the online model. The
+        forest is retrained from scratch every `retrain_every` bars.
+
+        Args:
+            features_df: Output of engineer_features (last column = target)
+
+        Returns:
+            (summary dict, per-bar DataFrame with predictions, correctness
+            and rolling accuracy drift)
+        """
+        # The final bar has no next close, so its label is unknown
+        labeled = features_df.iloc[:-1]
+        X = labeled.iloc[:, :-1].to_numpy(dtype=np.float64)
+        y = labeled['target'].to_numpy(dtype=int)
+        split = int(len(X) * train_frac)
+
+        self.fit_online(X[:split], y[:split])
+        forest, scaler = None, None
+        rows, retrain_times = [], []
+        for t in range(split, len(X)):
+            if forest is None or (t - split) % retrain_every == 0:
+                start = time.perf_counter()
+                scaler = clone(self.scaler).fit(X[:t])
+                forest = clone(self.model).fit(scaler.transform(X[:t]), y[:t])
+                retrain_times.append(time.perf_counter() - start)
+            batch_pred = int(forest.predict(scaler.transform(X[t:t + 1]))[0])
+            online_pred = int(self.predict_online(X[t]) >= 0.5)
+            self.update(X[t], y[t])
+            rows.append({'date': labeled.index[t], 'target': y[t],
+                         'online_pred': online_pred, 'batch_pred': batch_pred})
+
+        history = pd.DataFrame(rows).set_index('date')
+        history['online_correct'] = (history['online_pred'] == history['target']).astype(int)
+        history['batch_correct'] = (history['batch_pred'] == history['target']).astype(int)
+        window = min(20, max(len(history), 1))
+        history['accuracy_drift'] = (history['online_correct'] - history['batch_correct']) \
+            .rolling(window, min_periods=1).mean()
+
+        times = np.array(self.update_times) * 1000.0
+        summary = {
+            'test_bars': len(history),
+            'online_accuracy': history['online_correct'].mean(),
+            'batch_accuracy': history['batch_correct'].mean(),
+            'update_ms_mean': times.mean() if len(times) else np.nan,
+            'update_ms_p95': np.percentile(times, 95) if len(times) else np.nan,
+            'retrain_ms_mean': np.mean(retrain_times) * 1000.0 if retrain_times else np.nan,
+        }
+        return summary, history
+
+
+def main():
+    """Compare online updates with periodic forest retraining on a year of data"""
+    predictor = OnlineCryptoPredictor(lookback_days=365)
+    df = predictor.fetch_data()
+    features_df = predictor.engineer_features(df)
+    summary, history = predictor.compare_with_batch(features_df)
+
+    print("\n" + "="*60)
+    print("ONLINE vs BATCH")
+    print("="*60)
+    print(f"Test bars:               {summary['test_bars']}")
+    print(f"Online accuracy:         {summary['online_accuracy']:.4f}")
+    print(f"Batch RF accuracy:       {summary['batch_accuracy']:.4f}")
+    print(f"Online update per bar:   {summary['update_ms_mean']:.3f} ms "
+          f"(p95 {summary['update_ms_p95']:.3f} ms)")
+    print(f"Forest retrain:          {summary['retrain_ms_mean']:.1f} ms")
+    print(f"Final 20-bar drift:      {history['accuracy_drift'].iloc[-1]:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
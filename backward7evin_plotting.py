@@ -0,0 +1,201 @@
+"""
+The Backward 7evin - Plot Downsampling
+CS379 Machine Learning - Bounded Chart Payloads for Long Histories
+
+Every go.Scatter point is serialized to JSON and shipped to the browser, so
+a year of hourly bars (or ten years of daily bars for many assets) makes
+slow, heavy charts although the screen can only show ~2 points per pixel.
+line_trace builds a WebGL trace (go.Scattergl) from a downsampled series:
+
+- LTTB (largest-triangle-three-buckets) keeps the visually significant
+  point of each bucket, for smooth price lines
+- min-max keeps each bucket's extremes, so no spike ever disappears
+
+The point count is proportional to the chart width in pixels, and the
+downsampled series is cached per (series contents, window, point count,
+method), so reruns over the same window do no work and payloads stay
+bounded no matter how long the history is.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+DEFAULT_WIDTH_PX = 1200
+POINTS_PER_PX = 2
+METHODS = ('lttb', 'minmax')
+CACHE_SIZE = 256
+
+
+def points_for_width(width_px=DEFAULT_WIDTH_PX, per_px=POINTS_PER_PX):
+    """Point budget for a chart `width_px` pixels wide"""
+    return max(3, int(width_px * per_px))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DOWNSAMPLING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def lttb(x, y, n_out):
+    """
+    Largest-triangle-three-buckets.
+
+    Args:
+        x, y: 1-D float arrays (x increasing, no NaN)
+        n_out: Points to keep (first and last are always kept)
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 interior buckets over points 1..n-2; the last one's
+    # "next bucket" is the final point
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(edges[i + 1], edges[i + 2])
+        avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        # Twice the triangle area (point a, candidate, next-bucket average)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax(y, n_out):
+    """
+    Min-max decimation: the minimum and maximum of each of n_out // 2
+    buckets (plus the first and last point).
+
+    Returns:
+        Sorted unique indices of the kept points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    keep = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            keep.append(lo + int(np.argmin(y[lo:hi])))
+            keep.append(lo + int(np.argmax(y[lo:hi])))
+    return np.unique(keep)
+
+
+def downsample_indices(x, y, n_out, method='lttb'):
+    """Indices of the points to draw, by 'lttb' or 'minmax'"""
+    if method == 'lttb':
+        return lttb(x, y, n_out)
+    if method == 'minmax':
+        return minmax(y, n_out)
+    raise ValueError(f"Unknown downsampling method {method!r}; expected one of {METHODS}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CACHED SERIES & TRACES
+# ═══════════════════════════════════════════════════════════════════════════
+
+_cache = OrderedDict()
+
+
+def _fingerprint(series):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(series.index.to_numpy()).view(np.uint8))
+    digest.update(np.ascontiguousarray(series.to_numpy(dtype=np.float64)).view(np.uint8))
+    return digest.hexdigest()
+
+
+def downsample_series(series, n_points=None, method='lttb', start=None, end=None):
+    """
+    Downsample one series over a window, cached.
+
+    Args:
+        series: pd.Series (DatetimeIndex or numeric index)
+        n_points: Point budget (default: points_for_width())
+        method: 'lttb' or 'minmax'
+        start, end: Optional window bounds (index labels, inclusive)
+
+    Returns:
+        pd.Series with at most ~n_points rows (NaNs dropped)
+    """
+    n_points = n_points or points_for_width()
+    window = series.loc[start:end] if start is not None or end is not None else series
+    window = window.dropna()
+    if len(window) <= n_points:
+        return window
+
+    key = (_fingerprint(window), n_points, method)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    x = window.index.to_numpy()
+    x = x.astype('datetime64[ns]').astype(np.int64).astype(np.float64) \
+        if np.issubdtype(x.dtype, np.datetime64) else x.astype(np.float64)
+    idx = downsample_indices(x, window.to_numpy(dtype=np.float64), n_points, method)
+    reduced = window.iloc[idx]
+
+    _cache[key] = reduced
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return reduced
+
+
+def line_trace(series, name=None, n_points=None, method='lttb', start=None, end=None, **kwargs):
+    """
+    WebGL line trace of a downsampled series.
+
+    Args:
+        series: pd.Series to plot
+        name: Legend name (default: series.name)
+        n_points, method, start, end: See downsample_series
+        **kwargs: Passed to go.Scattergl (line=..., hovertemplate=...)
+
+    Returns:
+        go.Scattergl
+    """
+    reduced = downsample_series(series, n_points, method, start, end)
+    return go.Scattergl(x=reduced.index, y=reduced.to_numpy(), mode='lines',
+                        name=series.name if name is None else name, **kwargs)
+
+
+def payload_bytes(fig):
+    """Size of the figure JSON sent to the browser"""
+    return len(fig.to_json())
+
+
+def main():
+    """Payload and timing of full vs downsampled charts for long histories"""
+    rng = np.random.default_rng(7)
+    rows = []
+    for label, periods, freq, n_assets in (('1y hourly', 24 * 365, 'h', 3),
+                                           ('10y daily x 20 assets', 3650, 'D', 20),
+                                           ('5y hourly', 24 * 365 * 5, 'h', 3)):
+        index = pd.date_range('2020-01-01', periods=periods, freq=freq)
+        prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (periods, n_assets)), axis=0)),
+                              index=index, columns=[f'A{i}' for i in range(n_assets)])
+        full = go.Figure([go.Scatter(x=prices.index, y=prices[c], mode='lines', name=c)
+                          for c in prices.columns])
+        start = time.perf_counter()
+        reduced = go.Figure([line_trace(prices[c]) for c in prices.columns])
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        go.Figure([line_trace(prices[c]) for c in prices.columns])
+        warm = time.perf_counter() - start
+        rows.append({'Chart': label, 'Points': periods * n_assets,
+                     'Full_KB': payload_bytes(full) // 1024, 'Downsampled_KB': payload_bytes(reduced) // 1024,
+                     'Build_ms': round(cold * 1000, 1), 'Cached_ms': round(warm * 1000, 1)})
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
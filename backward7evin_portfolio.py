@@ -0,0 +1,187 @@
+"""
+The Backward 7evin - Portfolio Construction
+CS379 Machine Learning - Signal-Driven Risk Sizing
+
+Turns signals ("Buy Long", "LONG" at 83%, ...) into position weights:
+
+1. Score: signal direction x model conviction (|2p - 1| when a probability
+   of "up" is available).
+2. Volatility targeting: each asset gets the same risk budget, so weight is
+   proportional to score / realized volatility.
+3. Covariance-aware cap: the whole book is scaled down until its realized
+   volatility (w' S w over the lookback window) is at most the target. This
+   is computed as the variance of the window's portfolio returns, so the
+   N x N covariance matrix is never formed.
+
+backtest() does all of this for every date at once over a sliding-window
+view of the returns matrix. Hundreds of assets over several years of daily
+rebalancing take a few seconds.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Direction per signal label (5-class rules, 3-class rules and model outputs)
+SIGNAL_SCORES = {
+    'Buy Long': 1.0,
+    'Caution': 0.0,
+    'Hold': 0.0,
+    'Erratic': 0.0,
+    'Buy Short': -1.0,
+    'LONG': 1.0,
+    'SHORT': -1.0,
+    'BUY LONG': 1.0,
+    'BUY SHORT': -1.0,
+}
+
+PERIODS_PER_YEAR = 365  # crypto trades every day (default when bars carry no timestamps)
+
+
+def bars_per_year(index):
+    """
+    Bars per year for annualizing, from the bar spacing of a DatetimeIndex.
+
+    Counts the bars actually observed per calendar year, so daily crypto
+    gives ~365, daily equities ~252 and hourly crypto ~8,760.
+
+    Returns:
+        float (PERIODS_PER_YEAR for fewer than two timestamps or no DatetimeIndex)
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return PERIODS_PER_YEAR
+    span = (index[-1] - index[0]) / pd.Timedelta(days=365.25)
+    return (len(index) - 1) / span if span > 0 else PERIODS_PER_YEAR
+
+
+def signal_scores(signals, proba_up=None):
+    """
+    Map signal labels to directional scores in [-1, 1].
+
+    Args:
+        signals: Labels (scalar, array, Series or DataFrame)
+        proba_up: Optional P(up) of the same shape; scores are multiplied
+                  by the conviction |2p - 1|
+
+    Returns:
+        Scores with the same shape (pandas in, pandas out)
+    """
+    labels, inverse = np.unique(np.asarray(signals, dtype=object).astype(str), return_inverse=True)
+    lookup = np.array([SIGNAL_SCORES.get(label, 0.0) for label in labels])
+    scores = lookup[inverse].reshape(np.shape(signals))
+    if isinstance(signals, pd.DataFrame):
+        scores = pd.DataFrame(scores, index=signals.index, columns=signals.columns)
+    elif isinstance(signals, pd.Series):
+        scores = pd.Series(scores, index=signals.index, name=signals.name)
+    if proba_up is not None:
+        scores = scores * np.abs(2.0 * np.asarray(proba_up, dtype=float) - 1.0)
+    return scores
+
+
+def target_weights(scores, returns, target_vol=0.15, max_weight=0.25, max_gross=1.0,
+                   periods_per_year=PERIODS_PER_YEAR):
+    """
+    Position weights for one rebalance date.
+
+    Args:
+        scores: Directional scores per asset, shape [N]
+        returns: Recent returns window, shape [L, N] (the lookback)
+        target_vol: Annualized portfolio volatility target
+        max_weight: Cap on |weight| per asset
+        max_gross: Cap on sum(|weights|)
+        periods_per_year: Bars per year (see bars_per_year() for intraday bars)
+
+    Returns:
+        Weights, shape [N] (fraction of capital, negative = short)
+    """
+    scores = np.asarray(scores, dtype=float)[None, :]
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    w = _size(scores, returns.T[None], target_vol, max_weight, max_gross, periods_per_year)
+    return w[0]
+
+
+def _size(scores, windows, target_vol, max_weight, max_gross, periods_per_year):
+    """Vectorized sizing: scores [T, N], windows [T, N, L] -> weights [T, N]"""
+    ann = np.sqrt(periods_per_year)
+    vol = windows.std(axis=2) * ann
+    n_active = np.maximum((scores != 0).sum(axis=1, keepdims=True), 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = np.where(vol > 0, scores * target_vol / (vol * np.sqrt(n_active)), 0.0)
+    w = np.clip(w, -max_weight, max_weight)
+
+    # Covariance-aware scaling: realized vol of the book over the window
+    port = np.einsum('tnl,tn->tl', windows, w)
+    port_vol = port.std(axis=1) * ann
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.where(port_vol > target_vol, target_vol / port_vol, 1.0)
+    w *= scale[:, None]
+
+    gross = np.abs(w).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w *= np.where(gross > max_gross, max_gross / gross, 1.0)[:, None]
+    return w
+
+
+def backtest(returns, scores, lookback=60, rebalance=1, target_vol=0.15, max_weight=0.25,
+             max_gross=1.0, cost_bps=10.0, periods_per_year=None, chunk=256):
+    """
+    Size and simulate the strategy over a whole history.
+
+    Weights decided at the close of bar t earn the returns of bar t+1.
+
+    Args:
+        returns: DataFrame [T x N] of asset returns
+        scores: DataFrame [T x N] of directional scores (see signal_scores)
+        lookback: Bars of history used for volatility and covariance
+        rebalance: Rebalance every this many bars (weights held in between)
+        cost_bps: Transaction cost per unit of turnover, in basis points
+        periods_per_year: Bars per year (default: from the bar spacing of
+                          returns.index)
+        chunk: Dates processed per vectorized block (bounds peak memory)
+
+    Returns:
+        Dict with 'weights' (DataFrame), 'pnl' (Series) and 'stats' (dict)
+    """
+    if periods_per_year is None:
+        periods_per_year = bars_per_year(returns.index)
+    scores = scores.reindex(index=returns.index, columns=returns.columns).fillna(0.0)
+    r = np.nan_to_num(returns.to_numpy(dtype=float))
+    s = scores.to_numpy(dtype=float)
+    n_bars, n_assets = r.shape
+
+    weights = np.zeros((n_bars, n_assets))
+    if n_bars >= lookback:
+        windows = sliding_window_view(r, lookback, axis=0)  # [T - L + 1, N, L], no copy
+        for start in range(0, len(windows), chunk):
+            stop = min(start + chunk, len(windows))
+            t0 = start + lookback - 1
+            weights[t0:t0 + stop - start] = _size(
+                s[t0:t0 + stop - start], windows[start:stop],
+                target_vol, max_weight, max_gross, periods_per_year
+            )
+
+    # Hold weights between rebalance dates
+    held = np.arange(n_bars) // rebalance * rebalance
+    weights = weights[held]
+
+    gross_pnl = np.zeros(n_bars)
+    gross_pnl[1:] = (weights[:-1] * r[1:]).sum(axis=1)
+    turnover = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+    pnl = pd.Series(gross_pnl - turnover * cost_bps / 1e4, index=returns.index, name='pnl')
+
+    equity = (1.0 + pnl).cumprod()
+    years = max(n_bars / periods_per_year, 1e-9)
+    vol = pnl.std() * np.sqrt(periods_per_year)
+    stats = {
+        'annual_return': float(equity.iloc[-1] ** (1.0 / years) - 1.0) if n_bars else 0.0,
+        'annual_vol': float(vol),
+        'sharpe': float(pnl.mean() * periods_per_year / vol) if vol > 0 else 0.0,
+        'max_drawdown': float((equity / equity.cummax() - 1.0).min()) if n_bars else 0.0,
+        'avg_turnover': float(turnover.mean()),
+        'avg_gross': float(np.abs(weights).sum(axis=1).mean()),
+    }
+    return {
+        'weights': pd.DataFrame(weights, index=returns.index, columns=returns.columns),
+        'pnl': pnl,
+        'stats': stats,
+    }
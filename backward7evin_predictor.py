@@ -8,22 +8,52 @@ Advanced Supervised Learning: Random Forest & XGBoost
 Predicts next-day BTC movement direction (Up/Down) based on macro correlations
 """
 
+import argparse
+import resource
+import time
+import tracemalloc
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import StandardScaler
+from backward7evin_ewma import ewma_features
+from backward7evin_alignment import align_prices
+from backward7evin_sink import append_history
+from backward7evin_calibration import ProbabilityCalibrator
+from backward7evin_targets import build_targets, BUCKET_LABELS
+from backward7evin_levels import level_features
+from backward7evin_kernels import pct_change, rolling_corr, rolling_std, sma, rsi
+from backward7evin_feature_store import FeatureStore, spec_key
+from backward7evin_importance import feature_importance as compute_importance
+from backward7evin_leadlag import best_leads, lead_lag_features
 import warnings
 warnings.filterwarnings('ignore')
 
+# Bump whenever compute_features changes, so stored feature matrices are rebuilt
+FEATURE_SPEC_VERSION = 1
+
+LEVEL_WINDOW = 20  # bars behind the rolling Fibonacci / pivot / swing features
+
 class CryptoPredictor:
     """Advanced cryptocurrency movement predictor using Random Forest"""
 
-    def __init__(self, lookback_days=90):
+    def __init__(self, lookback_days=90, use_ewma=False, horizons=None, use_levels=False,
+                 feature_store=None, use_lead_lag=False, max_lag=5):
         self.lookback_days = lookback_days
+        self.use_ewma = use_ewma  # add EW vol/corr and Wilder RSI features
+        self.use_levels = use_levels  # add BTC Fibonacci/pivot/swing distance features
+        self.use_lead_lag = use_lead_lag  # add returns of assets that lead BTC, at their best lag
+        self.max_lag = max_lag
+        self.lead_lags = None  # {column: (lag, corr)}, fitted on training bars only
+        self.feature_store = feature_store  # FeatureStore serving precomputed float32 features
+        self.horizons = horizons  # e.g. (1, 3, 5, 10) to also train multi-horizon targets
+        self.multi_model = None
+        self.target_names = []
         self.model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
@@ -33,6 +63,7 @@ class CryptoPredictor:
             n_jobs=-1
         )
         self.scaler = StandardScaler()
+        self.calibrator = ProbabilityCalibrator()
         self.feature_names = []
 
     def fetch_data(self):
@@ -63,57 +94,110 @@ class CryptoPredictor:
             except Exception as e:
                 print(f"Warning: Could not fetch {symbol}")
 
-        df = pd.DataFrame(data).dropna()
+        df = align_prices(data)  # forward-fill exchange-hours assets over closed days
         print(f"Loaded {len(df)} days of complete data")
         return df
 
+    def feature_spec(self):
+        """Feature spec string keying this configuration in a FeatureStore"""
+        options = {'use_ewma': self.use_ewma, 'use_levels': self.use_levels}
+        if self.use_lead_lag:
+            options['lead_lags'] = sorted((col, lag) for col, (lag, _) in self.lead_lags.items())
+        return spec_key('predictor', FEATURE_SPEC_VERSION, **options)
+
+    def fit_lead_lags(self, df):
+        """Pick the lag (1..max_lag) at which each asset's returns best lead BTC's"""
+        self.lead_lags = best_leads(df.pct_change().iloc[1:], 'BTC', self.max_lag)
+        return self.lead_lags
+
     def engineer_features(self, df):
         """Create features for machine learning"""
-        features_df = pd.DataFrame(index=df.index)
+        if self.use_lead_lag and self.lead_lags is None:
+            # The first 80% of bars end before the temporal train/test split
+            # of the feature rows (which lose their warm-up bars), so the lags
+            # never see test data
+            self.fit_lead_lags(df.iloc[:int(len(df) * 0.8)])
+        if self.feature_store is not None:
+            features_df = self.feature_store.features(df, self.compute_features, self.feature_spec())
+            features_df = features_df.set_axis(df.index)
+        else:
+            features_df = self.compute_features(df)
+
+        # Target: Next day BTC movement (1 = Up, 0 = Down)
+        features_df['target'] = (df['BTC'].shift(-1) > df['BTC']).astype(int)
+
+        # Clean data
+        features_df = features_df.dropna()
 
-        # Calculate returns for all assets
-        for col in df.columns:
-            features_df[f'{col}_return'] = df[col].pct_change()
-            features_df[f'{col}_return_5d'] = df[col].pct_change(5)
-            features_df[f'{col}_return_10d'] = df[col].pct_change(10)
+        return features_df
 
-        # Rolling correlations with BTC
-        window = 20
-        for col in df.columns:
+    def feature_columns(self, columns):
+        """Names of the core feature columns for price columns, in matrix order"""
+        names = [f'{col}_{kind}' for col in columns for kind in ('return', 'return_5d', 'return_10d')]
+        names += [f'corr_{col}_BTC' for col in columns if col != 'BTC']
+        names += [f'{col}_volatility' for col in columns]
+        names += ['BTC_momentum_5', 'BTC_momentum_10', 'BTC_MA7', 'BTC_MA21', 'BTC_MA_diff', 'BTC_RSI']
+        return names
+
+    def compute_features(self, df):
+        """
+        Feature columns for every bar (rolling warm-up rows are NaN).
+
+        Core features are written in place into one preallocated float32
+        matrix (column-major, so every feature is contiguous) from
+        single-column float64 temporaries. The optional EWMA, level and
+        lead-lag blocks are built as float64 DataFrames by their modules;
+        each is downcast to float32 as soon as it is built and copied in.
+        """
+        # Optional blocks come first so the matrix can be sized once
+        extras = []
+        if self.use_ewma:  # same values the live EWMAEngine reports
+            extras.append(ewma_features(df, base='BTC').astype(np.float32))
+        if self.use_levels:  # rolling Fibonacci, pivots, swings
+            extras.append(level_features(df, window=LEVEL_WINDOW, columns=['BTC']).astype(np.float32))
+        if self.use_lead_lag:  # leading assets' returns at their fitted lag
+            extras.append(lead_lag_features(df, self.lead_lags).astype(np.float32))
+
+        names = self.feature_columns(df.columns) + [c for block in extras for c in block.columns]
+        at = {name: i for i, name in enumerate(names)}
+        X = np.empty((len(df), len(names)), dtype=np.float32, order='F')
+
+        prices = df.to_numpy(dtype=np.float64)
+        btc = prices[:, df.columns.get_loc('BTC')]
+
+        for j, col in enumerate(df.columns):
+            x = prices[:, j]
+            # Returns
+            X[:, at[f'{col}_return']] = ret = pct_change(x)
+            X[:, at[f'{col}_return_5d']] = pct_change(x, 5)
+            X[:, at[f'{col}_return_10d']] = pct_change(x, 10)
+            # Rolling correlation with BTC
             if col != 'BTC':
-                features_df[f'corr_{col}_BTC'] = (
-                    df[col].rolling(window).corr(df['BTC'])
-                )
-
-        # Volatility features
-        for col in df.columns:
-            features_df[f'{col}_volatility'] = (
-                df[col].pct_change().rolling(10).std()
-            )
+                X[:, at[f'corr_{col}_BTC']] = rolling_corr(x, btc, 20)
+            # Volatility
+            X[:, at[f'{col}_volatility']] = rolling_std(ret, 10)
 
         # Momentum indicators
-        features_df['BTC_momentum_5'] = df['BTC'].diff(5)
-        features_df['BTC_momentum_10'] = df['BTC'].diff(10)
+        for lag in (5, 10):
+            momentum = X[:, at[f'BTC_momentum_{lag}']]
+            momentum[:lag] = np.nan
+            np.subtract(btc[lag:], btc[:-lag], out=momentum[lag:])
 
         # Moving averages
-        features_df['BTC_MA7'] = df['BTC'].rolling(7).mean()
-        features_df['BTC_MA21'] = df['BTC'].rolling(21).mean()
-        features_df['BTC_MA_diff'] = features_df['BTC_MA7'] - features_df['BTC_MA21']
+        ma7, ma21 = sma(btc, 7), sma(btc, 21)
+        X[:, at['BTC_MA7']] = ma7
+        X[:, at['BTC_MA21']] = ma21
+        np.subtract(ma7, ma21, out=X[:, at['BTC_MA_diff']])
 
         # RSI-like indicator
-        delta = df['BTC'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        features_df['BTC_RSI'] = 100 - (100 / (1 + rs))
+        X[:, at['BTC_RSI']] = rsi(btc, 14)
 
-        # Target: Next day BTC movement (1 = Up, 0 = Down)
-        features_df['target'] = (df['BTC'].shift(-1) > df['BTC']).astype(int)
-
-        # Clean data
-        features_df = features_df.dropna()
+        k = len(names) - sum(block.shape[1] for block in extras)
+        for block in extras:
+            X[:, k:k + block.shape[1]] = block.to_numpy(dtype=np.float32)
+            k += block.shape[1]
 
-        return features_df
+        return pd.DataFrame(X, index=df.index, columns=names, copy=False)
 
     def train_model(self, X_train, y_train):
         """Train Random Forest classifier"""
@@ -122,7 +206,8 @@ class CryptoPredictor:
         # Scale features
         X_train_scaled = self.scaler.fit_transform(X_train)
 
-        # Train model
+        # Calibrate on time-ordered out-of-fold predictions, then train on everything
+        self.calibrator.fit(self.model, X_train_scaled, y_train)
         self.model.fit(X_train_scaled, y_train)
 
         # Cross-validation
@@ -157,12 +242,11 @@ class CryptoPredictor:
         print(classification_report(y_test, y_pred,
                                    target_names=['Down', 'Up']))
 
-        # Feature Importance
-        print("\nTop 10 Most Important Features:")
-        feature_importance = pd.DataFrame({
-            'feature': self.feature_names,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
+        # Feature Importance: impurity, out-of-sample block permutation and
+        # mean |tree contribution| to P(up)
+        print("\nTop 10 Most Important Features (test-period permutation):")
+        feature_importance = compute_importance(self.model, X_test_scaled, y_test,
+                                                feature_names=self.feature_names)
 
         print(feature_importance.head(10).to_string(index=False))
 
@@ -172,8 +256,8 @@ class CryptoPredictor:
         """Predict signal for most recent data"""
         latest_features = features_df.iloc[-1:, :-1]
         latest_scaled = self.scaler.transform(latest_features)
-        prediction = self.model.predict(latest_scaled)[0]
-        probability = self.model.predict_proba(latest_scaled)[0]
+        probability = self.calibrator.calibrate_proba(self.model.predict_proba(latest_scaled))[0]
+        prediction = int(probability[1] >= 0.5)
 
         signal = "BUY LONG" if prediction == 1 else "BUY SHORT"
         confidence = max(probability) * 100
@@ -184,9 +268,45 @@ class CryptoPredictor:
         print(f"Prediction: {signal}")
         print(f"Confidence: {confidence:.2f}%")
         print(f"Probability [Down, Up]: [{probability[0]:.3f}, {probability[1]:.3f}]")
+        print(f"Calibration: {self.calibrator.method_used} ({self.calibrator.n_samples} out-of-fold points)")
 
         return signal, confidence
 
+    def train_multi_horizon(self, X_train, Y_train):
+        """Train one multi-output forest for all horizon targets on the shared scaled features"""
+        print(f"\nTraining multi-horizon model ({Y_train.shape[1]} targets)...")
+        X_train_scaled = self.scaler.transform(X_train)  # scaler fitted once in train_model
+        self.multi_model = clone(self.model)
+        self.multi_model.fit(X_train_scaled, Y_train.to_numpy(dtype=int))
+        return self.multi_model
+
+    def evaluate_multi_horizon(self, X_test, Y_test):
+        """Per-target test accuracy of the multi-horizon model"""
+        Y_pred = self.multi_model.predict(self.scaler.transform(X_test))
+        Y_true = Y_test.to_numpy(dtype=int)
+        scores = pd.DataFrame({
+            'target': Y_test.columns,
+            'accuracy': (Y_pred == Y_true).mean(axis=0),
+        })
+        print("\nMulti-horizon test accuracy:")
+        print(scores.to_string(index=False))
+        return scores
+
+    def predict_multi_horizon(self, features_df):
+        """Latest prediction and probability for every horizon target"""
+        latest_scaled = self.scaler.transform(features_df.iloc[-1:, :-1])
+        probas = self.multi_model.predict_proba(latest_scaled)
+        predictions = {}
+        for name, classes, proba in zip(self.target_names, self.multi_model.classes_, probas):
+            k = int(np.argmax(proba[0]))
+            label = int(classes[k])
+            if name.startswith('up_'):
+                label = 'Up' if label == 1 else 'Down'
+            else:
+                label = BUCKET_LABELS[label]
+            predictions[name] = (label, float(proba[0][k]) * 100)
+        return predictions
+
     def run_full_analysis(self):
         """Execute complete prediction workflow"""
         print("="*60)
@@ -224,23 +344,89 @@ class CryptoPredictor:
         # Step 6: Current prediction
         signal, confidence = self.predict_current_signal(features_df)
 
+        # Step 7 (optional): multi-horizon targets on the same features and scaler
+        multi_predictions = None
+        if self.horizons:
+            targets = build_targets(df['BTC'], self.horizons).reindex(features_df.index)
+            labeled = targets.notna().all(axis=1).to_numpy()
+            self.target_names = targets.columns.tolist()
+            train_mask = labeled & (np.arange(len(X)) < split_idx)
+            test_mask = labeled & (np.arange(len(X)) >= split_idx)
+            self.train_multi_horizon(X[train_mask], targets[train_mask])
+            if test_mask.any():
+                self.evaluate_multi_horizon(X[test_mask], targets[test_mask])
+            multi_predictions = self.predict_multi_horizon(features_df)
+            for name, (label, conf) in multi_predictions.items():
+                print(f"  {name:<12} {label:<9} ({conf:.1f}%)")
+
         # Save results
         results = {
             'accuracy': accuracy,
             'signal': signal,
             'confidence': confidence,
-            'feature_importance': feature_importance
+            'feature_importance': feature_importance,
+            'calibrator': self.calibrator,
+            'multi_horizon': multi_predictions
         }
 
         # Save feature importance to CSV
         feature_importance.to_csv('feature_importance.csv', index=False)
         print(f"\nFeature importance saved to: feature_importance.csv")
 
+        # Append this run to the columnar history (skipped without pyarrow)
+        prediction = pd.DataFrame([{
+            'as_of': features_df.index[-1],
+            'signal': signal,
+            'confidence': confidence,
+            'accuracy': accuracy,
+        }])
+        if append_history('predictions', prediction):
+            append_history('feature_importance', feature_importance)
+            print("Run appended to: signal_history/")
+
         return results
 
-def main():
-    """Main execution"""
-    predictor = CryptoPredictor(lookback_days=90)
+def benchmark(n_assets=50, years=10, seed=5):
+    """
+    Time and memory of compute_features with every optional block enabled,
+    on synthetic daily closes (same seed, same numbers on every run).
+
+    Peak is the largest traced NumPy/Python allocation during the call;
+    RSS is the process high-water mark, so it includes the input frame.
+    """
+    rng = np.random.default_rng(seed)
+    n = 365 * years
+    columns = ['BTC'] + [f'A{i}' for i in range(n_assets - 1)]
+    df = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, n_assets)), axis=0)),
+                      index=pd.date_range('2015-01-01', periods=n, freq='D'), columns=columns)
+    predictor = CryptoPredictor(use_ewma=True, use_levels=True, use_lead_lag=True)
+    predictor.fit_lead_lags(df)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    features = predictor.compute_features(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    matrix = features.to_numpy(copy=False).nbytes
+    return {'bars': n, 'assets': n_assets, 'features': features.shape[1],
+            'dtype': str(features.dtypes.iloc[0]), 'seconds': round(elapsed, 3),
+            'matrix_MB': round(matrix / 2**20, 2), 'peak_MB': round(peak / 2**20, 2),
+            'peak_over_matrix': round(peak / matrix, 2),
+            'max_rss_MB': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1)}
+
+
+def main(argv=None):
+    """Main execution (`benchmark` measures feature-building time and memory offline)"""
+    parser = argparse.ArgumentParser(description="The Backward 7evin - BTC direction predictor")
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'benchmark'])
+    args = parser.parse_args(argv)
+    if args.command == 'benchmark':
+        print(pd.Series(benchmark()).to_string())
+        return
+
+    predictor = CryptoPredictor(lookback_days=90, feature_store=FeatureStore())
     results = predictor.run_full_analysis()
 
     print("\n" + "="*60)
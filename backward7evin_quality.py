@@ -0,0 +1,141 @@
+"""
+The Backward 7evin - Data Quality Validation
+CS379 Machine Learning - Bad-Tick Screening Before Correlations
+
+Yahoo occasionally serves zero prices, frozen (stale) closes, missing
+stretches and one-bar spikes. A single bad tick can flip a 20-day
+correlation and with it a trading signal, and the fetchers only checked
+`if not df.empty`. validate_prices screens the whole price matrix at once,
+before any forward-filling:
+
+- non-positive prices
+- stale closes: the same close repeated `stale_run` or more times in a row
+- gaps: time between observed bars far above the series' usual spacing
+- spikes: a log return that is an outlier by rolling robust z-score
+  (median / MAD) and is immediately reversed by an opposite outlier
+
+Flagged bars are quarantined (set to NaN) so alignment can bridge them, and
+a symbol with too many bad bars is excluded rather than dragging every other
+symbol's rows out of the merged frame. Per-symbol metrics are returned as a
+report table.
+"""
+
+import numpy as np
+import pandas as pd
+
+STALE_RUN = 5           # identical closes in a row before the repeats are stale
+GAP_FACTOR = 4.0        # gap = spacing above 4x the series' median spacing
+MAD_WINDOW = 30         # returns in the rolling median / MAD
+Z_THRESHOLD = 8.0       # robust z-score for an outlier return
+MAX_BAD_FRACTION = 0.2  # quarantined share of bars above which a symbol is excluded
+
+# Scales MAD to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+
+def _stale_streak(values, observed):
+    """Consecutive repeats of the previous observed close ending at each bar"""
+    prev = pd.DataFrame(values).ffill().shift(1).to_numpy()
+    same = observed & (values == prev)
+    count = np.cumsum(same, axis=0)
+    # Reset the count at every observed bar that is not a repeat
+    reset = np.maximum.accumulate(np.where(observed & ~same, count, 0), axis=0)
+    return count - reset
+
+
+def _robust_z(returns, window):
+    """Rolling robust z-score of returns (NaN-aware, per column)"""
+    frame = pd.DataFrame(returns)
+    min_periods = max(window // 2, 5)
+    med = frame.rolling(window, min_periods=min_periods).median().shift(1)
+    mad = (frame - med).abs().rolling(window, min_periods=min_periods).median().shift(1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (frame - med).to_numpy() / (MAD_SCALE * mad.to_numpy())
+    return z
+
+
+def validate_prices(prices, stale_run=STALE_RUN, gap_factor=GAP_FACTOR, mad_window=MAD_WINDOW,
+                    z_threshold=Z_THRESHOLD, max_bad_fraction=MAX_BAD_FRACTION):
+    """
+    Screen a price matrix for bad bars and quarantine them.
+
+    Args:
+        prices: DataFrame of closes on a shared (union) index; NaN where a
+                symbol has no bar (e.g. exchange holidays)
+        stale_run: Identical closes in a row before the later repeats count as stale
+        gap_factor: Multiple of the median bar spacing that counts as a gap
+        mad_window: Rolling window (in observed returns) for the robust z-score
+        z_threshold: |z| above which a return is an outlier
+        max_bad_fraction: Symbols with a larger share of quarantined bars are dropped
+
+    Returns:
+        (clean DataFrame with quarantined bars set to NaN and excluded symbols
+        removed, report DataFrame with one row of metrics per symbol)
+    """
+    if prices.empty:
+        return prices, pd.DataFrame()
+
+    values = prices.to_numpy(dtype=np.float64, copy=True)
+    observed = ~np.isnan(values)
+
+    # 1. Non-positive prices
+    non_positive = observed & (values <= 0)
+    values[non_positive] = np.nan
+    observed &= ~non_positive
+
+    # 2. Stale closes: keep the first `stale_run - 1` repeats, quarantine the rest
+    stale = _stale_streak(values, observed) > stale_run - 1
+    stale &= observed
+
+    # 3. Spikes: log returns between consecutive observed bars, screened by
+    #    robust z-score; a spike is an outlier immediately reversed by another
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prev = pd.DataFrame(values).ffill().shift(1).to_numpy()
+        returns = np.where(observed, np.log(values / prev), np.nan)
+    z = _robust_z(returns, mad_window)
+    outlier = np.abs(z) > z_threshold
+    next_z = pd.DataFrame(np.where(observed, z, np.nan)).bfill().shift(-1).to_numpy()
+    spike = outlier & (np.abs(next_z) > z_threshold) & (np.sign(next_z) != np.sign(z))
+
+    quarantine = stale | spike
+    values[quarantine] = np.nan
+
+    # 4. Gaps between observed bars, relative to each symbol's usual spacing
+    stamps = prices.index.to_numpy().astype('datetime64[ns]').astype(np.int64)
+    seen = np.where(observed, stamps[:, None], np.nan)
+    spacing = seen - pd.DataFrame(seen).ffill().shift(1).to_numpy()
+    with np.errstate(invalid='ignore'):
+        median_spacing = np.nanmedian(np.where(spacing > 0, spacing, np.nan), axis=0)
+        gaps = spacing > gap_factor * median_spacing
+    max_gap_days = np.nan_to_num(np.nanmax(np.where(observed, spacing, 0.0), axis=0)) / 86_400e9
+
+    n_bars = observed.sum(axis=0) + non_positive.sum(axis=0)
+    n_quarantined = non_positive.sum(axis=0) + quarantine.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bad_fraction = np.where(n_bars > 0, n_quarantined / n_bars, 1.0)
+    excluded = bad_fraction > max_bad_fraction
+
+    report = pd.DataFrame({
+        'Asset': list(prices.columns),
+        'Bars': n_bars,
+        'Non_Positive': non_positive.sum(axis=0),
+        'Stale': stale.sum(axis=0),
+        'Outliers': outlier.sum(axis=0),
+        'Spikes': spike.sum(axis=0),
+        'Gaps': gaps.sum(axis=0),
+        'Max_Gap_Days': np.round(max_gap_days, 2),
+        'Quarantined': n_quarantined,
+        'Quarantined_Pct': np.round(100.0 * bad_fraction, 2),
+        'Status': np.where(excluded, 'Excluded', np.where(n_quarantined > 0, 'Quarantined', 'OK')),
+    })
+
+    clean = pd.DataFrame(values, index=prices.index, columns=prices.columns)
+    clean = clean.loc[:, ~excluded]
+    return clean, report
+
+
+def quality_issues(report):
+    """Rows of a quality report that need attention (anything not 'OK')"""
+    if report is None or report.empty:
+        return pd.DataFrame()
+    return report[report['Status'] != 'OK']
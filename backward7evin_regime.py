@@ -0,0 +1,257 @@
+"""
+The Backward 7evin - Regime-Aware Classifier
+CS379 Machine Learning - Multi-Horizon Correlation Tensors
+
+`classify_signal` sees one point-in-time correlation per driver and ignores
+S&P 500 and USD. This module precomputes every rolling correlation once, as
+an (asset x time x driver x window) tensor, using cumulative sums. The
+regime classifier then only reads slices of it:
+
+    tensor.values[asset, t]          -> [driver, window] block (contiguous)
+    tensor.window(60)[:, t, :]       -> all assets, all drivers at one horizon
+
+Adding a horizon or driver costs one more cumulative-sum pass at build time
+and nothing at classification time. The tensor also holds, per asset, time
+and window, the strongest lagged return correlation with BTC, so the base
+signal applies v2's lead-lag rule like classify_universe does.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backward7evin_classifier_v2_enhanced import LEAD_LAG_MAX, MACRO_DRIVERS, classify_signal_array
+from backward7evin_kernels import rolling_corr
+
+# Rolling horizons in bars (trading days for daily data)
+WINDOWS = (20, 60, 90)
+
+# Correlations this strong count as a clear relationship in regime rules
+REGIME_THRESHOLD = 0.3
+
+
+def rolling_corr_pairs(x, y, window):
+    """
+    Rolling Pearson correlation of every column of x with every column of y.
+
+    Uses the cumulative-sum kernel, so the cost is O(T) per pair regardless
+    of the window length.
+
+    Args:
+        x: Array [T, A]
+        y: Array [T, D]
+        window: Window length in rows
+
+    Returns:
+        float32 array [T, A, D]; NaN where the window is incomplete or
+        contains a missing value
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return rolling_corr(x[:, :, None], y[:, None, :], window).astype(np.float32)
+
+
+def rolling_lag_corr(returns, btc, window, max_lag=LEAD_LAG_MAX):
+    """
+    Strongest non-contemporaneous rolling return correlation with BTC.
+
+    Lag L > 0 correlates asset_t with btc_{t-L}, L < 0 asset_{t-|L|} with
+    btc_t, so every window only uses bars up to its end (no look-ahead).
+
+    Args:
+        returns: Asset returns [T, A]
+        btc: BTC returns [T]
+        window: Window length in rows
+
+    Returns:
+        float32 array [T, A]: the correlation with the largest |value| over
+        lags 1..max_lag in both directions (NaN where no lag is defined)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    btc = np.asarray(btc, dtype=np.float64)[:, None]
+
+    def shift(a, lag):
+        out = np.full(a.shape, np.nan)
+        out[lag:] = a[:len(a) - lag]
+        return out
+
+    best = np.full(returns.shape, np.nan)
+    for lag in range(1, max_lag + 1):
+        for corr in (rolling_corr(returns, shift(btc, lag), window),
+                     rolling_corr(shift(returns, lag), btc, window)):
+            better = np.isnan(best) | (np.abs(corr) > np.abs(best))
+            best = np.where(better & ~np.isnan(corr), corr, best)
+    return best.astype(np.float32)
+
+
+class CorrelationTensor:
+    """Precomputed rolling correlations indexed [asset, time, driver, window]"""
+
+    def __init__(self, values, assets, drivers, windows, index, lag_corr=None):
+        self.values = values
+        self.assets = list(assets)
+        self.drivers = list(drivers)
+        self.windows = tuple(windows)
+        self.index = index
+        self.lag_corr = lag_corr    # [asset, time, window] lagged BTC correlation, or None
+
+    @classmethod
+    def build(cls, prices, assets, drivers=None, windows=WINDOWS):
+        """
+        Build the tensor from a price DataFrame.
+
+        Correlations are computed on closes, like calculate_correlations,
+        so the classify_signal thresholds keep their meaning.
+
+        Args:
+            prices: DataFrame of closes (rows = bars)
+            assets: Columns to classify
+            drivers: Driver columns (default: the v2 MACRO_DRIVERS)
+            windows: Rolling horizons
+
+        Returns:
+            CorrelationTensor
+        """
+        if drivers is None:
+            drivers = list(MACRO_DRIVERS.keys())
+        assets = [a for a in assets if a in prices.columns]
+        drivers = [d for d in drivers if d in prices.columns]
+        x = prices[assets].to_numpy(dtype=np.float64)
+        y = prices[drivers].to_numpy(dtype=np.float64)
+
+        values = np.empty((len(assets), len(prices), len(drivers), len(windows)), dtype=np.float32)
+        for k, w in enumerate(windows):
+            values[:, :, :, k] = rolling_corr_pairs(x, y, w).transpose(1, 0, 2)
+
+        lag_corr = None
+        if 'BTC-USD' in prices.columns:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                returns = np.full(x.shape, np.nan)
+                returns[1:] = x[1:] / x[:-1] - 1.0
+                close = prices['BTC-USD'].to_numpy(dtype=np.float64)
+                btc = np.full(len(close), np.nan)
+                btc[1:] = close[1:] / close[:-1] - 1.0
+            lag_corr = np.empty((len(assets), len(prices), len(windows)), dtype=np.float32)
+            for k, w in enumerate(windows):
+                lag_corr[:, :, k] = rolling_lag_corr(returns, btc, w).T
+        return cls(values, assets, drivers, windows, prices.index, lag_corr)
+
+    def window(self, w):
+        """View [asset, time, driver] for one horizon"""
+        return self.values[:, :, :, self.windows.index(w)]
+
+    def driver(self, d):
+        """View [asset, time, window] for one driver"""
+        return self.values[:, :, self.drivers.index(d), :]
+
+    def at(self, t=-1):
+        """View [asset, driver, window] at one time step (position or timestamp)"""
+        if not isinstance(t, (int, np.integer)):
+            t = self.index.get_loc(t)
+        return self.values[:, t]
+
+    def lag_at(self, t=-1):
+        """Lagged BTC correlations [asset, window] at one time step (None if not built)"""
+        if self.lag_corr is None:
+            return None
+        if not isinstance(t, (int, np.integer)):
+            t = self.index.get_loc(t)
+        return self.lag_corr[:, t]
+
+    def nbytes(self):
+        return self.values.nbytes + (0 if self.lag_corr is None else self.lag_corr.nbytes)
+
+
+def _driver_slice(block, drivers, symbol):
+    """Correlation column for a driver, or NaN if the driver isn't in the tensor"""
+    if symbol in drivers:
+        return block[..., drivers.index(symbol), :]
+    return np.full(block.shape[:-2] + block.shape[-1:], np.nan, dtype=np.float32)
+
+
+def _regime_rules(block, drivers, windows, k, lag=None):
+    """
+    Regime rules on any [..., driver, window] block: one time slice
+    ([asset, driver, window]) or the whole tensor ([asset, time, driver,
+    window]). Every rule is elementwise, so the leading axes are free.
+    `lag` is the matching [..., window] lagged BTC correlation (or None).
+
+    Returns:
+        (signal, base signal, regime, {driver name: [..., window] correlations})
+    """
+    short, long_ = 0, len(windows) - 1
+    btc = _driver_slice(block, drivers, 'BTC-USD')
+    gold = _driver_slice(block, drivers, 'GC=F')
+    sp500 = _driver_slice(block, drivers, '^GSPC')
+    usd = _driver_slice(block, drivers, 'DX-Y.NYB')
+
+    base = classify_signal_array(btc[..., k], gold[..., k], sp500[..., k], usd[..., k],
+                                 btc_lag_corr=None if lag is None else lag[..., k])
+    signal = base.copy()
+
+    # Rule 2: short and long horizons disagree on the BTC relationship
+    flip = ((np.abs(btc[..., short]) > REGIME_THRESHOLD) & (np.abs(btc[..., long_]) > REGIME_THRESHOLD)
+            & (np.sign(btc[..., short]) != np.sign(btc[..., long_])))
+    signal[flip] = 'Erratic'
+
+    # Rule 3: macro regime from equities and the dollar
+    risk_on = (sp500[..., k] > REGIME_THRESHOLD) & (usd[..., k] < -REGIME_THRESHOLD)
+    risk_off = (sp500[..., k] < -REGIME_THRESHOLD) & (usd[..., k] > REGIME_THRESHOLD)
+    regime = np.where(risk_on, 'Risk-On', np.where(risk_off, 'Risk-Off', 'Neutral'))
+    signal[~flip & risk_off & (signal == 'Buy Long')] = 'Caution'
+    signal[~flip & risk_on & (signal == 'Buy Short')] = 'Caution'
+    return signal, base, regime, {'BTC': btc, 'Gold': gold, 'SP500': sp500, 'USD': usd}
+
+
+def classify_regime(tensor, t=-1, base_window=None):
+    """
+    Classify every asset from one time slice of the tensor.
+
+    Rules on top of the five-category classify_signal:
+    1. Base signal from the base horizon (default: the longest window),
+       including v2's lagged-BTC Hold -> Caution rule.
+    2. Horizon conflict: if the shortest and longest BTC correlations are
+       both clear (|corr| > 0.3) but have opposite signs, the relationship
+       is flipping -> 'Erratic'.
+    3. Macro regime from S&P 500 and USD: risk-on (moves with stocks,
+       against the dollar) or risk-off (the reverse). A 'Buy Long' during
+       risk-off, or a 'Buy Short' during risk-on, is downgraded to 'Caution'.
+
+    Args:
+        tensor: CorrelationTensor
+        t: Time position or timestamp
+        base_window: Horizon used for the base signal
+
+    Returns:
+        DataFrame with one row per asset: Asset, Signal, Base_Signal,
+        Regime, the BTC/Gold/SP500/USD correlations per horizon and
+        BTC_Lag_Corr (base horizon, used by the base signal)
+    """
+    if base_window is None:
+        base_window = max(tensor.windows)
+    k = tensor.windows.index(base_window)
+    signal, base, regime, corrs = _regime_rules(tensor.at(t), tensor.drivers, tensor.windows, k,
+                                                tensor.lag_at(t))
+
+    out = {'Asset': tensor.assets, 'Signal': signal, 'Base_Signal': base, 'Regime': regime}
+    for name, corr in corrs.items():
+        for j, w in enumerate(tensor.windows):
+            out[f'{name}_Corr_{w}'] = np.round(corr[:, j], 3)
+    if tensor.lag_corr is not None:
+        out['BTC_Lag_Corr'] = np.round(tensor.lag_at(t)[:, k], 3)
+    return pd.DataFrame(out)
+
+
+def classify_history(tensor, base_window=None):
+    """
+    Regime signal for every asset at every time step, classified in one
+    pass over the whole tensor (no per-step loop).
+
+    Returns:
+        DataFrame [time x asset] of signal labels
+    """
+    if base_window is None:
+        base_window = max(tensor.windows)
+    k = tensor.windows.index(base_window)
+    signal, _, _, _ = _regime_rules(tensor.values, tensor.drivers, tensor.windows, k,
+                                    tensor.lag_corr)   # [asset, time]
+    return pd.DataFrame(signal.T, index=tensor.index, columns=tensor.assets)
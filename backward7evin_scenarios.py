@@ -0,0 +1,305 @@
+"""
+The Backward 7evin - Scenario Stress Engine
+CS379 Machine Learning - How Would the Signals Change Under Shocks?
+
+classify_signal turns today's correlation window into one of five signals.
+This engine asks what those signals would be if the next `horizon` bars were
+different: a USD spike, a gold crash, BTC suddenly trading like equities.
+
+Each Monte Carlo scenario keeps the historical prices of the correlation
+window except the last `horizon` bars, which are simulated log returns
+cumulated onto the last close (v2 correlates price levels, not returns).
+Simulated returns come from either
+
+- a shocked covariance: historical mean / volatility / correlation with
+  overrides, projected to the nearest valid correlation matrix and sampled
+  through its Cholesky factor, or
+- historical episode replay: block bootstrap of the daily return vectors
+  from a past stress period, which keeps that day's cross-asset moves.
+
+Lead-lag with BTC (v2's Hold -> Caution rule) is a property of the return
+history, not of the simulated tail: it is scanned once over the window and
+applied to every scenario, so unshocked signals equal classify_universe's.
+
+The fixed part of the window is summarized once as sums and cross-products,
+so each scenario only costs its simulated tail. Scenarios run in batches
+and can be sharded across processes, which read the return history from
+shared memory.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backward7evin_classifier_v2_enhanced import (
+    MACRO_DRIVERS, CRYPTO_ASSETS, btc_lead_lag, fetch_market_data, classify_signal_array
+)
+from backward7evin_shared import SharedDataset
+
+SIGNALS = ('Buy Long', 'Buy Short', 'Hold', 'Erratic', 'Caution')
+
+# Shock definitions. 'drift' adds to the daily log return, 'vol' scales
+# volatility, 'corr' overrides pairwise correlations and 'episode' replays a
+# historical date range instead of sampling a covariance.
+SCENARIOS = {
+    'usd_spike': {'drift': {'DX-Y.NYB': 0.004}, 'vol': {'DX-Y.NYB': 2.0}},
+    'gold_crash': {'drift': {'GC=F': -0.01}, 'vol': {'GC=F': 2.0}},
+    'btc_equity_coupling': {'corr': {('BTC-USD', '^GSPC'): 0.8}},
+    'covid_crash': {'episode': ('2020-02-20', '2020-04-01')},
+}
+
+
+def nearest_correlation(corr, floor=1e-8):
+    """Clip negative eigenvalues and rescale to a unit diagonal"""
+    vals, vecs = np.linalg.eigh((corr + corr.T) / 2.0)
+    fixed = (vecs * np.maximum(vals, floor)) @ vecs.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+
+class ScenarioEngine:
+    """Monte Carlo re-classification of the v2 signals under return shocks"""
+
+    def __init__(self, prices, assets=None, drivers=None, window=None, horizon=20):
+        """
+        Args:
+            prices: Aligned DataFrame of closes (full history; episodes are
+                    looked up here)
+            assets: Columns to classify (default: the v2 CRYPTO_ASSETS present)
+            drivers: Driver columns (default: the v2 MACRO_DRIVERS present)
+            window: Correlation window in bars (default: all rows, like v2)
+            horizon: Simulated bars at the end of the window
+        """
+        assets = CRYPTO_ASSETS if assets is None else assets
+        drivers = list(MACRO_DRIVERS.keys()) if drivers is None else drivers
+        self.assets = [a for a in assets if a in prices.columns]
+        self.drivers = [d for d in drivers if d in prices.columns]
+        self.columns = self.drivers + self.assets
+        self.window = min(window or len(prices), len(prices))
+        self.horizon = int(horizon)
+        if not 0 < self.horizon < self.window:
+            raise ValueError(f"horizon must be between 1 and window - 1 ({self.window - 1})")
+
+        values = prices[self.columns].to_numpy(dtype=np.float64)
+        self.index = prices.index
+        self.log_returns = np.diff(np.log(values), axis=0)    # full history, for episodes
+        recent = values[-self.window:]
+        self.last_close = recent[-1]
+        self._shared = None
+
+        # Strongest lagged BTC correlation per asset over the window (NaN: no rule)
+        lead_lag = btc_lead_lag(prices.iloc[-self.window:], self.assets)
+        self.btc_lag_corr = np.array([lead_lag.get(a, (0, np.nan))[1] for a in self.assets])
+
+        # Sufficient statistics of the fixed (historical) part of every
+        # scenario window, shifted by the last close for conditioning
+        fixed = recent[self.horizon:] - self.last_close
+        self._sum = fixed.sum(axis=0)
+        self._cross = fixed.T @ fixed
+        self._base = recent - self.last_close
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_dataset', None)
+        if state['_shared'] is not None:
+            state['log_returns'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._shared is not None:
+            self._dataset = SharedDataset.attach(self._shared)
+            self.log_returns = self._dataset['log_returns']
+
+    # ───────────────────────── simulation ─────────────────────────
+
+    def _column(self, symbol):
+        return self.columns.index(symbol) if symbol in self.columns else None
+
+    def shocked_moments(self, spec):
+        """
+        Mean and Cholesky factor of daily log returns under a shock.
+
+        Estimated from the returns inside the correlation window.
+        """
+        returns = self.log_returns[-(self.window - 1):]
+        mu = returns.mean(axis=0)
+        sd = returns.std(axis=0, ddof=1)
+        corr = np.corrcoef(returns, rowvar=False)
+
+        for symbol, mult in spec.get('vol', {}).items():
+            i = self._column(symbol)
+            if i is not None:
+                sd[i] *= mult
+        for symbol, drift in spec.get('drift', {}).items():
+            i = self._column(symbol)
+            if i is not None:
+                mu[i] += drift
+        for (a, b), target in spec.get('corr', {}).items():
+            i, j = self._column(a), self._column(b)
+            if i is not None and j is not None:
+                corr[i, j] = corr[j, i] = target
+
+        corr = nearest_correlation(corr)
+        chol = np.linalg.cholesky(corr * np.outer(sd, sd))
+        return mu, chol
+
+    def episode_returns(self, start, end):
+        """Daily log-return vectors of a historical episode"""
+        dates = self.index[1:]
+        mask = (dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))
+        if mask.sum() < 2:
+            raise ValueError(f"Episode {start}..{end} is not covered by the price history")
+        return self.log_returns[mask]
+
+    def simulate(self, spec, n, rng, block=5):
+        """
+        Simulated tail log returns for n scenarios.
+
+        Returns:
+            Array [n, horizon, n_columns]
+        """
+        if 'episode' in spec:
+            episode = self.episode_returns(*spec['episode'])
+            # Block bootstrap: random contiguous blocks (wrapping) of episode days
+            n_blocks = -(-self.horizon // block)
+            starts = rng.integers(0, len(episode), size=(n, n_blocks, 1))
+            rows = (starts + np.arange(block)) % len(episode)
+            return episode[rows.reshape(n, -1)[:, :self.horizon]]
+        mu, chol = self.shocked_moments(spec)
+        z = rng.standard_normal((n, self.horizon, len(self.columns)))
+        return mu + z @ chol.T
+
+    # ───────────────────────── correlation & signals ─────────────────────────
+
+    def correlations(self, tail_returns):
+        """
+        Price correlations over each scenario window.
+
+        Args:
+            tail_returns: Array [n, horizon, n_columns] of simulated log returns
+
+        Returns:
+            Array [n, n_columns, n_columns]
+        """
+        tail = self.last_close * np.exp(np.cumsum(tail_returns, axis=1)) - self.last_close
+        s = self._sum + tail.sum(axis=1)
+        q = self._cross + np.einsum('shi,shj->sij', tail, tail)
+        w = self.window
+        cov = q - s[:, :, None] * s[:, None, :] / w
+        sd = np.sqrt(np.maximum(np.diagonal(cov, axis1=1, axis2=2), 0.0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / (sd[:, :, None] * sd[:, None, :])
+        return np.nan_to_num(np.clip(corr, -1.0, 1.0))
+
+    def classify(self, corr):
+        """Signals [n, n_assets] from correlation matrices [n, n_columns, n_columns]"""
+        a = [self.columns.index(x) for x in self.assets]
+        zeros = np.zeros((corr.shape[0], len(a)))
+
+        def driver(symbol):
+            i = self._column(symbol)
+            return zeros if i is None else corr[:, a, i]
+
+        lag = np.broadcast_to(self.btc_lag_corr, zeros.shape)
+        return classify_signal_array(driver('BTC-USD'), driver('GC=F'),
+                                     driver('^GSPC'), driver('DX-Y.NYB'), btc_lag_corr=lag)
+
+    def baseline(self):
+        """Signals for the unshocked, fully historical window"""
+        x = self._base
+        s, q = x.sum(axis=0)[None], (x.T @ x)[None]
+        cov = q - s[:, :, None] * s[:, None, :] / self.window
+        sd = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.nan_to_num(cov / (sd[:, :, None] * sd[:, None, :]))
+        return self.classify(corr)[0]
+
+    def signal_counts(self, spec, n, seed=None, batch=1000):
+        """
+        Count signals per asset over n scenarios, in batches of `batch`.
+
+        Returns:
+            int array [n_assets, len(SIGNALS)]
+        """
+        rng = np.random.default_rng(seed)
+        counts = np.zeros((len(self.assets), len(SIGNALS)), dtype=np.int64)
+        for start in range(0, n, batch):
+            size = min(batch, n - start)
+            signals = self.classify(self.correlations(self.simulate(spec, size, rng)))
+            for k, label in enumerate(SIGNALS):
+                counts[:, k] += (signals == label).sum(axis=0)
+        return counts
+
+    def run(self, spec, n_scenarios=1000, seed=0, n_jobs=1, batch=1000):
+        """
+        Signal distribution per asset under a shock.
+
+        Args:
+            spec: Scenario dict (see SCENARIOS) or one of its names
+            n_scenarios: Monte Carlo scenarios
+            seed: Seed; shards get independent child seeds
+            n_jobs: Processes to shard the scenarios across
+            batch: Scenarios simulated per NumPy batch
+
+        Returns:
+            DataFrame per asset: Asset, Baseline, the share (%) of scenarios
+            ending in each signal, and Changed (% differing from Baseline)
+        """
+        if isinstance(spec, str):
+            spec = SCENARIOS[spec]
+        n_jobs = max(1, min(n_jobs, n_scenarios))
+        shard_sizes = [len(s) for s in np.array_split(np.arange(n_scenarios), n_jobs)]
+        seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+
+        if n_jobs == 1:
+            counts = self.signal_counts(spec, n_scenarios, seeds[0], batch)
+        else:
+            # Workers attach to the return history in shared memory instead of
+            # receiving a pickled copy with every shard (see __getstate__)
+            with SharedDataset.create({'log_returns': self.log_returns}) as ds:
+                self._shared = ds.handle
+                try:
+                    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                        parts = pool.map(_shard_counts, [(self, spec, size, s, batch)
+                                                         for size, s in zip(shard_sizes, seeds)])
+                        counts = sum(parts)
+                finally:
+                    self._shared = None
+
+        baseline = self.baseline()
+        share = 100.0 * counts / n_scenarios
+        out = pd.DataFrame({'Asset': [a.replace('-USD', '') for a in self.assets], 'Baseline': baseline})
+        for k, label in enumerate(SIGNALS):
+            out[label] = np.round(share[:, k], 1)
+        same = np.array([share[i, SIGNALS.index(b)] for i, b in enumerate(baseline)])
+        out['Changed'] = np.round(100.0 - same, 1)
+        return out
+
+
+def _shard_counts(args):
+    """Process-pool worker: signal counts for one shard of scenarios"""
+    engine, spec, n, seed, batch = args
+    return engine.signal_counts(spec, n, seed, batch)
+
+
+def main():
+    """Stress the v2 signals under the built-in scenarios"""
+    print("📊 Fetching market data from Yahoo Finance...")
+    drivers = list(MACRO_DRIVERS.keys())
+    prices = fetch_market_data(drivers + CRYPTO_ASSETS, days=365 * 5)
+    engine = ScenarioEngine(prices, window=90, horizon=20)
+
+    for name, spec in SCENARIOS.items():
+        try:
+            table = engine.run(spec, n_scenarios=5000, n_jobs=4)
+        except ValueError as e:
+            print(f"\n⚠️ Skipping {name}: {e}")
+            continue
+        print(f"\n🧪 Scenario: {name}")
+        print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
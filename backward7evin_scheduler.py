@@ -0,0 +1,435 @@
+"""
+The Backward 7evin - Fetch Scheduler
+CS379 Machine Learning - Rate Limits, Retries and Circuit Breakers
+
+Yahoo Finance answers bursts of requests with 429s and 403s. The fetchers
+used to print a warning and carry on with a missing column. FetchScheduler
+runs a universe of downloads through:
+
+- a token bucket (steady request rate with a small burst allowance)
+- exponential backoff with full jitter for retryable failures
+  (429, 403, 5xx, timeouts, yfinance rate-limit errors)
+- a per-host circuit breaker that stops hammering a host that keeps failing
+  and probes it again after a cool-down
+- a priority queue, so macro drivers are fetched (and retried) before the
+  assets that depend on them
+
+FakeQuoteServer is a local HTTP server that injects 429 / 403 / timeout
+responses on a script, so the scheduler can be exercised without touching
+Yahoo. Run this file to check the scheduler against it: it exits non-zero
+unless every symbol ends in results or errors with the scripted number of
+retries.
+"""
+
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HOST = 'query1.finance.yahoo.com'
+RETRYABLE_STATUS = (403, 429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate=2.0, capacity=5, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0, rng=random):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))"""
+    return rng.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: closed -> open after `threshold` consecutive failures;
+    after `reset_timeout` seconds one probe request is allowed (half-open),
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a request may go out now.
+
+        Returns:
+            0.0 if allowed, otherwise seconds until the next probe
+        """
+        with self.lock:
+            if self.state == 'closed':
+                return 0.0
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == 'open' and remaining <= 0:
+                self.state = 'half-open'
+                return 0.0
+            # Open, or half-open with the probe already in flight
+            return max(remaining, 0.1)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+
+def status_of(exc):
+    """HTTP status carried by an exception (urllib, requests, curl_cffi), if any"""
+    for obj in (exc, getattr(exc, 'response', None)):
+        for attr in ('status_code', 'code', 'status'):
+            value = getattr(obj, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable(exc):
+    """Rate limits, auth hiccups (Yahoo 403s), server errors and timeouts"""
+    if isinstance(exc, (TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    if isinstance(exc, urllib.error.URLError) and isinstance(exc.reason, (socket.timeout, TimeoutError)):
+        return True
+    name = type(exc).__name__
+    if 'RateLimit' in name or 'Timeout' in name:
+        return True
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return 'Too Many Requests' in str(exc)
+
+
+class FetchScheduler:
+    """Prioritized, rate-limited, retrying executor for per-symbol downloads"""
+
+    def __init__(self, fetch, rate=2.0, burst=5, workers=4, max_retries=4,
+                 backoff_base=0.5, backoff_cap=30.0, breaker_threshold=5,
+                 breaker_timeout=30.0, host_of=None, seed=None):
+        """
+        Args:
+            fetch: Callable symbol -> result; raises on failure
+            rate, burst: Token-bucket requests per second and burst size
+            workers: Concurrent requests
+            max_retries: Retries per symbol for retryable failures
+            backoff_base, backoff_cap: Full-jitter backoff parameters (seconds)
+            breaker_threshold, breaker_timeout: Circuit-breaker parameters
+            host_of: Callable symbol -> host name (default: one Yahoo host)
+            seed: Seed for the jitter
+        """
+        self.fetch = fetch
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = breaker_timeout
+        self.host_of = host_of or (lambda symbol: DEFAULT_HOST)
+        self.rng = random.Random(seed)
+        self.breakers = {}
+        self.stats = {'requests': 0, 'retries': 0, 'breaker_waits': 0}
+        self.lock = threading.Lock()
+
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_timeout)
+            return self.breakers[host]
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def run(self, symbols, priority=None):
+        """
+        Fetch every symbol.
+
+        Args:
+            symbols: Symbols to fetch
+            priority: Callable symbol -> int, lower first (default: input order)
+
+        Returns:
+            (results {symbol: value}, errors {symbol: exception}) - results
+            keep the input order
+
+        Raises:
+            Whatever a worker raised outside the per-fetch error handling
+            (priority, host_of, bookkeeping); the remaining work is cancelled
+        """
+        priority = priority or (lambda symbol: 0)
+        # (priority, not-before time, sequence, symbol, attempt)
+        queue = [(priority(s), 0.0, i, s, 0) for i, s in enumerate(symbols)]
+        lock = threading.Condition()
+        results, errors = {}, {}
+        pending = [len(queue)]
+        seq = [len(queue)]
+        crashed = []    # set by a dying worker so the others stop too
+
+        def next_job():
+            with lock:
+                while True:
+                    if pending[0] == 0 or crashed:
+                        return None
+                    now = time.monotonic()
+                    ready = [job for job in queue if job[1] <= now]
+                    if ready:
+                        job = min(ready)    # lowest priority value, then oldest
+                        queue.remove(job)
+                        return job
+                    wait = min(job[1] for job in queue) - now if queue else None
+                    lock.wait(timeout=wait)
+
+        def requeue(job, delay):
+            with lock:
+                seq[0] += 1
+                queue.append((job[0], time.monotonic() + delay, seq[0], job[3], job[4]))
+                lock.notify_all()
+
+        def finish(symbol, value=None, error=None):
+            with lock:
+                if error is None:
+                    results[symbol] = value
+                else:
+                    errors[symbol] = error
+                pending[0] -= 1
+                lock.notify_all()
+
+        def worker():
+            try:
+                work()
+            except BaseException:
+                with lock:
+                    crashed.append(True)
+                    lock.notify_all()
+                raise
+
+        def work():
+            while True:
+                job = next_job()
+                if job is None:
+                    return
+                prio, _, _, symbol, attempt = job
+                breaker = self.breaker(self.host_of(symbol))
+                wait = breaker.allow()
+                if wait:
+                    self._count('breaker_waits')
+                    requeue(job, wait)
+                    continue
+                self.bucket.acquire()
+                self._count('requests')
+                try:
+                    value = self.fetch(symbol)
+                except Exception as exc:
+                    retryable = is_retryable(exc)
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()    # the host answered; the symbol is bad
+                    if retryable and attempt < self.max_retries:
+                        self._count('retries')
+                        delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, self.rng)
+                        requeue((prio, 0.0, 0, symbol, attempt + 1), delay)
+                    else:
+                        finish(symbol, error=exc)
+                    continue
+                breaker.record_success()
+                finish(symbol, value)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(worker) for _ in range(self.workers)]
+            for future in futures:
+                future.result()     # re-raises a worker's crash
+
+        ordered = {s: results[s] for s in symbols if s in results}
+        return ordered, errors
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FAKE SERVER (offline testing)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class FakeQuoteServer:
+    """
+    Local HTTP quote server with scripted failures.
+
+    GET /chart/<symbol> returns {"timestamps": [...], "closes": [...]}. The
+    script maps a symbol to a list of failures consumed one per request
+    (429, 403, 500 or 'timeout'); once it is exhausted requests succeed.
+    """
+
+    def __init__(self, script=None, n_bars=90, delay=2.0):
+        self.script = {s: list(steps) for s, steps in (script or {}).items()}
+        self.n_bars = n_bars
+        self.delay = delay
+        self.hits = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                symbol = self.path.rsplit('/', 1)[-1]
+                with server.lock:
+                    server.hits[symbol] = server.hits.get(symbol, 0) + 1
+                    steps = server.script.get(symbol, [])
+                    step = steps.pop(0) if steps else 200
+                if step == 'timeout':
+                    time.sleep(server.delay)
+                    step = 504
+                if step != 200:
+                    self.send_response(step)
+                    self.end_headers()
+                    return
+                body = json.dumps(server.quotes(symbol)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def quotes(self, symbol):
+        rng = np.random.default_rng(abs(hash(symbol)) % 2 ** 32)
+        closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, self.n_bars)))
+        stamps = pd.date_range('2024-01-01', periods=self.n_bars).astype('int64') // 10 ** 9
+        return {'timestamps': stamps.tolist(), 'closes': closes.tolist()}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def http_fetcher(base_url, timeout=1.0):
+    """Fetch function for FetchScheduler that reads closes from a FakeQuoteServer"""
+    def fetch(symbol):
+        with urllib.request.urlopen(f'{base_url}/chart/{symbol}', timeout=timeout) as resp:
+            data = json.load(resp)
+        index = pd.to_datetime(data['timestamps'], unit='s', utc=True)
+        return pd.Series(data['closes'], index=index, name=symbol)
+    return fetch
+
+
+# Expected outcome of the demo script in main(): with max_retries=4, SOL-USD's
+# six 500s exhaust its retries and BAD-USD's 404 is not retryable
+DEMO_ERRORS = {'SOL-USD', 'BAD-USD'}
+DEMO_HITS = {'BTC-USD': 3, 'GC=F': 2, 'ETH-USD': 2, 'SOL-USD': 5, 'BAD-USD': 1,
+             'DX-Y.NYB': 1, '^GSPC': 1, 'ADA-USD': 1}
+
+
+def check_demo(symbols, results, errors, scheduler, server):
+    """Problems with a demo run (empty list = as expected)"""
+    problems = []
+    if set(results) & set(errors) or set(results) | set(errors) != set(symbols):
+        problems.append(f"symbols not finished exactly once: results={sorted(results)}, "
+                        f"errors={sorted(errors)}")
+    if set(errors) != DEMO_ERRORS:
+        problems.append(f"errors for {sorted(errors)}, expected {sorted(DEMO_ERRORS)}")
+    if server.hits != DEMO_HITS:
+        problems.append(f"server hits {server.hits}, expected {DEMO_HITS}")
+    expected_retries = sum(DEMO_HITS.values()) - len(symbols)
+    if scheduler.stats['retries'] != expected_retries:
+        problems.append(f"{scheduler.stats['retries']} retries, expected {expected_retries}")
+    if scheduler.stats['requests'] != sum(DEMO_HITS.values()):
+        problems.append(f"{scheduler.stats['requests']} requests, expected {sum(DEMO_HITS.values())}")
+    return problems
+
+
+def main():
+    """Fetch a small universe from a fake server that injects failures; exit 1 on surprises"""
+    script = {
+        'BTC-USD': [429, 429],
+        'GC=F': ['timeout'],
+        'ETH-USD': [403],
+        'SOL-USD': [500, 500, 500, 500, 500, 500],
+        'BAD-USD': [404],
+    }
+    drivers = ['BTC-USD', 'GC=F', 'DX-Y.NYB', '^GSPC']
+    symbols = ['ETH-USD', 'SOL-USD', 'BAD-USD', 'ADA-USD'] + drivers
+    with FakeQuoteServer(script, delay=1.5) as server:
+        scheduler = FetchScheduler(http_fetcher(server.url, timeout=0.5), rate=10, burst=4,
+                                   backoff_base=0.1, backoff_cap=1.0, breaker_timeout=1.0, seed=0)
+        start = time.perf_counter()
+        results, errors = scheduler.run(symbols, priority=lambda s: 0 if s in drivers else 1)
+        elapsed = time.perf_counter() - start
+
+    print(f"Fetched {len(results)}/{len(symbols)} symbols in {elapsed:.2f}s")
+    for symbol, exc in errors.items():
+        print(f"   ✗ {symbol}: {exc}")
+    print(f"Requests: {scheduler.stats['requests']}, retries: {scheduler.stats['retries']}")
+    print(f"Server hits: {server.hits}")
+    problems = check_demo(symbols, results, errors, scheduler, server)
+
+    # A crash outside the per-fetch handling must surface, not hang run()
+    def broken_host(symbol):
+        if symbol == 'ADA-USD':
+            raise KeyError(symbol)
+        return DEFAULT_HOST
+    try:
+        FetchScheduler(lambda s: s, rate=100, host_of=broken_host).run(symbols)
+        problems.append("a crashing worker did not propagate out of run()")
+    except KeyError:
+        print("Worker crash propagated out of run()")
+
+    for problem in problems:
+        print(f"   ✗ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✓ Scheduler behaved as scripted")
+
+
+if __name__ == "__main__":
+    main()
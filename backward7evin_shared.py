@@ -0,0 +1,199 @@
+"""
+The Backward 7evin - Shared Dataset
+CS379 Machine Learning - Zero-Copy Price Matrices for Worker Processes
+
+Handing a DataFrame to a process pool pickles the whole thing into every
+task. SharedDataset instead places named float arrays (the aligned price
+matrix, its returns, standardized blocks, feature matrices...) in one
+shared-memory segment, or in memory-mapped .npy files, together with the
+symbol and timestamp indexes. Workers receive a small picklable handle and
+attach to zero-copy, read-only NumPy views:
+
+    with SharedDataset.from_prices(prices) as ds:
+        pool.map(work, [(ds.handle, cols) for cols in shards])
+
+    def work(args):
+        handle, cols = args
+        with SharedDataset.attach(handle) as ds:
+            returns = ds['returns'][:, cols]
+"""
+
+import os
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ('shm', 'npy')
+_ALIGN = 64  # byte alignment of each array inside the segment
+
+# Everything a worker needs to attach: backend, segment name or directory,
+# {array name: (offset, shape, dtype)}, symbols and row index values
+SharedHandle = namedtuple('SharedHandle', ['backend', 'location', 'layout', 'symbols', 'index'])
+
+
+class SharedDataset:
+    """Named NumPy arrays in shared memory (or mmap'd .npy) plus symbol/time indexes"""
+
+    def __init__(self, arrays, handle, shm=None, owner=False):
+        self.arrays = arrays
+        self.handle = handle
+        self.symbols = list(handle.symbols) if handle.symbols is not None else None
+        self.index = None if handle.index is None else pd.Index(handle.index)
+        self._shm = shm
+        self._owner = owner
+
+    # ───────────────────────── creation ─────────────────────────
+
+    @classmethod
+    def create(cls, arrays, symbols=None, index=None, backend='shm', path=None):
+        """
+        Copy arrays into a new shared dataset.
+
+        Args:
+            arrays: Dict {name: array}
+            symbols: Column labels (optional)
+            index: Row labels, usually timestamps (optional; tz-aware -> UTC)
+            backend: 'shm' (multiprocessing.shared_memory) or 'npy' (memory-mapped files)
+            path: Directory for the 'npy' backend
+
+        Returns:
+            SharedDataset owning the storage (unlink() or use as a context manager)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+        arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+        if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        index = None if index is None else np.asarray(index)
+        symbols = None if symbols is None else tuple(symbols)
+
+        if backend == 'npy':
+            if path is None:
+                raise ValueError("The 'npy' backend needs a directory path")
+            os.makedirs(path, exist_ok=True)
+            layout = {}
+            for name, a in arrays.items():
+                np.save(os.path.join(path, f'{name}.npy'), a)
+                layout[name] = (0, a.shape, a.dtype.str)
+            handle = SharedHandle('npy', path, layout, symbols, index)
+            return cls._open(handle, owner=True)
+
+        layout, offset = {}, 0
+        for name, a in arrays.items():
+            layout[name] = (offset, a.shape, a.dtype.str)
+            offset += -(-a.nbytes // _ALIGN) * _ALIGN
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        handle = SharedHandle('shm', shm.name, layout, symbols, index)
+        for name, a in arrays.items():
+            off, shape, dtype = layout[name]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = a
+        return cls._open(handle, shm=shm, owner=True)
+
+    @classmethod
+    def from_prices(cls, prices, returns=True, backend='shm', path=None):
+        """
+        Share an aligned price DataFrame (rows = bars, columns = symbols).
+
+        Stores 'prices' (float64) and, if requested, simple 'returns'
+        (first row NaN).
+        """
+        values = prices.to_numpy(dtype=np.float64)
+        arrays = {'prices': values}
+        if returns:
+            ret = np.full_like(values, np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                np.divide(values[1:], values[:-1], out=ret[1:])
+            ret[1:] -= 1.0
+            arrays['returns'] = ret
+        return cls.create(arrays, prices.columns, prices.index, backend, path)
+
+    @classmethod
+    def attach(cls, handle, writable=False):
+        """
+        Open an existing dataset from its handle (worker side).
+
+        Args:
+            writable: Allow writes, e.g. workers filling disjoint slices of
+                      a shared output array
+        """
+        return cls._open(handle, owner=False, writable=writable)
+
+    @classmethod
+    def _open(cls, handle, shm=None, owner=False, writable=True):
+        arrays = {}
+        if handle.backend == 'npy':
+            mode = 'r+' if writable else 'r'
+            for name in handle.layout:
+                arrays[name] = np.load(os.path.join(handle.location, f'{name}.npy'), mmap_mode=mode)
+        else:
+            if shm is None:
+                shm = shared_memory.SharedMemory(name=handle.location)
+            for name, (off, shape, dtype) in handle.layout.items():
+                view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)
+                view.flags.writeable = writable
+                arrays[name] = view
+        return cls(arrays, handle, shm=shm, owner=owner)
+
+    # ───────────────────────── access ─────────────────────────
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def columns(self, symbols):
+        """Column positions of symbols"""
+        return [self.symbols.index(s) for s in symbols]
+
+    def frame(self, name='prices'):
+        """DataFrame over one array (a view, not a copy)"""
+        return pd.DataFrame(self.arrays[name], index=self.index, columns=self.symbols, copy=False)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+    # ───────────────────────── lifetime ─────────────────────────
+
+    def close(self):
+        """
+        Drop this process's views and mapping. If the caller still holds
+        views, the mapping is released when they are garbage collected.
+        """
+        self.arrays = {}
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                pass
+            self._shm = None
+
+    def unlink(self):
+        """Close and free the storage (creator only)"""
+        shm = self._shm
+        self.arrays = {}
+        if self.handle.backend == 'shm' and shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+            if self._owner:
+                shm.unlink()
+        elif self.handle.backend == 'npy' and self._owner:
+            for name in self.handle.layout:
+                try:
+                    os.remove(os.path.join(self.handle.location, f'{name}.npy'))
+                except FileNotFoundError:
+                    pass
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
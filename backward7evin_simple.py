@@ -6,6 +6,7 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from backward7evin_alignment import align_prices
 
 # SIMPLIFIED: Only analyze Bitcoin and Gold
 ASSETS_TO_ANALYZE = ['BTC-USD', 'GC=F']
@@ -24,7 +25,7 @@ def fetch_market_data(symbols, days=90):
                 data[symbol] = df['Close']
         except Exception as e:
             print(f"Error fetching {symbol}: {e}")
-    return pd.DataFrame(data)
+    return align_prices(data)  # calendar-aware merge of 24/7 and exchange-hours assets
 
 def calculate_correlations(df, target_col):
     """Calculate how closely assets move together"""
@@ -54,7 +55,6 @@ def main():
     print("📡 Fetching market data...")
     all_symbols = ASSETS_TO_ANALYZE + MARKET_CONTEXT
     full_df = fetch_market_data(all_symbols)
-    full_df = full_df.dropna()
     print(f"✓ Loaded {len(full_df)} days of data")
     print(f"✓ Analyzing: Bitcoin and Gold ONLY\n")
 
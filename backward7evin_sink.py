@@ -0,0 +1,152 @@
+"""
+The Backward 7evin - Signal History Sink
+CS379 Machine Learning - Append-Only Columnar Output
+
+Every run used to overwrite crypto_signals_output.csv and
+feature_importance.csv, so yesterday's signals were gone. SignalSink appends
+each run's tables to a Parquet dataset instead, partitioned by run date:
+
+    signal_history/
+        signals/date=2024-10-15/part-20241015T143000-1a2b3c.parquet
+        predictions/date=.../...
+        feature_importance/date=.../...
+
+Label columns (Signal, Asset, ...) are dictionary-encoded, and readers can
+prune columns and filter by date/run time without parsing CSVs.
+"""
+
+import os
+import sys
+import uuid
+import tempfile
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.dataset as ds
+    PARQUET_OK = True
+except Exception:
+    PARQUET_OK = False
+
+HISTORY_DIR = 'signal_history'
+
+# Low-cardinality text columns stored as dictionaries
+DICTIONARY_COLUMNS = ('Signal', 'Asset', 'Regime', 'Base_Signal', 'Driver', 'Direction',
+                      'Status', 'feature', 'signal')
+
+
+class SignalSink:
+    """Append-only, date-partitioned Parquet history of run outputs"""
+
+    def __init__(self, root=HISTORY_DIR):
+        if not PARQUET_OK:
+            raise ImportError("SignalSink requires pyarrow (pip install pyarrow)")
+        self.root = root
+
+    def append(self, kind, df, run_ts=None):
+        """
+        Append one run's table.
+
+        Args:
+            kind: Dataset name, e.g. 'signals' or 'feature_importance'
+            df: DataFrame to store (index is dropped)
+            run_ts: Run timestamp (default: now, UTC); stored as column run_ts
+
+        Returns:
+            Path of the written Parquet file
+        """
+        run_ts = pd.Timestamp.now(tz='UTC') if run_ts is None else pd.Timestamp(run_ts)
+        if run_ts.tz is None:
+            run_ts = run_ts.tz_localize('UTC')
+
+        out = df.reset_index(drop=True).copy()
+        out.insert(0, 'run_ts', run_ts)
+        for col in DICTIONARY_COLUMNS:
+            if col in out.columns:
+                out[col] = out[col].astype('category')
+
+        part_dir = os.path.join(self.root, kind, f"date={run_ts.strftime('%Y-%m-%d')}")
+        os.makedirs(part_dir, exist_ok=True)
+        name = f"part-{run_ts.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}.parquet"
+        path = os.path.join(part_dir, name)
+        pq.write_table(pa.Table.from_pandas(out, preserve_index=False), path)
+        return path
+
+    def read(self, kind, columns=None, start=None, end=None):
+        """
+        Query a dataset's history.
+
+        Args:
+            kind: Dataset name
+            columns: Columns to load (others are never read from disk)
+            start, end: Optional run_ts bounds (inclusive)
+
+        Returns:
+            DataFrame sorted by run_ts (empty if nothing was written yet)
+        """
+        path = os.path.join(self.root, kind)
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns)
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        # Discovery takes the schema from the first file only; columns added by
+        # later runs (BTC_Lag, 5class fields) need the union of all fragments
+        schema = pa.unify_schemas([dataset.schema] +
+                                  [frag.physical_schema for frag in dataset.get_fragments()],
+                                  promote_options='permissive')
+        dataset = ds.dataset(path, schema=schema, format='parquet', partitioning='hive')
+
+        filt = None
+        for bound, op in ((start, 'ge'), (end, 'le')):
+            if bound is None:
+                continue
+            ts = pd.Timestamp(bound)
+            ts = ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+            cond = getattr(ds.field('run_ts'), f'__{op}__')(pa.scalar(ts.to_pydatetime(),
+                                                                     type=pa.timestamp('us', tz='UTC')))
+            filt = cond if filt is None else filt & cond
+
+        load_cols = None
+        if columns is not None:
+            load_cols = list(dict.fromkeys(['run_ts'] + list(columns)))
+        table = dataset.to_table(columns=load_cols, filter=filt)
+        return table.to_pandas().sort_values('run_ts', kind='stable').reset_index(drop=True)
+
+
+def append_history(kind, df, root=HISTORY_DIR):
+    """Append to the history if pyarrow is available; returns the path or None"""
+    if not PARQUET_OK:
+        return None
+    return SignalSink(root).append(kind, df)
+
+
+def main():
+    """Write two runs whose columns differ and read them back; exit 1 on a mismatch"""
+    with tempfile.TemporaryDirectory() as root:
+        sink = SignalSink(root)
+        sink.append('signals', pd.DataFrame({'Asset': ['ETH', 'SOL'], 'Signal': ['Hold', 'Caution']}),
+                    run_ts='2024-10-14 12:00')
+        sink.append('signals', pd.DataFrame({'Asset': ['ETH'], 'Signal': ['Buy Long'],
+                                             'BTC_Lag': [2], 'BTC_Lag_Corr': [0.41]}),
+                    run_ts='2024-10-15 12:00')
+        history = sink.read('signals')
+        lags = sink.read('signals', columns=['BTC_Lag'])
+        recent = sink.read('signals', columns=['Asset', 'BTC_Lag_Corr'], start='2024-10-15')
+
+    print(history)
+    problems = []
+    if list(history['BTC_Lag_Corr'].isna()) != [True, True, False]:
+        problems.append("rows from the older run should have an empty BTC_Lag_Corr")
+    if len(lags) != 3 or lags['BTC_Lag'].iloc[-1] != 2:
+        problems.append("BTC_Lag was not readable across both runs")
+    if list(recent['Asset']) != ['ETH'] or recent['BTC_Lag_Corr'].iloc[0] != 0.41:
+        problems.append("date filter on the newer schema returned the wrong rows")
+    for problem in problems:
+        print(f"   ✗ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✓ History reads back across a schema change")
+
+
+if __name__ == "__main__":
+    main()
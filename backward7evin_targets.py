@@ -0,0 +1,69 @@
+"""
+The Backward 7evin - Multi-Horizon Targets
+CS379 Machine Learning - Batched Target Labeling
+
+The models only learned "is BTC up tomorrow?". build_targets labels every
+horizon at once from one gather over the price array:
+
+    up_{h}d      1 if the close h bars ahead is higher, else 0
+    bucket_{h}d  forward return bucket (big down ... big up)
+
+Rows whose horizon runs past the end of the data are NaN rather than
+silently labeled "down".
+"""
+
+import numpy as np
+import pandas as pd
+
+HORIZONS = (1, 3, 5, 10)
+
+# Forward-return bucket edges: < -5%, -5..-1%, -1..+1%, +1..+5%, > +5%
+BUCKET_EDGES = (-0.05, -0.01, 0.01, 0.05)
+BUCKET_LABELS = ('Big Down', 'Down', 'Flat', 'Up', 'Big Up')
+
+
+def forward_returns(close, horizons=HORIZONS):
+    """
+    Forward returns for all horizons in one vectorized pass.
+
+    Args:
+        close: 1-D array of closes
+        horizons: Bars ahead
+
+    Returns:
+        float64 array [T, n_horizons], NaN where t + h is past the end
+    """
+    c = np.asarray(close, dtype=np.float64)
+    h = np.asarray(horizons)
+    idx = np.arange(len(c))[:, None] + h[None, :]
+    valid = idx < len(c)
+    fwd = c[np.minimum(idx, len(c) - 1)] / c[:, None] - 1.0
+    fwd[~valid] = np.nan
+    return fwd
+
+
+def build_targets(close, horizons=HORIZONS, bucket_edges=BUCKET_EDGES):
+    """
+    Direction and return-magnitude targets for every horizon.
+
+    Args:
+        close: Series of closes
+        horizons: Bars ahead to label
+        bucket_edges: Return thresholds for the magnitude buckets (None to skip)
+
+    Returns:
+        DataFrame indexed like close with up_{h}d (and bucket_{h}d) columns
+    """
+    fwd = forward_returns(close, horizons)
+    missing = np.isnan(fwd)
+
+    up = (fwd > 0).astype(np.float64)
+    up[missing] = np.nan
+    out = {f'up_{h}d': up[:, k] for k, h in enumerate(horizons)}
+
+    if bucket_edges is not None:
+        bucket = np.digitize(fwd, bucket_edges).astype(np.float64)
+        bucket[missing] = np.nan
+        for k, h in enumerate(horizons):
+            out[f'bucket_{h}d'] = bucket[:, k]
+    return pd.DataFrame(out, index=close.index)
@@ -15,6 +15,10 @@ from backward7evin_classifier import (
     fetch_market_data, calculate_correlations, classify_signal,
     ASSETS_TO_ANALYZE, MARKET_CONTEXT
 )
+from backward7evin_correlation import correlation_matrix, clustered_heatmap_view
+from backward7evin_plotting import line_trace
+from backward7evin_predictor import CryptoPredictor
+from backward7evin_importance import feature_importance as compute_importance
 
 # Page configuration
 st.set_page_config(
@@ -49,6 +53,32 @@ def load_market_data(days=90):
     all_symbols = ASSETS_TO_ANALYZE + MARKET_CONTEXT
     return fetch_market_data(all_symbols, days=days)
 
+# Dashboard symbols -> CryptoPredictor column names
+PREDICTOR_COLUMNS = {'BTC-USD': 'BTC', 'GC=F': 'Gold', '^GSPC': 'SP500', 'DX-Y.NYB': 'USD'}
+
+@st.cache_data(ttl=3600)
+def load_model_insights(df):
+    """
+    Train the next-day BTC forest on the loaded data and measure its feature
+    importance on the held-out last 20% (cached by model fingerprint).
+    Returns (importance DataFrame, test accuracy) or None if too little data.
+    """
+    prices = df[[c for c in PREDICTOR_COLUMNS if c in df.columns]].rename(columns=PREDICTOR_COLUMNS)
+    if 'BTC' not in prices.columns:
+        return None
+    predictor = CryptoPredictor()
+    features_df = predictor.engineer_features(prices)
+    if len(features_df) < 40:
+        return None
+    X, y = features_df.iloc[:, :-1], features_df['target']
+    split = int(len(X) * 0.8)
+    X_train = predictor.scaler.fit_transform(X.iloc[:split])
+    X_test = predictor.scaler.transform(X.iloc[split:])
+    predictor.model.fit(X_train, y.iloc[:split])
+    importance = compute_importance(predictor.model, X_test, y.iloc[split:],
+                                    feature_names=X.columns.tolist(), block=3)
+    return importance, predictor.model.score(X_test, y.iloc[split:])
+
 def get_signal_color(signal):
     """Map signal to CSS class"""
     mapping = {
@@ -224,8 +254,10 @@ with tab1:
 with tab2:
     st.header("Correlation Heatmap")
 
-    # Calculate correlation matrix
-    corr_matrix = df.corr()
+    # Calculate correlation matrix (blockwise float32), clustered for display
+    corr_matrix = clustered_heatmap_view(correlation_matrix(df), max_size=150)
+    if corr_matrix.isna().all().all():
+        st.warning("Not enough overlapping price history to compute correlations.")
 
     # Create heatmap
     fig = go.Figure(data=go.Heatmap(
@@ -234,8 +266,8 @@ with tab2:
         y=corr_matrix.columns,
         colorscale='RdBu',
         zmid=0,
-        text=corr_matrix.values,
-        texttemplate='%{text:.2f}',
+        text=corr_matrix.values if len(corr_matrix) <= 30 else None,
+        texttemplate='%{text:.2f}' if len(corr_matrix) <= 30 else None,
         textfont={"size": 10},
         colorbar=dict(title="Correlation")
     ))
@@ -264,14 +296,10 @@ with tab2:
         for col in normalized_df.columns:
             normalized_df[col] = (normalized_df[col] / normalized_df[col].iloc[0]) * 100
 
+        # WebGL traces, LTTB-downsampled to the chart width (cached per window)
         fig2 = go.Figure()
         for col in normalized_df.columns:
-            fig2.add_trace(go.Scatter(
-                x=normalized_df.index,
-                y=normalized_df[col],
-                mode='lines',
-                name=col
-            ))
+            fig2.add_trace(line_trace(normalized_df[col], name=col))
 
         fig2.update_layout(
             title="Normalized Price Comparison (Base = 100)",
@@ -313,22 +341,30 @@ with tab3:
     # Feature importance visualization
     st.subheader("Feature Importance")
 
-    feature_importance = pd.DataFrame({
-        'Feature': ['BTC Correlation', 'Gold Correlation', 'S&P 500 Correlation', 'USD Correlation'],
-        'Importance': [0.40, 0.25, 0.20, 0.15]
-    })
-
-    fig3 = px.bar(
-        feature_importance,
-        x='Importance',
-        y='Feature',
-        orientation='h',
-        title="Feature Importance in Classification",
-        color='Importance',
-        color_continuous_scale='Blues'
-    )
+    insights = load_model_insights(df)
+    if insights is None:
+        st.info("Not enough history for the importance model; increase the lookback period.")
+    else:
+        feature_importance, test_accuracy = insights
+        top = feature_importance.head(10).iloc[::-1]
+
+        fig3 = px.bar(
+            top,
+            x='permutation',
+            y='feature',
+            error_x='permutation_std',
+            orientation='h',
+            title="Next-Day BTC Forest: Test-Period Permutation Importance",
+            labels={'permutation': 'Accuracy drop when shuffled', 'feature': 'Feature'},
+            color='contribution',
+            color_continuous_scale='Blues'
+        )
 
-    st.plotly_chart(fig3, use_container_width=True)
+        st.plotly_chart(fig3, use_container_width=True)
+        st.caption(f"Random Forest test accuracy {test_accuracy:.1%}. Bars: accuracy lost when a "
+                   f"feature is block-shuffled over the held-out bars; color: mean |contribution| "
+                   f"to P(up) along the trees' decision paths.")
+        st.dataframe(feature_importance.round(4), use_container_width=True, hide_index=True)
 
     st.divider()
 